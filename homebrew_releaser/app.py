@@ -1,16 +1,48 @@
+import math
 import os
+import re
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from typing import Optional
 
+import requests
 import woodchips
 
 from homebrew_releaser._version import __version__
+from homebrew_releaser.archive_inspector import (
+    ArchiveInspector,
+    generate_install_instructions,
+    get_tar_stream_mode,
+)
+from homebrew_releaser.archive_store import archive_store
+from homebrew_releaser.assets import (
+    ReleaseAsset,
+    ReleaseAssets,
+    resolve_target_assets,
+)
+from homebrew_releaser.cache import (
+    cache_checksum,
+    get_cached_checksum_entry,
+    get_conditional_headers,
+    is_cached_checksum_current,
+    touch_cached_checksum,
+)
 from homebrew_releaser.checksum import (
-    calculate_checksum,
+    calculate_file_checksum,
+    get_asset_digest,
+    parse_checksum_manifest,
     upload_checksum_file,
 )
 from homebrew_releaser.constants import (
     BRANCH,
     CHECKSUM_FILE,
+    CHECKSUM_FILE_SCOPE,
+    CHECKSUM_MANIFEST_PATTERN,
+    CHECKSUM_SIDECAR_EXTENSIONS,
+    CHECKSUM_SOURCE_OPTIONS,
+    CHECKSUM_SOURCES,
+    CHECKSUM_VERIFY_FRACTION,
     COMMIT_EMAIL,
     COMMIT_OWNER,
     CUSTOM_REQUIRE,
@@ -18,29 +50,47 @@ from homebrew_releaser.constants import (
     DEBUG,
     DEPENDS_ON,
     DOWNLOAD_STRATEGY,
+    FORMULA_FOLDER,
     FORMULA_INCLUDES,
     GITHUB_BASE_API_URL,
     GITHUB_BASE_URL,
+    GITHUB_HEADERS,
     GITHUB_OWNER,
     GITHUB_REPO,
     GITHUB_TOKEN,
+    HEDGE_DOWNLOAD_AFTER,
     HOMEBREW_OWNER,
     HOMEBREW_TAP,
+    HOMEBREW_TAPS_DIR,
     IGNORE_WARNINGS,
     INSTALL,
+    LOCAL_ARTIFACTS,
     LOGGER_NAME,
+    MAX_CHECKSUM_MANIFEST_SIZE,
+    MAX_DOWNLOAD_WORKERS,
+    PUBLISH_METHOD,
+    SINGLE_TAP_CHECKOUT,
     SKIP_CHECKSUM,
     SKIP_COMMIT,
     TARGET_DARWIN_AMD64,
     TARGET_DARWIN_ARM64,
     TARGET_LINUX_AMD64,
     TARGET_LINUX_ARM64,
+    TARGETS,
     TEST,
+    TIMEOUT,
     UPDATE_PYTHON_RESOURCES,
     UPDATE_README_TABLE,
     VERSION,
+    WARM_UP_CONNECTIONS,
     non_critical_warnings,
 )
+from homebrew_releaser.download import (
+    download_resumable,
+    download_segmented,
+    is_segmentable,
+    make_hedged_request,
+)
 from homebrew_releaser.formula import generate_formula_data
 from homebrew_releaser.git import (
     add_git,
@@ -50,15 +100,21 @@ from homebrew_releaser.git import (
     push_git,
     setup_git,
 )
+from homebrew_releaser.git_data import publish_files
 from homebrew_releaser.homebrew import (
     get_homebrew_version,
+    link_homebrew_tap,
     setup_homebrew_tap,
     update_python_resources,
 )
+from homebrew_releaser.metadata import get_release_metadata
 from homebrew_releaser.readme_updater import update_readme
 from homebrew_releaser.utils import (
+    build_dir_path,
     get_filename_from_path,
+    get_session,
     make_github_get_request,
+    warm_up_connections,
     write_file,
 )
 
@@ -67,37 +123,29 @@ def run_github_action():
     """Runs the complete GitHub Action workflow.
 
     1. Setup logging
-    2. Setup git environment
-    3. Setup Homebrew tap
-    4. Grab the details about the tap
-    5. Download the archive(s)
-    6. Generate checksum(s)
-    7. Generate the new formula
-    8. Update README table (optional)
-    9. Add, commit, and push updated formula to GitHub
-    10. Upload checksum.txt to latest release (optional)
-    11. Raise non-critical warnings at the end so release succeeds but users are aware
+    2. Grab the details about the release and check its archives exist
+    3. Setup git environment
+    4. Setup Homebrew tap
+    5. Download the archive(s), generating checksum(s) as they stream in
+    6. Generate the new formula
+    7. Update README table (optional)
+    8. Add, commit, and push updated formula to GitHub
+    9. Upload checksum.txt to latest release (optional)
+    10. Raise non-critical warnings at the end so release succeeds but users are aware
     """
     _setup_logger()
     logger = woodchips.get(LOGGER_NAME)
 
     logger.info(f"Starting Homebrew Releaser v{__version__}...")
+    if WARM_UP_CONNECTIONS:
+        logger.debug("Warming up connections to GitHub...")
+        warm_up_connections()
     homebrew_version = get_homebrew_version()
     logger.info(f"Using {homebrew_version}.")
     _check_required_env_variables()
 
-    logger.info("Setting up git environment...")
-    setup_git(COMMIT_OWNER, COMMIT_EMAIL, HOMEBREW_OWNER, HOMEBREW_TAP)
-
-    logger.info("Setting up Homebrew tap...")
-    setup_homebrew_tap(HOMEBREW_OWNER, HOMEBREW_TAP)
-    make_formula_folder(HOMEBREW_TAP)
-
     logger.info(f"Collecting data about {GITHUB_REPO}...")
-    repository = make_github_get_request(url=f"{GITHUB_BASE_API_URL}/repos/{GITHUB_OWNER}/{GITHUB_REPO}").json()
-    latest_release = make_github_get_request(
-        url=f"{GITHUB_BASE_API_URL}/repos/{GITHUB_OWNER}/{GITHUB_REPO}/releases/latest"
-    ).json()
+    repository, latest_release = get_release_metadata(GITHUB_OWNER, GITHUB_REPO)
     assets = latest_release["assets"]
     version = VERSION or latest_release["tag_name"]
     version_no_v = version.lstrip("v")
@@ -125,14 +173,22 @@ def run_github_action():
     target_browser_download_base_url = (
         f"{GITHUB_BASE_URL}/{GITHUB_OWNER}/{GITHUB_REPO}/releases/download/{version}/{GITHUB_REPO}-{version_no_v}"
     )
-    if TARGET_DARWIN_AMD64:
-        archive_urls.append(f"{target_browser_download_base_url}-darwin-amd64.tar.gz")
-    if TARGET_DARWIN_ARM64:
-        archive_urls.append(f"{target_browser_download_base_url}-darwin-arm64.tar.gz")
-    if TARGET_LINUX_AMD64:
-        archive_urls.append(f"{target_browser_download_base_url}-linux-amd64.tar.gz")
-    if TARGET_LINUX_ARM64:
-        archive_urls.append(f"{target_browser_download_base_url}-linux-arm64.tar.gz")
+    enabled_targets = [
+        target
+        for target, enabled in zip(
+            TARGETS, (TARGET_DARWIN_AMD64, TARGET_DARWIN_ARM64, TARGET_LINUX_AMD64, TARGET_LINUX_ARM64)
+        )
+        if enabled
+    ]
+    # Targets are taken from what the release actually contains, falling back to the documented naming convention
+    target_assets = resolve_target_assets(assets, enabled_targets, GITHUB_REPO, version_no_v)
+    # Keep track of which target each URL belongs to so local artifacts can be matched up with them
+    target_archive_urls = {}
+    for target in enabled_targets:
+        if target in target_assets:
+            target_archive_urls[target] = target_assets[target].browser_download_url
+        else:
+            target_archive_urls[target] = f"{target_browser_download_base_url}-{target}.tar.gz"
 
     custom_tarball_url = None
     if CUSTOM_TARBALL:
@@ -142,24 +198,127 @@ def run_github_action():
         logger.debug(
             f"Using the following custom tarball URL instead of auto-generated tarball URL: {custom_tarball_url}"
         )
-        archive_urls.append(custom_tarball_url)
+        target_archive_urls["custom-tarball"] = custom_tarball_url
+    archive_urls.extend(target_archive_urls.values())
+    archive_urls = _plan_archive_urls(archive_urls, custom_tarball_url or auto_generated_release_tar_url)
+
+    # Without an `install` input, the install block is generated from what the target tarballs contain. The custom
+    # tarball is the formula's source (eg: scripts and completions in the source tree), not what's installed
+    inspected_archive_urls = (
+        []
+        if INSTALL
+        else [
+            url
+            for target, url in target_archive_urls.items()
+            if target != "custom-tarball" and get_tar_stream_mode(url)
+        ]
+    )
+    if not INSTALL and not inspected_archive_urls:
+        raise SystemExit(
+            "You must provide an `install` command unless your release has target tarballs it can be generated from."
+        )
 
-    checksums = []
-    for archive_url in archive_urls:
+    # Catch a misnamed target before cloning the tap or downloading anything
+    _preflight_archive_urls(archive_urls, assets)
+
+    if PUBLISH_METHOD == "api":
+        logger.debug("Publishing through the Git Data API, skipping the git environment setup.")
+    else:
+        logger.info("Setting up git environment...")
+        setup_git(COMMIT_OWNER, COMMIT_EMAIL, HOMEBREW_OWNER, HOMEBREW_TAP)
+
+    # A single checkout of the tap is shared with Homebrew, otherwise Homebrew clones its own. Publishing through
+    # the Git Data API needs no checkout at all unless brew or the README table has to read the tap
+    single_tap_checkout = SINGLE_TAP_CHECKOUT and PUBLISH_METHOD != "api"
+    homebrew_tap_needed = PUBLISH_METHOD != "api" or UPDATE_PYTHON_RESOURCES or UPDATE_README_TABLE
+    if single_tap_checkout:
+        logger.info("Setting up Homebrew tap...")
+        link_homebrew_tap(HOMEBREW_OWNER, HOMEBREW_TAP, build_dir_path(HOMEBREW_TAP))
+    elif homebrew_tap_needed:
+        logger.info("Setting up Homebrew tap...")
+        setup_homebrew_tap(HOMEBREW_OWNER, HOMEBREW_TAP)
+    else:
+        logger.debug("Nothing needs a checkout of the Homebrew tap, skipping its setup.")
+    if PUBLISH_METHOD != "api":
+        make_formula_folder(HOMEBREW_TAP)
+
+    # Artifacts built earlier in the workflow are hashed from disk instead of being downloaded back from the release
+    local_checksums = _get_local_artifact_checksums(target_archive_urls)
+
+    # Checksums published alongside the release are used instead of downloading the assets they describe,
+    # anything left over is downloaded and hashed
+    published_checksums: dict[str, str] = {}
+    for checksum_source in CHECKSUM_SOURCES:
+        remaining_archive_urls = [
+            archive_url
+            for archive_url in archive_urls
+            if archive_url not in published_checksums and archive_url not in local_checksums
+        ]
+        if checksum_source == "digest":
+            logger.debug("Using the checksums GitHub published for release assets instead of downloading them.")
+            published_checksums.update(_get_digest_checksums(remaining_archive_urls, assets))
+        elif checksum_source == "manifest":
+            logger.debug("Using the checksum manifests published with the release instead of downloading assets.")
+            published_checksums.update(_get_manifest_checksums(remaining_archive_urls, assets, repository["private"]))
+    urls_to_verify = _sample_urls_to_verify(list(published_checksums))
+    urls_to_download = [
+        archive_url
+        for archive_url in archive_urls
+        if (archive_url not in published_checksums and archive_url not in local_checksums)
+        or archive_url in urls_to_verify
+        or archive_url in inspected_archive_urls
+    ]
+
+    download_urls = []
+    mirror_urls = {}
+    archive_inspectors = {}
+    for archive_url in urls_to_download:
         if repository["private"]:
-            # For private repos, use asset["url"] if available, otherwise use archive_url
-            matching_asset = next(
-                (asset for asset in assets if asset and asset.get("browser_download_url") == archive_url), None
-            )
-            download_url = matching_asset["url"] if matching_asset else archive_url
-            stream = False
+            # For private repos, use the asset's API URL if available, otherwise use archive_url
+            matching_asset = assets.get(archive_url) if _is_release_asset_url(archive_url) else None
+            download_urls.append(matching_asset.url if matching_asset and matching_asset.url else archive_url)
         else:
             # For public repos, always use browser URLs
-            download_url = archive_url
-            stream = True
+            download_urls.append(archive_url)
+            # A hedged download races the browser URL's CDN redirect against the asset's API URL
+            matching_asset = (
+                assets.get(archive_url) if HEDGE_DOWNLOAD_AFTER and _is_release_asset_url(archive_url) else None
+            )
+            if matching_asset and matching_asset.url:
+                mirror_urls[archive_url] = matching_asset.url
+        if archive_url in inspected_archive_urls:
+            archive_inspectors[download_urls[-1]] = ArchiveInspector(get_filename_from_path(archive_url))
+
+    # Archives download concurrently but come back in the same order as `urls_to_download`
+    downloaded_checksums = dict(
+        zip(urls_to_download, _download_archives(download_urls, mirror_urls, archive_inspectors))
+    )
+    for archive_url in urls_to_verify:
+        if downloaded_checksums[archive_url] != published_checksums[archive_url]:
+            raise SystemExit(
+                f"The checksum of {archive_url} ({downloaded_checksums[archive_url]}) does not match its published checksum ({published_checksums[archive_url]})."  # noqa
+            )
+        logger.debug(f"Verified the published checksum for {archive_url}.")
 
-        downloaded_filename = _download_archive(download_url, stream)
-        checksum = calculate_checksum(downloaded_filename)
+    install = INSTALL
+    if not install:
+        install = generate_install_instructions(
+            archive_inspector.finish() or [] for archive_inspector in archive_inspectors.values()
+        )
+        if not install:
+            raise SystemExit(
+                "No executables, man pages, or shell completions were found in the target tarballs, you must provide an `install` command."  # noqa
+            )
+        logger.info(f"Generated the following install command from the target tarballs:\n{install}")
+
+    archive_targets = {archive_url: target for target, archive_url in target_archive_urls.items()}
+    checksums = []
+    for archive_url in archive_urls:
+        checksum = (
+            local_checksums.get(archive_url)
+            or published_checksums.get(archive_url)
+            or downloaded_checksums[archive_url]
+        )
         archive_filename = get_filename_from_path(archive_url)
         archive_checksum_entries += f"{checksum} {archive_filename}\n"
         checksums.append(
@@ -167,6 +326,7 @@ def run_github_action():
                 archive_filename: {
                     "checksum": checksum,
                     "url": archive_url,
+                    "target": archive_targets.get(archive_url),
                 }
             }
         )
@@ -179,7 +339,7 @@ def run_github_action():
         GITHUB_REPO,
         repository,
         checksums,
-        INSTALL,
+        install,
         custom_tarball_url or auto_generated_release_tar_url,
         DEPENDS_ON,
         TEST,
@@ -191,17 +351,13 @@ def run_github_action():
     )
 
     formula_filename = f"{repository['name']}.rb"
-    formula_dir = os.path.join(
-        os.sep,
-        "home",
-        "linuxbrew",
-        ".linuxbrew",
-        "Homebrew",
-        "Library",
-        "Taps",
-        HOMEBREW_OWNER,
-        HOMEBREW_TAP,
-    )
+    if single_tap_checkout:
+        formula_dir = build_dir_path(HOMEBREW_TAP, FORMULA_FOLDER)
+    elif homebrew_tap_needed:
+        formula_dir = os.path.join(HOMEBREW_TAPS_DIR, HOMEBREW_OWNER, HOMEBREW_TAP)
+    else:
+        # Only published from here, so it's removed along with the downloaded archives when the action exits
+        formula_dir = archive_store.directory
     formula_filepath = os.path.join(formula_dir, formula_filename)
     write_file(formula_filepath, template, "w")
 
@@ -215,24 +371,61 @@ def run_github_action():
     else:
         logger.debug("Skipping update to Python resources.")
 
+    # Without a clone of our own, brew's checkout of the tap is where the README is read and updated
+    tap_dir = formula_dir if PUBLISH_METHOD == "api" else HOMEBREW_TAP
+    updated_readme = None
     if UPDATE_README_TABLE:
         logger.info("Attempting to update the README's project table...")
-        update_readme(HOMEBREW_TAP)
+        updated_readme = update_readme(tap_dir)
     else:
         logger.debug("Skipping update to project README.")
 
-    # Although users can skip a commit, still commit (but don't push) to dry-run the commit for debugging purposes
-    logger.info("Preparing git commit...")
-    copy_formula_file_to_git(formula_filepath, HOMEBREW_TAP)
-    add_git(HOMEBREW_TAP)
-    commit_git(HOMEBREW_TAP, GITHUB_REPO, version)
+    formula = None
+    if single_tap_checkout:
+        # Kept to write the formula again if our clone has to be reset to commit it on top of someone else's
+        with open(formula_filepath, "r") as formula_file:
+            formula = formula_file.read()
+
+    if PUBLISH_METHOD != "api":
+        # Although users can skip a commit, still commit (but don't push) to dry-run the commit for debugging purposes
+        logger.info("Preparing git commit...")
+        _commit_formula(formula_filepath, version)
 
     if SKIP_COMMIT:
         logger.info(f"Skipping push to {HOMEBREW_TAP}.")
         logger.info(f"Skipping upload of checksum.txt to {HOMEBREW_TAP}.")
     else:
         logger.info(f"Attempting to release {version} of {GITHUB_REPO} to {HOMEBREW_TAP}...")
-        push_git(HOMEBREW_TAP, HOMEBREW_OWNER, BRANCH)
+        if PUBLISH_METHOD == "api":
+            tap_files = {f"{FORMULA_FOLDER}/{formula_filename}": formula_filepath}
+            if updated_readme:
+                tap_files[os.path.relpath(updated_readme, build_dir_path(tap_dir))] = updated_readme
+            tap_file_contents = {}
+            for path, filepath in tap_files.items():
+                with open(filepath, "rb") as tap_file:
+                    tap_file_contents[path] = tap_file.read()
+            publish_files(
+                HOMEBREW_OWNER,
+                HOMEBREW_TAP,
+                tap_file_contents,
+                f"chore: brew formula update for {GITHUB_REPO} {version}",
+                COMMIT_OWNER,
+                COMMIT_EMAIL,
+                BRANCH,
+            )
+        else:
+            push_git(
+                HOMEBREW_TAP,
+                HOMEBREW_OWNER,
+                BRANCH,
+                recommit=partial(
+                    _commit_formula,
+                    formula_filepath,
+                    version,
+                    UPDATE_README_TABLE,
+                    formula,
+                ),
+            )
         if SKIP_CHECKSUM:
             logger.info(f"Skipping upload of checksum.txt to {HOMEBREW_TAP}.")
         else:
@@ -261,14 +454,13 @@ def _setup_logger():
 
 
 def _check_required_env_variables():
-    """Checks that all required env variables are set."""
+    """Checks that all required env variables are set and that the ones with a fixed set of options are valid."""
     logger = woodchips.get(LOGGER_NAME)
 
     required_env_variables = [
         GITHUB_TOKEN,
         HOMEBREW_OWNER,
         HOMEBREW_TAP,
-        INSTALL,
     ]
 
     for env_variable in required_env_variables:
@@ -276,19 +468,297 @@ def _check_required_env_variables():
             raise SystemExit(
                 "You must provide all necessary environment variables. Please reference the Homebrew Releaser documentation."  # noqa
             )
+
+    invalid_checksum_sources = [source for source in CHECKSUM_SOURCES if source not in CHECKSUM_SOURCE_OPTIONS]
+    if invalid_checksum_sources:
+        raise SystemExit(
+            f"Invalid `checksum_source` {', '.join(invalid_checksum_sources)}, it must be a comma separated list of:"
+            f" {', '.join(CHECKSUM_SOURCE_OPTIONS)}."
+        )
     logger.debug("All required environment variables are present.")
 
 
-def _download_archive(url: str, stream: Optional[bool] = False) -> str:
-    """Gets an archive (eg: zip, tar) from GitHub and saves it locally."""
-    response = make_github_get_request(
-        url=url,
-        stream=stream,
+def _commit_formula(
+    formula_filepath: str,
+    version: str,
+    update_readme_table: bool = False,
+    formula: Optional[str] = None,
+):
+    """Commits the formula, and the README if it was updated, to our clone of the Homebrew tap.
+
+    With a single tap checkout, the formula was written straight into our clone and there's nothing to copy. The
+    README table is only updated here, and that formula only written again (from `formula`), when the commit is being
+    made again on top of someone else's. Otherwise both are already in place.
+    """
+    if not SINGLE_TAP_CHECKOUT:
+        copy_formula_file_to_git(formula_filepath, HOMEBREW_TAP)
+    elif formula is not None:
+        write_file(formula_filepath, formula, "w")
+    if update_readme_table:
+        update_readme(HOMEBREW_TAP)
+    add_git(HOMEBREW_TAP)
+    commit_git(HOMEBREW_TAP, GITHUB_REPO, version)
+
+
+def _download_archive(
+    url: str,
+    mirror_url: Optional[str] = None,
+    inspector: Optional[ArchiveInspector] = None,
+) -> str:
+    """Gets an archive (eg: zip, tar) from GitHub, saves it locally, and returns its checksum.
+
+    Public and private archives alike are streamed: private release assets are requested from their API URL as
+    `application/octet-stream`, which redirects to a signed URL that `requests` follows without the GitHub token.
+    The archive is hashed and written to disk chunk by chunk as it downloads so it's only read once, large archives
+    are split into segments that download concurrently (see `download_segmented`) and interrupted downloads are
+    resumed rather than started over (see `download_resumable`). A request that is slow to respond can be raced
+    against a second one to the mirror URL (see `make_hedged_request`). If the checksum cache holds an entry for the
+    URL, the request is made conditionally and the cached checksum is reused when the archive hasn't changed, unless
+    the archive is being inspected (see `ArchiveInspector`) which needs its content.
+    """
+    logger = woodchips.get(LOGGER_NAME)
+
+    cached_checksum_entry = None if inspector else get_cached_checksum_entry(url)
+    response = make_hedged_request(
+        lambda request_url: make_github_get_request(
+            url=request_url,
+            stream=True,
+            headers=get_conditional_headers(cached_checksum_entry),
+        ),
+        url,
+        mirror_url,
     )
-    filename = get_filename_from_path(url)
-    write_file(filename, response.content, "wb")
+    with response:
+        if cached_checksum_entry and is_cached_checksum_current(cached_checksum_entry, response):
+            logger.debug(f"Using cached checksum for {url}.")
+            touch_cached_checksum(url)
+            return cached_checksum_entry["checksum"]
+
+        # The private tarball/zipball endpoints share a last path segment (the tag), keep them apart on disk
+        filename = (
+            "-".join(url.rsplit("/", 2)[1:]) if url.startswith(GITHUB_BASE_API_URL) else get_filename_from_path(url)
+        )
+        if is_segmentable(response):
+            checksum = download_segmented(response, filename, inspector)
+        else:
+            checksum = download_resumable(url, response, filename, inspector)
+
+    cache_checksum(url, response, checksum)
+
+    return checksum
+
+
+def _download_archives(
+    urls: list[str],
+    mirror_urls: Optional[dict[str, str]] = None,
+    inspectors: Optional[dict[str, ArchiveInspector]] = None,
+) -> list[str]:
+    """Downloads archives concurrently and returns their checksums in the same order as the URLs provided."""
+    if not urls:
+        return []
+
+    mirror_urls = mirror_urls or {}
+    inspectors = inspectors or {}
+    with ThreadPoolExecutor(max_workers=min(MAX_DOWNLOAD_WORKERS, len(urls))) as executor:
+        return list(executor.map(lambda url: _download_archive(url, mirror_urls.get(url), inspectors.get(url)), urls))
+
+
+def _plan_archive_urls(archive_urls: list[str], formula_tar_url: str) -> list[str]:
+    """Plans which archives are needed, so nothing the formula or `checksum.txt` won't use gets fetched.
+
+    The formula needs its tarball (custom or auto-generated) and the targets. `checksum.txt` needs every archive
+    when `CHECKSUM_FILE_SCOPE` is `all` (including the zipball) or only the formula's archives when it's `formula`,
+    and nothing extra when `SKIP_CHECKSUM` is set since it won't be uploaded.
+
+    The formula expects its tarball to come first, so a custom tarball moves to the front when the auto-generated
+    tarball (which otherwise leads) isn't needed.
+    """
+    logger = woodchips.get(LOGGER_NAME)
+
+    # The zipball is second and the custom tarball (if used) is last, everything else feeds the formula
+    auto_generated_release_tar_url, auto_generated_release_zip_url = archive_urls[0], archive_urls[1]
+    formula_archive_urls = [
+        archive_url
+        for archive_url in archive_urls
+        if archive_url not in (auto_generated_release_tar_url, auto_generated_release_zip_url)
+        or archive_url == formula_tar_url
+    ]
+
+    if SKIP_CHECKSUM or CHECKSUM_FILE_SCOPE == "formula":
+        planned_archive_urls = formula_archive_urls
+    else:
+        planned_archive_urls = archive_urls
+
+    if auto_generated_release_tar_url not in planned_archive_urls:
+        planned_archive_urls = [formula_tar_url] + [url for url in planned_archive_urls if url != formula_tar_url]
+
+    for archive_url in archive_urls:
+        if archive_url not in planned_archive_urls:
+            logger.debug(f"Skipping {archive_url} as neither the formula nor checksum.txt need it.")
+
+    return planned_archive_urls
+
+
+def _preflight_archive_urls(archive_urls: list[str], assets: ReleaseAssets):
+    """Checks that every release asset we plan to use exists before any heavy work starts.
+
+    Assets listed in the release metadata are known to exist (and their sizes are known) without a request, any
+    other release download URL is checked with a HEAD request, in parallel. Every missing asset is reported at once
+    so a typo'd target doesn't fail the action only after the other archives have been downloaded.
+    """
+    logger = woodchips.get(LOGGER_NAME)
+
+    # Auto-generated tarballs and zipballs exist for every tag, only uploaded release assets can be misnamed
+    release_asset_urls = [archive_url for archive_url in archive_urls if _is_release_asset_url(archive_url)]
+    # Assets load lazily, look them up before handing the rest off to other threads
+    known_assets = {archive_url: assets.get(archive_url) for archive_url in release_asset_urls}
+
+    def _check_archive_url(archive_url: str) -> tuple[Optional[int], Optional[str]]:
+        """Returns the size of an archive and the reason it can't be downloaded, if it can't."""
+        known_asset = known_assets[archive_url]
+        if known_asset:
+            return known_asset.size, None
+
+        try:
+            response = get_session().head(archive_url, headers=GITHUB_HEADERS, allow_redirects=True, timeout=TIMEOUT)
+        except requests.RequestException as error:
+            return None, str(error)
+        if not response.ok:
+            return None, f"{response.status_code} {response.reason}"
+
+        content_length = response.headers.get("Content-Length")
+        return int(content_length) if content_length and content_length.isdigit() else None, None
+
+    if not release_asset_urls:
+        return None
+
+    with ThreadPoolExecutor(max_workers=min(MAX_DOWNLOAD_WORKERS, len(release_asset_urls))) as executor:
+        results = list(executor.map(_check_archive_url, release_asset_urls))
+
+    missing_assets = [f"{url} ({error})" for url, (_, error) in zip(release_asset_urls, results) if error]
+    if missing_assets:
+        raise SystemExit(
+            "The following release assets could not be found, check that your targets and custom tarball match the"
+            " names of the assets uploaded to the release:\n" + "\n".join(missing_assets)
+        )
+
+    total_size = sum(size or 0 for size, _ in results)
+    logger.debug(f"All {len(release_asset_urls)} release assets exist ({total_size} bytes in total).")
+
+
+def _is_release_asset_url(archive_url: str) -> bool:
+    """Checks if an archive URL points at an asset uploaded to the release rather than an auto-generated archive."""
+    return archive_url.startswith(f"{GITHUB_BASE_URL}/{GITHUB_OWNER}/{GITHUB_REPO}/releases/download/")
+
+
+def _get_local_artifact_checksums(target_archive_urls: dict[str, str]) -> dict[str, str]:
+    """Gets the checksums of the artifacts listed in `LOCAL_ARTIFACTS` by hashing them from disk.
+
+    Each line of `LOCAL_ARTIFACTS` maps a target (eg: `darwin-amd64`, `custom-tarball`) to the path of the file
+    that was uploaded to the release for it (eg: `linux-arm64=dist/myrepo-1.0.0-linux-arm64.tar.gz`).
+    """
+    logger = woodchips.get(LOGGER_NAME)
+
+    local_checksums = {}
+    for line in (LOCAL_ARTIFACTS or "").splitlines():
+        if not line.strip():
+            continue
+        target, _, local_artifact_path = (part.strip() for part in line.partition("="))
+        if target not in target_archive_urls:
+            raise SystemExit(f"Local artifact target `{target}` does not match an enabled target or custom tarball.")
+        if not os.path.isfile(local_artifact_path):
+            raise SystemExit(f"Local artifact for `{target}` does not exist at `{local_artifact_path}`.")
+
+        checksum = calculate_file_checksum(local_artifact_path)
+        local_checksums[target_archive_urls[target]] = checksum
+        logger.debug(f"Using checksum of local artifact {local_artifact_path} for {target}: {checksum}")
+
+    return local_checksums
+
+
+def _get_digest_checksums(archive_urls: list[str], assets: ReleaseAssets) -> dict[str, str]:
+    """Gets the SHA-256 checksums GitHub published for the release assets behind each archive URL.
+
+    Only uploaded release assets carry a digest, the auto-generated tarball and zipball are never included.
+    """
+    logger = woodchips.get(LOGGER_NAME)
+
+    digest_checksums = {}
+    for archive_url in archive_urls:
+        asset = assets.get(archive_url) if _is_release_asset_url(archive_url) else None
+        digest = get_asset_digest(asset) if asset else None
+        if digest:
+            digest_checksums[archive_url] = digest
+            logger.debug(f"Using checksum published by GitHub for {archive_url}: {digest}")
+
+    return digest_checksums
+
+
+def _get_manifest_checksums(
+    archive_urls: list[str],
+    assets: ReleaseAssets,
+    private: bool,
+) -> dict[str, str]:
+    """Gets the checksums of release assets from the checksum manifests published alongside them.
+
+    Per-file sidecars (eg: `foo.tar.gz.sha256`) are preferred, then shared manifests (eg: `SHA256SUMS`,
+    `checksums.txt`) are downloaded until every archive has been found. Only the manifests are downloaded.
+    """
+    logger = woodchips.get(LOGGER_NAME)
+
+    # Only release assets can be listed in a manifest, never the auto-generated tarball or zipball
+    remaining_filenames = {
+        get_filename_from_path(archive_url): archive_url
+        for archive_url in archive_urls
+        if _is_release_asset_url(archive_url) and get_filename_from_path(archive_url) in assets
+    }
+
+    def _download_manifest(asset: ReleaseAsset) -> dict[str, str]:
+        if asset.size > MAX_CHECKSUM_MANIFEST_SIZE:
+            logger.debug(f"Skipping {asset.name} as it is too large to be a checksum manifest.")
+            return {}
+        download_url = asset.url if private and asset.url else asset.browser_download_url
+        response = make_github_get_request(url=download_url, stream=True)
+        with response:
+            return parse_checksum_manifest(response.text)
+
+    manifest_checksums = {}
+    for filename in list(remaining_filenames):
+        for extension in CHECKSUM_SIDECAR_EXTENSIONS:
+            sidecar = assets.get(f"{filename}{extension}")
+            if sidecar:
+                # Sidecars often list only a checksum without a filename, the sidecar's name tells us which file it is
+                sidecar_checksums = _download_manifest(sidecar)
+                checksum = sidecar_checksums.get(filename) or sidecar_checksums.get("")
+                if checksum:
+                    manifest_checksums[remaining_filenames.pop(filename)] = checksum
+                    break
+
+    for asset in assets:
+        if not remaining_filenames:
+            break
+        if re.match(CHECKSUM_MANIFEST_PATTERN, asset.name):
+            checksums = _download_manifest(asset)
+            for filename in [filename for filename in remaining_filenames if filename in checksums]:
+                manifest_checksums[remaining_filenames.pop(filename)] = checksums[filename]
+
+    for archive_url, checksum in manifest_checksums.items():
+        logger.debug(f"Using checksum from published manifest for {archive_url}: {checksum}")
+
+    return manifest_checksums
+
+
+def _sample_urls_to_verify(urls: list[str]) -> list[str]:
+    """Picks a random fraction (`CHECKSUM_VERIFY_FRACTION`) of the URLs to download and verify anyway.
+
+    At least one URL is picked whenever verification is enabled and there is something to verify.
+    """
+    if not urls or CHECKSUM_VERIFY_FRACTION <= 0:
+        return []
+
+    sample_size = min(len(urls), max(1, math.ceil(len(urls) * CHECKSUM_VERIFY_FRACTION)))
 
-    return filename
+    return secrets.SystemRandom().sample(urls, sample_size)
 
 
 def main():
@@ -0,0 +1,159 @@
+import posixpath
+import queue
+import re
+import tarfile
+import threading
+from collections.abc import Iterable
+from typing import Optional
+
+import woodchips
+
+from homebrew_releaser.constants import (
+    LOGGER_NAME,
+    MAX_INSPECTION_BACKLOG,
+)
+
+TAR_STREAM_MODES = {
+    ".tar.gz": "r|gz",
+    ".tgz": "r|gz",
+    ".tar.xz": "r|xz",
+    ".tar.bz2": "r|bz2",
+}
+
+LIBRARY_PATTERN = r"\.(?:so(?:\.\d+)*|dylib|a|dll)$"
+
+
+class _ChunkReader:
+    """A read-only file object over the chunks of an archive as they're handed to an `ArchiveInspector`."""
+
+    def __init__(self, chunks: "queue.Queue[Optional[bytes]]"):
+        self._chunks = chunks
+        self._chunk = b""
+        self._position = 0
+        self.eof = False
+
+    def read(self, size: int = -1) -> bytes:
+        parts = []
+        while size != 0 and not self.eof:
+            if self._position >= len(self._chunk):
+                chunk = self._chunks.get()
+                if chunk is None:
+                    self.eof = True
+                else:
+                    self._chunk, self._position = chunk, 0
+                continue
+            end = len(self._chunk) if size < 0 else self._position + size
+            part = self._chunk[self._position : end]
+            self._position += len(part)
+            parts.append(part)
+            if size > 0:
+                size -= len(part)
+
+        return b"".join(parts)
+
+
+class ArchiveInspector:
+    """Lists the files in a tarball from its bytes as they're downloaded and hashed, in the same single pass.
+
+    Chunks handed to `feed` are read by a streaming `tarfile` in the background, nothing is extracted or read a
+    second time. At most `MAX_INSPECTION_BACKLOG` chunks are held while the inspector catches up so memory stays
+    constant, the download waits for it otherwise.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._mode = get_tar_stream_mode(filename)
+        self._chunks: queue.Queue[Optional[bytes]] = queue.Queue(maxsize=MAX_INSPECTION_BACKLOG)
+        self._files: list[tuple[str, int]] = []
+        self._error: Optional[Exception] = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._read_archive, daemon=True)
+        self._thread.start()
+
+    def feed(self, chunk: bytes):
+        """Hands the next chunk of the archive to the inspector."""
+        if not self._closed:
+            self._chunks.put(chunk)
+
+    def abandon(self):
+        """Stops inspecting an archive whose chunks can no longer be fed in order (eg: its download started over)."""
+        if not self._closed:
+            self._error = ValueError("its download started over")
+            self._close()
+
+    def finish(self) -> Optional[list[tuple[str, int]]]:
+        """Waits for the inspection to finish and returns the path and mode of each file, if it succeeded."""
+        logger = woodchips.get(LOGGER_NAME)
+
+        self._close()
+        self._thread.join()
+        if self._error:
+            logger.debug(f"Could not inspect {self.filename}: {self._error}")
+            return None
+
+        return self._files
+
+    def _close(self):
+        if not self._closed:
+            self._closed = True
+            self._chunks.put(None)
+
+    def _read_archive(self):
+        reader = _ChunkReader(self._chunks)
+        try:
+            with tarfile.open(fileobj=reader, mode=self._mode) as archive:  # type: ignore
+                for member in archive:
+                    if member.isfile():
+                        self._files.append((member.name, member.mode))
+        except Exception as error:
+            self._error = error
+        finally:
+            # The end of the tar can come before the end of the compressed stream, or the archive was unreadable.
+            # Keep taking chunks so the download is never left waiting on us
+            while not reader.eof:
+                reader.eof = self._chunks.get() is None
+
+
+def get_tar_stream_mode(filename: str) -> Optional[str]:
+    """Gets the streaming `tarfile` mode for an archive, if it's a tarball we can inspect."""
+    for extension, mode in TAR_STREAM_MODES.items():
+        if filename.endswith(extension):
+            return mode
+
+    return None
+
+
+def generate_install_instructions(archives: Iterable[Iterable[tuple[str, int]]]) -> Optional[str]:
+    """Generates the install block of a formula for the executables, man pages, and shell completions in archives.
+
+    Paths are relative to each archive's top level directory when everything in it is inside one, as Homebrew moves
+    into it before installing. The one install block is used for every target, so files found in several archives
+    (eg: each target's) are only installed once. Only files in the top level or a `bin` directory are executables,
+    anything else with its executable bit set (eg: a shared library) is left alone.
+    """
+    paths: dict[str, int] = {}
+    for files in archives:
+        archive_paths = {posixpath.normpath(name): mode for name, mode in files}
+        top_level_dirs = {path.split("/", 1)[0] for path in archive_paths}
+        if len(top_level_dirs) == 1 and all("/" in path for path in archive_paths):
+            archive_paths = {path.split("/", 1)[1]: mode for path, mode in archive_paths.items()}
+        paths.update(archive_paths)
+
+    executables, man_pages, completions = [], [], []
+    for path, mode in sorted(paths.items()):
+        dirs, filename = posixpath.split(path)
+        stem, extension = posixpath.splitext(filename)
+        man_page_match = re.match(r"^.+\.([1-8])(?:\.gz)?$", filename)
+        in_completions_dir = "completion" in dirs.lower()
+        if man_page_match and any(part.startswith("man") for part in dirs.split("/")):
+            man_pages.append(f'man{man_page_match.group(1)}.install "{path}"')
+        elif extension == ".bash" or (in_completions_dir and "bash" in dirs.split("/")):
+            completions.append(f'bash_completion.install "{path}" => "{stem}"')
+        elif extension == ".zsh" or (in_completions_dir and filename.startswith("_")):
+            completions.append(f'zsh_completion.install "{path}" => "_{stem.lstrip("_")}"')
+        elif extension == ".fish":
+            completions.append(f'fish_completion.install "{path}"')
+        elif mode & 0o111 and dirs in ("", "bin") and not re.search(LIBRARY_PATTERN, filename):
+            executables.append(f'bin.install "{path}"')
+
+    return "\n".join(executables + man_pages + completions) or None
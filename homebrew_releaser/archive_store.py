@@ -0,0 +1,83 @@
+import atexit
+import os
+import shutil
+import tempfile
+import threading
+from typing import (
+    IO,
+    Optional,
+)
+
+import woodchips
+
+from homebrew_releaser.constants import (
+    ARCHIVE_SPOOL_MAX_SIZE,
+    DEBUG,
+    LOGGER_NAME,
+)
+from homebrew_releaser.utils import build_dir_path
+
+
+class ArchiveStore:
+    """Where downloaded archives are kept, which is only as long as it takes to hash them.
+
+    Small archives are held in memory and larger ones spill over into a temporary directory that is removed when
+    the action exits, so repeated runs on a self-hosted runner don't fill its disk. With `DEBUG` on, archives are
+    written to the working directory instead and kept there so they can be inspected.
+    """
+
+    def __init__(self) -> None:
+        self._directory: Optional[str] = None
+        self._lock = threading.Lock()
+
+    @property
+    def directory(self) -> str:
+        """The temporary directory archives are written to, created the first time it's needed."""
+        with self._lock:
+            if self._directory is None:
+                self._directory = tempfile.mkdtemp(prefix="homebrew-releaser-")
+
+            return self._directory
+
+    def open(self, filename: str) -> IO[bytes]:
+        """Opens a file to write an archive to, it's removed as soon as it's closed unless `DEBUG` is on."""
+        if DEBUG:
+            return open(build_dir_path(filename), "w+b")
+
+        return tempfile.SpooledTemporaryFile(max_size=ARCHIVE_SPOOL_MAX_SIZE, dir=self.directory)
+
+    def path(self, filename: str) -> str:
+        """Builds the path to write an archive to when it must be a file on disk (eg: for concurrent writes)."""
+        if DEBUG:
+            return build_dir_path(filename)
+
+        return os.path.join(self.directory, os.path.basename(filename))
+
+    def add(self, filepath: str, filename: str):
+        """Moves a finished archive into the store when `DEBUG` is on, otherwise it's no longer needed."""
+        if DEBUG:
+            shutil.move(filepath, self.path(filename))
+        else:
+            os.remove(filepath)
+
+    def discard(self, filename: str):
+        """Removes an archive written to `path` once it's no longer needed, unless `DEBUG` is on."""
+        if not DEBUG:
+            try:
+                os.remove(self.path(filename))
+            except FileNotFoundError:
+                pass
+
+    def cleanup(self):
+        """Removes the temporary directory along with anything left in it."""
+        logger = woodchips.get(LOGGER_NAME)
+
+        with self._lock:
+            if self._directory is not None:
+                shutil.rmtree(self._directory, ignore_errors=True)
+                logger.debug(f"Removed temporary archive directory {self._directory}.")
+                self._directory = None
+
+
+archive_store = ArchiveStore()
+atexit.register(archive_store.cleanup)
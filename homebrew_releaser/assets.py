@@ -0,0 +1,160 @@
+import re
+from collections.abc import (
+    Iterable,
+    Iterator,
+)
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Optional,
+)
+
+from homebrew_releaser.constants import (
+    TARGET_ARCH_ALIASES,
+    TARGET_ARCHIVE_EXTENSIONS,
+    TARGET_ASSET_PATTERN,
+    TARGET_OS_ALIASES,
+)
+
+
+@dataclass(slots=True)
+class ReleaseAsset:
+    """The parts of a release asset we use, kept instead of the full JSON so releases with many assets stay small."""
+
+    name: str
+    browser_download_url: str
+    url: Optional[str] = None  # The REST API URL, the only way to download an asset of a private repo
+    size: int = 0
+    digest: Optional[str] = None
+
+    @classmethod
+    def from_json(cls, asset: dict[str, Any]) -> "ReleaseAsset":
+        """Builds a release asset from the REST API's JSON (or a GraphQL node reshaped to match it)."""
+        return cls(
+            name=asset["name"],
+            browser_download_url=asset["browser_download_url"],
+            url=asset.get("url"),
+            size=asset.get("size") or 0,
+            digest=asset.get("digest"),
+        )
+
+
+class ReleaseAssets:
+    """The assets of a release, loaded lazily (eg: page by page from the API) only as far as lookups need.
+
+    Assets are indexed by both their name and browser download URL as they load, so each lookup is O(1) once an
+    asset has been seen. Looking up something the release doesn't contain, or iterating over every asset, loads
+    the rest of them.
+    """
+
+    def __init__(self, assets: Iterable[ReleaseAsset]):
+        self._pending_assets = iter(assets)
+        self._loaded_assets: list[ReleaseAsset] = []
+        self._asset_index: dict[str, ReleaseAsset] = {}
+
+    def get(self, name_or_url: str) -> Optional[ReleaseAsset]:
+        """Gets an asset by its name or browser download URL, loading more assets until it's found."""
+        while name_or_url not in self._asset_index and self._load_next_asset():
+            pass
+
+        return self._asset_index.get(name_or_url)
+
+    def __contains__(self, name_or_url: str) -> bool:
+        return self.get(name_or_url) is not None
+
+    def __iter__(self) -> Iterator[ReleaseAsset]:
+        index = 0
+        while index < len(self._loaded_assets) or self._load_next_asset():
+            yield self._loaded_assets[index]
+            index += 1
+
+    def _load_next_asset(self) -> bool:
+        """Loads one more asset into the index, returning False once every asset has been loaded."""
+        asset = next(self._pending_assets, None)
+        if asset is None:
+            return False
+
+        self._loaded_assets.append(asset)
+        self._asset_index.setdefault(asset.name, asset)
+        self._asset_index.setdefault(asset.browser_download_url, asset)
+
+        return True
+
+
+def resolve_target_assets(
+    assets: ReleaseAssets,
+    targets: list[str],
+    repo: str,
+    version: str,
+) -> dict[str, ReleaseAsset]:
+    """Matches release assets to os/arch targets (eg: `darwin-amd64`), returning the asset chosen for each target.
+
+    An asset named `{repo}-{version}-{os}-{arch}.tar.gz` always wins, and when every target has one we stop
+    there without loading the rest of the release's assets. Otherwise assets are matched against
+    `TARGET_ASSET_PATTERN` when set, or any asset naming an alias of the target's os and arch (in any order, eg:
+    `myrepo_1.2.0_Darwin_x86_64.tar.xz` or `myrepo-aarch64-unknown-linux-gnu.zip`) is considered, preferring
+    extensions in the order of `TARGET_ARCHIVE_EXTENSIONS`. Each asset is looked at once, so resolving every target
+    is O(assets).
+    """
+    target_assets = {}
+    for target in targets:
+        conventional_asset = assets.get(f"{repo}-{version}-{target}.tar.gz")
+        if conventional_asset:
+            target_assets[target] = conventional_asset
+
+    target_patterns = {
+        target: _compile_target_pattern(target, repo, version) for target in targets if target not in target_assets
+    }
+    if not target_patterns:
+        return target_assets
+
+    best_matches: dict[str, tuple[int, ReleaseAsset]] = {}
+    for asset in assets:
+        for target, target_pattern in target_patterns.items():
+            if not target_pattern.match(asset.name):
+                continue
+            rank = next(
+                (
+                    index
+                    for index, extension in enumerate(TARGET_ARCHIVE_EXTENSIONS)
+                    if asset.name.lower().endswith(extension)
+                ),
+                len(TARGET_ARCHIVE_EXTENSIONS),
+            )
+            if target not in best_matches or rank < best_matches[target][0]:
+                best_matches[target] = (rank, asset)
+    target_assets.update({target: asset for target, (_, asset) in best_matches.items()})
+
+    return target_assets
+
+
+def _compile_target_pattern(target: str, repo: str, version: str) -> re.Pattern:
+    """Compiles the pattern an asset's name must match to belong to a target.
+
+    `TARGET_ASSET_PATTERN` can use the `{repo}`, `{version}`, `{os}`, `{arch}` and `{ext}` placeholders, the os
+    and arch placeholders match any of their aliases.
+    """
+    target_os, target_arch = target.split("-", 1)
+    os_pattern = "|".join(re.escape(alias) for alias in TARGET_OS_ALIASES[target_os])
+    arch_pattern = "|".join(re.escape(alias) for alias in TARGET_ARCH_ALIASES[target_arch])
+    ext_pattern = "|".join(re.escape(extension) for extension in TARGET_ARCHIVE_EXTENSIONS)
+
+    if TARGET_ASSET_PATTERN:
+        placeholders = {
+            "{repo}": re.escape(repo),
+            "{version}": re.escape(version),
+            "{os}": f"(?:{os_pattern})",
+            "{arch}": f"(?:{arch_pattern})",
+            "{ext}": f"(?:{ext_pattern})",
+        }
+        parts = re.split(r"(\{repo\}|\{version\}|\{os\}|\{arch\}|\{ext\})", TARGET_ASSET_PATTERN)
+        pattern = "".join(placeholders.get(part, re.escape(part)) for part in parts)
+
+        return re.compile(f"(?i)^{pattern}$")
+
+    # Aliases must be whole words of the name so `arm64` doesn't also match eg: `xarm64`
+    boundary_start, boundary_end = r"(?<![a-z0-9])", r"(?![a-z0-9])"
+    return re.compile(
+        rf"(?i)^(?=.*{boundary_start}(?:{os_pattern}){boundary_end})"
+        rf"(?=.*{boundary_start}(?:{arch_pattern}){boundary_end}).*(?:{ext_pattern})$"
+    )
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import threading
+from typing import (
+    Any,
+    Optional,
+)
+
+import requests
+import woodchips
+
+from homebrew_releaser.constants import (
+    CHECKSUM_CACHE_DIR,
+    CHECKSUM_CACHE_MAX_ENTRIES,
+    LOGGER_NAME,
+    MAX_CACHE_SIZE,
+    MAX_CACHED_API_RESPONSE_SIZE,
+)
+
+
+def get_cached_checksum_entry(url: str) -> Optional[dict[str, Any]]:
+    """Gets the cached checksum entry for a URL if the checksum cache is enabled and the URL was cached."""
+    if not CHECKSUM_CACHE_DIR:
+        return None
+
+    try:
+        with open(_build_cache_path("checksums", url), "r") as cache_file:
+            entry = json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+
+    return entry if entry.get("url") == url else None
+
+
+def get_conditional_headers(entry: Optional[dict[str, Any]]) -> dict[str, str]:
+    """Builds the headers used to ask GitHub to skip sending an archive if it hasn't changed since it was cached."""
+    headers = {}
+    if entry:
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+
+    return headers
+
+
+def is_cached_checksum_current(entry: Optional[dict[str, Any]], response: requests.Response) -> bool:
+    """Checks if a cached checksum still describes the archive behind a (conditional) response.
+
+    Some servers ignore conditional headers, so a full response carrying the same validators also counts as a hit.
+    """
+    if not entry:
+        return False
+
+    if response.status_code == 304:
+        return True
+
+    etag = response.headers.get("ETag")
+    content_length = response.headers.get("Content-Length")
+    return bool(etag) and etag == entry.get("etag") and content_length == entry.get("content_length")
+
+
+def cache_checksum(url: str, response: requests.Response, checksum: str):
+    """Caches the checksum of an archive along with the validators needed to revalidate it on a later run.
+
+    Archives without an ETag or Last-Modified header can't be revalidated without downloading them again, so
+    they are not cached.
+    """
+    logger = woodchips.get(LOGGER_NAME)
+
+    if not CHECKSUM_CACHE_DIR:
+        return None
+
+    entry = {
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "content_length": response.headers.get("Content-Length"),
+        "checksum": checksum,
+    }
+    if not entry["etag"] and not entry["last_modified"]:
+        logger.debug(f"Not caching checksum for {url} as it has no validators.")
+        return None
+
+    _write_cache_entry(_build_cache_path("checksums", url), entry)
+    logger.debug(f"Checksum for {url} cached successfully.")
+
+    _evict_cache("checksums")
+
+
+def touch_cached_checksum(url: str):
+    """Marks a cached checksum as recently used so it is the last to be evicted."""
+    if not CHECKSUM_CACHE_DIR:
+        return None
+
+    try:
+        os.utime(_build_cache_path("checksums", url))
+    except OSError:
+        pass
+
+
+def get_cached_api_response(url: str) -> Optional[dict[str, Any]]:
+    """Gets the cached response body and validators of a GitHub API GET request if one was cached."""
+    if not CHECKSUM_CACHE_DIR:
+        return None
+
+    try:
+        with open(_build_cache_path("api", url), "r") as cache_file:
+            entry = json.load(cache_file)
+    except (OSError, ValueError):
+        return None
+
+    return entry if entry.get("url") == url else None
+
+
+def cache_api_response(url: str, response: requests.Response):
+    """Caches the body of a GitHub API response so it can be revalidated with a conditional request later.
+
+    GitHub doesn't count `304 Not Modified` responses against the rate limit, so revalidating is free.
+    """
+    logger = woodchips.get(LOGGER_NAME)
+
+    if not CHECKSUM_CACHE_DIR or response.status_code != 200:
+        return None
+
+    entry = {
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "body": response.text,
+    }
+    # Only JSON metadata is cached, never archives that happen to be fetched without streaming
+    if (not entry["etag"] and not entry["last_modified"]) or "json" not in response.headers.get("Content-Type", ""):
+        return None
+    if len(response.text) > MAX_CACHED_API_RESPONSE_SIZE:
+        logger.debug(f"Not caching the API response for {url} as it's too large.")
+        return None
+
+    _write_cache_entry(_build_cache_path("api", url), entry)
+    logger.debug(f"API response for {url} cached successfully.")
+
+    _evict_cache("api")
+
+
+def _write_cache_entry(cache_path: str, entry: dict[str, Any]):
+    """Writes a cache entry via a temp file so a concurrent reader or an interrupted run never sees a partial one."""
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+
+    temp_cache_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temp_cache_path, "w") as cache_file:
+        json.dump(entry, cache_file)
+    os.replace(temp_cache_path, cache_path)
+
+
+def _evict_cache(kind: str):
+    """Evicts the least recently used entries once a cache grows beyond its maximum number of entries or size.
+
+    Entries are counted against `CHECKSUM_CACHE_MAX_ENTRIES` and their size on disk against `MAX_CACHE_SIZE`, as
+    a few large API responses can take up far more space than many small checksums.
+    """
+    logger = woodchips.get(LOGGER_NAME)
+
+    entries = []
+    for dirpath, _, filenames in os.walk(os.path.join(CHECKSUM_CACHE_DIR, kind)):
+        for filename in filenames:
+            if filename.endswith(".json"):
+                entry_path = os.path.join(dirpath, filename)
+                try:
+                    entries.append((os.path.getmtime(entry_path), os.path.getsize(entry_path), entry_path))
+                except OSError:
+                    continue  # Another download evicted this entry while we were walking the cache
+
+    entry_count = len(entries)
+    total_size = sum(size for _, size, _ in entries)
+    for _, size, entry_path in sorted(entries):
+        if entry_count <= CHECKSUM_CACHE_MAX_ENTRIES and total_size <= MAX_CACHE_SIZE:
+            break
+        entry_count -= 1
+        total_size -= size
+        try:
+            os.remove(entry_path)
+            logger.debug(f"Evicted {entry_path} from the {kind} cache.")
+        except OSError:
+            continue
+
+
+def _build_cache_path(kind: str, url: str) -> str:
+    """Builds the path of a cached entry (eg: a checksum or API response).
+
+    Entries are content-addressed by a hash of their URL and fanned out into subdirectories so the cache
+    directory can be saved and restored as-is with `actions/cache`.
+    """
+    url_hash = hashlib.sha256(url.encode()).hexdigest()
+
+    return os.path.join(CHECKSUM_CACHE_DIR, kind, url_hash[:2], f"{url_hash}.json")
@@ -1,11 +1,19 @@
 import hashlib
-from typing import Any
+import mmap
+import os
+import re
+from typing import (
+    Any,
+    Optional,
+)
 
 import requests
 import woodchips
 
+from homebrew_releaser.assets import ReleaseAsset
 from homebrew_releaser.constants import (
     CHECKSUM_FILE,
+    CHUNK_SIZE,
     GITHUB_HEADERS,
     GITHUB_OWNER,
     GITHUB_REPO,
@@ -13,18 +21,57 @@ from homebrew_releaser.constants import (
     TIMEOUT,
     non_critical_warnings,
 )
-from homebrew_releaser.utils import build_dir_path
+from homebrew_releaser.utils import (
+    build_dir_path,
+    get_session,
+)
 
 
-def calculate_checksum(tar_filepath: str) -> str:
-    """Gets the checksum of a file."""
-    logger = woodchips.get(LOGGER_NAME)
+def calculate_file_checksum(filepath: str) -> str:
+    """Gets the checksum of a file at any path by memory-mapping it and hashing it chunk by chunk.
+
+    Mapping the file lets the OS page it in as we go instead of copying it through read buffers.
+    """
+    sha256 = hashlib.sha256()
+    with open(filepath, "rb") as content:
+        # Empty files can't be memory-mapped
+        if os.fstat(content.fileno()).st_size > 0:
+            with mmap.mmap(content.fileno(), 0, access=mmap.ACCESS_READ) as mapped_content:
+                for offset in range(0, len(mapped_content), CHUNK_SIZE):
+                    sha256.update(mapped_content[offset : offset + CHUNK_SIZE])
+
+    return sha256.hexdigest()
+
+
+def get_asset_digest(asset: ReleaseAsset) -> Optional[str]:
+    """Gets the SHA-256 checksum GitHub published for a release asset (eg: `sha256:abc123`), if it has one."""
+    algorithm, _, checksum = (asset.digest or "").partition(":")
+
+    return checksum if algorithm == "sha256" and checksum else None
+
+
+def parse_checksum_manifest(content: str) -> dict[str, str]:
+    """Parses a checksum manifest into a dictionary of filenames and their SHA-256 checksums.
 
-    with open(build_dir_path(tar_filepath), "rb") as content:
-        checksum = hashlib.sha256(content.read()).hexdigest()
-    logger.debug(f"Checksum for {tar_filepath} generated successfully: {checksum}")
+    Supports GNU coreutils (`<checksum>  <filename>`, `<checksum> *<filename>`) and BSD (`SHA256 (<filename>) =
+    <checksum>`) style lines. Lines that only contain a checksum (common for `.sha256` sidecars) are keyed by an
+    empty filename.
+    """
+    checksums = {}
+    for line in content.splitlines():
+        line = line.strip()
+        bsd_match = re.match(r"^SHA256 \((.+)\) = ([0-9a-fA-F]{64})$", line)
+        gnu_match = re.match(r"^([0-9a-fA-F]{64})(?:\s+\*?(.+))?$", line)
+        if bsd_match:
+            filename, checksum = bsd_match.group(1), bsd_match.group(2)
+        elif gnu_match:
+            checksum, filename = gnu_match.group(1), gnu_match.group(2) or ""
+        else:
+            continue
+        # Manifests sometimes list paths relative to a build directory (eg: `dist/foo.tar.gz`)
+        checksums[filename.strip().rsplit("/", 1)[-1]] = checksum.lower()
 
-    return checksum
+    return checksums
 
 
 def upload_checksum_file(latest_release: dict[str, Any]) -> None:
@@ -41,7 +88,7 @@ def upload_checksum_file(latest_release: dict[str, Any]) -> None:
     headers["Content-Type"] = "text/plain"
 
     try:
-        response = requests.post(
+        response = get_session().post(
             upload_url,
             headers=headers,
             data=checksum_file_content,
@@ -36,24 +36,80 @@ TARGET_DARWIN_ARM64 = _get_bool_env_var("INPUT_TARGET_DARWIN_ARM64")
 TARGET_LINUX_AMD64 = _get_bool_env_var("INPUT_TARGET_LINUX_AMD64")
 TARGET_LINUX_ARM64 = _get_bool_env_var("INPUT_TARGET_LINUX_ARM64")
 CUSTOM_TARBALL = os.getenv("INPUT_CUSTOM_TARBALL")
+TARGET_ASSET_PATTERN = os.getenv("INPUT_TARGET_ASSET_PATTERN")
 UPDATE_README_TABLE = _get_bool_env_var("INPUT_UPDATE_README_TABLE")
 SKIP_COMMIT = _get_bool_env_var("INPUT_SKIP_COMMIT")
 SKIP_CHECKSUM = _get_bool_env_var("INPUT_SKIP_CHECKSUM")
 DEBUG = _get_bool_env_var("INPUT_DEBUG")
 IGNORE_WARNINGS = _get_bool_env_var("INPUT_IGNORE_WARNINGS")
+MAX_RETRIES = int(os.getenv("INPUT_MAX_RETRIES") or 3)
+WARM_UP_CONNECTIONS = _get_bool_env_var("INPUT_WARM_UP_CONNECTIONS")
+CHECKSUM_SOURCES = [
+    checksum_source.strip().lower()
+    for checksum_source in (os.getenv("INPUT_CHECKSUM_SOURCE") or "download").split(",")
+    if checksum_source.strip()
+]
+SEGMENTED_DOWNLOAD_THRESHOLD = int(os.getenv("INPUT_SEGMENTED_DOWNLOAD_THRESHOLD_MB") or 0) * 1024 * 1024
+SEGMENTED_DOWNLOAD_SEGMENTS = int(os.getenv("INPUT_SEGMENTED_DOWNLOAD_SEGMENTS") or 4)
+HEDGE_DOWNLOAD_AFTER = float(os.getenv("INPUT_HEDGE_DOWNLOAD_AFTER_SECONDS") or 0)
+PUBLISH_METHOD = (os.getenv("INPUT_PUBLISH_METHOD") or "git").lower()
+CHECKSUM_FILE_SCOPE = (os.getenv("INPUT_CHECKSUM_FILE_SCOPE") or "all").lower()
+LOCAL_ARTIFACTS = os.getenv("INPUT_LOCAL_ARTIFACTS")
+CHECKSUM_VERIFY_FRACTION = float(os.getenv("INPUT_CHECKSUM_VERIFY_FRACTION") or 0)
+CHECKSUM_CACHE_DIR = os.getenv("INPUT_CHECKSUM_CACHE_DIR", "")
+TAP_MIRROR_DIR = os.getenv("INPUT_TAP_MIRROR_DIR", "")
+SINGLE_TAP_CHECKOUT = _get_bool_env_var("INPUT_SINGLE_TAP_CHECKOUT")
+CHECKSUM_CACHE_MAX_ENTRIES = int(os.getenv("INPUT_CHECKSUM_CACHE_MAX_ENTRIES") or 500)
 
 # App Constants
 LOGGER_NAME = "homebrew-releaser"
 TIMEOUT = 300
 GITHUB_BASE_URL = "https://github.com"
 GITHUB_BASE_API_URL = "https://api.github.com"
+GITHUB_GRAPHQL_URL = f"{GITHUB_BASE_API_URL}/graphql"
 GITHUB_HEADERS = {
     "Accept": "application/vnd.github.v3+json",
     "Agent": "Homebrew Releaser",
     "Authorization": f"Bearer {GITHUB_TOKEN}",
 }
+GITHUB_WARM_UP_URLS = [
+    GITHUB_BASE_API_URL,
+    GITHUB_BASE_URL,
+    "https://codeload.github.com",
+    "https://objects.githubusercontent.com",
+    "https://uploads.github.com",
+]
+RETRY_BACKOFF_FACTOR = 1  # Retries wait 1s, 2s, 4s, etc. between attempts
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+MAX_RATE_LIMIT_WAIT = 300  # Never wait longer than this for the rate limit, let the request fail instead
 CHECKSUM_FILE = "checksum.txt"
+CHECKSUM_SOURCE_OPTIONS = ("download", "digest", "manifest")  # Assets without a published checksum are downloaded
+CHECKSUM_MANIFEST_PATTERN = (
+    r"(?i)^(sha256sums(\.txt)?|.*checksums?\.txt)$"  # eg: SHA256SUMS, myrepo_1.0.0_checksums.txt
+)
+CHECKSUM_SIDECAR_EXTENSIONS = (".sha256", ".sha256sum")
+MAX_CHECKSUM_MANIFEST_SIZE = 1024 * 1024  # Anything larger than this isn't a checksum manifest
+TARGETS = ("darwin-amd64", "darwin-arm64", "linux-amd64", "linux-arm64")
+TARGET_OS_ALIASES = {
+    "darwin": ("darwin", "macos", "osx", "apple-darwin"),
+    "linux": ("linux", "unknown-linux-gnu", "unknown-linux-musl"),
+}
+TARGET_ARCH_ALIASES = {
+    "amd64": ("amd64", "x86_64", "x64"),
+    "arm64": ("arm64", "aarch64"),
+}
+TARGET_ARCHIVE_EXTENSIONS = (".tar.gz", ".tgz", ".tar.xz", ".zip")  # In order of preference
+CHUNK_SIZE = 1024 * 1024  # Archives are streamed and hashed 1 MiB at a time so memory stays constant
+MAX_RELEASE_ASSETS = 100  # The most release assets GitHub returns in one page
+MAX_DOWNLOAD_WORKERS = 8  # Enough to fetch the tarball, zipball, every target, and a custom tarball at once
+ARCHIVE_SPOOL_MAX_SIZE = 16 * 1024 * 1024  # Archives up to 16 MiB are held in memory, larger ones spill to disk
+MAX_CACHE_SIZE = 64 * 1024 * 1024  # Each cache in the checksum cache directory is kept under 64 MiB on disk
+MAX_CACHED_API_RESPONSE_SIZE = 1024 * 1024  # API responses larger than 1 MiB aren't worth the disk, never cache them
+MAX_PART_FILE_AGE = 24 * 60 * 60  # Partial downloads not resumed within a day are evicted from the checksum cache
+MAX_PART_FILES_SIZE = 1024 * 1024 * 1024  # As are the oldest ones once partial downloads take up more than 1 GiB
+MAX_INSPECTION_BACKLOG = 8  # Chunks a download can get ahead of the archive inspector before waiting on it
 WORKING_DIR = os.path.join(os.sep, "app")
+HOMEBREW_TAPS_DIR = os.path.join(os.sep, "home", "linuxbrew", ".linuxbrew", "Homebrew", "Library", "Taps")
 
 # Formula Constants
 ARTICLES = {
@@ -67,3 +123,5 @@ MAX_DESC_FIELD_LENGTH = 80  # `brew audit` wants no more than 80 characters in t
 GITHUB_REPOSITORY = os.getenv("GITHUB_REPOSITORY", "user/repo").split("/")
 GITHUB_OWNER = GITHUB_REPOSITORY[0]
 GITHUB_REPO = GITHUB_REPOSITORY[1]
+GITHUB_EVENT_NAME = os.getenv("GITHUB_EVENT_NAME")
+GITHUB_EVENT_PATH = os.getenv("GITHUB_EVENT_PATH")
@@ -0,0 +1,417 @@
+import fcntl
+import hashlib
+import json
+import math
+import os
+import queue
+import threading
+import time
+from collections.abc import (
+    Callable,
+    Iterable,
+    Iterator,
+)
+from concurrent.futures import ThreadPoolExecutor
+from typing import (
+    IO,
+    Any,
+    Optional,
+)
+
+import requests
+import woodchips
+
+from homebrew_releaser.archive_inspector import ArchiveInspector
+from homebrew_releaser.archive_store import archive_store
+from homebrew_releaser.constants import (
+    CHECKSUM_CACHE_DIR,
+    CHUNK_SIZE,
+    HEDGE_DOWNLOAD_AFTER,
+    LOGGER_NAME,
+    MAX_PART_FILE_AGE,
+    MAX_PART_FILES_SIZE,
+    MAX_RETRIES,
+    SEGMENTED_DOWNLOAD_SEGMENTS,
+    SEGMENTED_DOWNLOAD_THRESHOLD,
+    TIMEOUT,
+)
+from homebrew_releaser.utils import get_session
+
+
+def make_hedged_request(
+    send_request: Callable[[str], requests.Response],
+    url: str,
+    mirror_url: Optional[str] = None,
+) -> requests.Response:
+    """Makes a download request, racing a second one against it if the first is slow to respond.
+
+    If no response has arrived within `HEDGE_DOWNLOAD_AFTER` seconds, the same request is sent to the mirror URL (or
+    to the same URL again, which likely lands on another CDN edge). Whichever responds first is used and the other
+    is closed as soon as it responds, a failure is only raised if both requests fail.
+    """
+    logger = woodchips.get(LOGGER_NAME)
+
+    if not HEDGE_DOWNLOAD_AFTER:
+        return send_request(url)
+
+    outcomes: queue.Queue[tuple[Optional[requests.Response], Optional[Exception]]] = queue.Queue()
+    lock = threading.Lock()
+    settled = [False]
+
+    def _send_request(request_url: str):
+        response, error = None, None
+        try:
+            response = send_request(request_url)
+        except Exception as request_error:
+            error = request_error
+        with lock:
+            if not settled[0]:
+                outcomes.put((response, error))
+            elif response is not None:
+                response.close()  # The race was already won by the other request
+
+    # The losing request can't be interrupted, daemon threads keep it from holding up the action once it's done
+    threading.Thread(target=_send_request, args=(url,), daemon=True).start()
+    requests_sent = 1
+    try:
+        response, error = outcomes.get(timeout=HEDGE_DOWNLOAD_AFTER)
+    except queue.Empty:
+        logger.debug(f"{url} has not responded in {HEDGE_DOWNLOAD_AFTER} seconds, hedging with {mirror_url or url}...")
+        threading.Thread(target=_send_request, args=(mirror_url or url,), daemon=True).start()
+        requests_sent += 1
+        response, error = outcomes.get()
+        if error is not None:
+            logger.debug(f"The first hedged request for {url} failed ({error}), waiting on the other...")
+            response, error = outcomes.get()
+
+    with lock:
+        settled[0] = True
+        while not outcomes.empty():
+            late_response, _ = outcomes.get_nowait()
+            if late_response is not None:
+                late_response.close()
+
+    if error is not None:
+        raise error
+    if requests_sent > 1:
+        logger.debug(f"Hedged request for {url} was answered by {response.url}.")  # type: ignore
+
+    return response  # type: ignore
+
+
+def is_segmentable(response: requests.Response) -> bool:
+    """Checks if a download is large enough to be worth splitting into segments and if the server allows it."""
+    if not SEGMENTED_DOWNLOAD_THRESHOLD or SEGMENTED_DOWNLOAD_SEGMENTS < 2 or response.status_code != 200:
+        return False
+
+    content_length = int(response.headers.get("Content-Length") or 0)
+
+    return content_length > SEGMENTED_DOWNLOAD_THRESHOLD and response.headers.get("Accept-Ranges") == "bytes"
+
+
+def download_segmented(
+    response: requests.Response,
+    filepath: str,
+    inspector: Optional[ArchiveInspector] = None,
+) -> str:
+    """Downloads an archive over several connections at once and returns its checksum.
+
+    The already open response becomes the first segment, the rest of the archive is split into HTTP Range
+    requests that download concurrently into a preallocated file in the archive store. Hashing happens in order as
+    each contiguous prefix of the file completes, so it overlaps the download instead of waiting for it to finish.
+    The hashed chunks are handed to the inspector as well when there is one.
+    """
+    logger = woodchips.get(LOGGER_NAME)
+
+    size = int(response.headers["Content-Length"])
+    segment_size = math.ceil(size / SEGMENTED_DOWNLOAD_SEGMENTS)
+    segment_starts = list(range(0, size, segment_size))
+    segment_progress = [0] * len(segment_starts)  # Bytes of each segment written to disk so far
+    finished_segments = [0]
+    condition = threading.Condition()
+    errors: list[Exception] = []
+
+    def _write_segment(index: int, chunks: Iterator[bytes]):
+        offset = segment_starts[index]
+        try:
+            for chunk in chunks:
+                if errors:
+                    return  # Another segment failed, there is no point in finishing this one
+                os.pwrite(fd, chunk, offset + segment_progress[index])
+                with condition:
+                    segment_progress[index] += len(chunk)
+                    condition.notify_all()
+        except Exception as error:
+            with condition:
+                errors.append(error)
+        finally:
+            with condition:
+                finished_segments[0] += 1
+                condition.notify_all()
+
+    def _download_segment(index: int):
+        start = segment_starts[index]
+        end = min(start + segment_size, size) - 1
+
+        def _segment_chunks() -> Iterator[bytes]:
+            with _request_range(response, start, end) as segment_response:
+                if segment_response.status_code != 206:
+                    raise requests.HTTPError(f"{response.url} ignored the Range request for segment {index}.")
+                yield from segment_response.iter_content(chunk_size=CHUNK_SIZE)
+
+        _write_segment(index, _segment_chunks())
+
+    logger.debug(f"Downloading {filepath} in {len(segment_starts)} segments of up to {segment_size} bytes...")
+    fd = os.open(archive_store.path(filepath), os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.ftruncate(fd, size)
+        sha256 = hashlib.sha256()
+        with ThreadPoolExecutor(max_workers=len(segment_starts)) as executor:
+            # The original response is for the whole archive, only the first segment's worth of it is read
+            executor.submit(
+                _write_segment, 0, _limit_chunks(response.iter_content(chunk_size=CHUNK_SIZE), segment_size)
+            )
+            for index in range(1, len(segment_starts)):
+                executor.submit(_download_segment, index)
+
+            hashed_offset = 0
+            while hashed_offset < size:
+                with condition:
+                    while not errors and _contiguous_end(segment_starts, segment_progress) <= hashed_offset:
+                        if finished_segments[0] == len(segment_starts):
+                            errors.append(requests.ConnectionError(f"{response.url} ended before it was complete."))
+                            break
+                        condition.wait()
+                    if errors:
+                        break
+                    contiguous_end = _contiguous_end(segment_starts, segment_progress)
+                while hashed_offset < contiguous_end:
+                    chunk = os.pread(fd, min(CHUNK_SIZE, contiguous_end - hashed_offset), hashed_offset)
+                    sha256.update(chunk)
+                    if inspector:
+                        inspector.feed(chunk)
+                    hashed_offset += len(chunk)
+    finally:
+        os.close(fd)
+        archive_store.discard(filepath)
+
+    if errors:
+        raise errors[0]
+
+    checksum = sha256.hexdigest()
+    logger.debug(f"{filepath} written successfully.")
+
+    return checksum
+
+
+def download_resumable(
+    url: str,
+    response: requests.Response,
+    filepath: str,
+    inspector: Optional[ArchiveInspector] = None,
+) -> str:
+    """Downloads an archive into the archive store, resuming it if it's interrupted, and returns its checksum.
+
+    If the connection drops or times out partway through, the download resumes with a Range request from where it
+    left off (up to `MAX_RETRIES` times). When the checksum cache directory is configured, the download is written
+    to a `.part` file there along with the archive's validators (ETag, Last-Modified, Content-Length) so it survives
+    across runs: a `.part` file left behind by an earlier run is resumed if the archive hasn't changed since, its
+    prefix is re-hashed from disk instead of being downloaded again. A `.part` file is locked while it's written, a
+    job finding it locked by another one sharing the cache downloads into the archive store instead. Stale `.part`
+    files are evicted (see `_evict_part_files`). Each chunk hashed is handed to the inspector as well when there is
+    one.
+    """
+    logger = woodchips.get(LOGGER_NAME)
+
+    validators = {
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "content_length": response.headers.get("Content-Length"),
+    }
+    resumable = (
+        response.status_code == 200
+        and response.headers.get("Accept-Ranges") == "bytes"
+        and bool(validators["content_length"])
+        and bool(validators["etag"] or validators["last_modified"])
+    )
+
+    sha256 = hashlib.sha256()
+    offset = 0
+    part_path = None
+    part_lock = _lock_part_file(_build_part_path(url)) if CHECKSUM_CACHE_DIR else None
+    if part_lock:
+        part_path = _build_part_path(url)
+        state_path = f"{part_path}.json"
+        if resumable and _load_part_state(state_path) == validators and os.path.exists(part_path):
+            offset = os.path.getsize(part_path)
+            if 0 < offset < int(validators["content_length"]):  # type: ignore
+                logger.debug(f"Resuming {filepath} from byte {offset} left behind by an earlier run...")
+                with open(part_path, "rb") as part_file:
+                    for chunk in iter(lambda: part_file.read(CHUNK_SIZE), b""):
+                        sha256.update(chunk)
+                        if inspector:
+                            inspector.feed(chunk)
+                response.close()
+                response = _request_range(response, offset)
+            else:
+                offset = 0
+
+        os.makedirs(os.path.dirname(part_path), exist_ok=True)
+        with open(state_path, "w") as state_file:
+            json.dump(validators, state_file)
+
+    attempts = 0
+    try:
+        with open(part_path, "r+b" if offset else "wb") if part_path else archive_store.open(filepath) as part_file:
+            while True:
+                try:
+                    if response.status_code == 200 and offset:
+                        # The server sent the whole archive instead of the rest of it (eg: it changed), start over
+                        sha256 = hashlib.sha256()
+                        offset = 0
+                        if inspector:
+                            inspector.abandon()
+                    part_file.seek(offset)
+                    part_file.truncate()
+                    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                        part_file.write(chunk)
+                        sha256.update(chunk)
+                        if inspector:
+                            inspector.feed(chunk)
+                        offset += len(chunk)
+                    if validators["content_length"] and offset < int(validators["content_length"]):  # type: ignore
+                        raise requests.ConnectionError(f"{url} ended after {offset} bytes.")
+                    break
+                except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as error:
+                    attempts += 1
+                    if not resumable or attempts > MAX_RETRIES:
+                        raise
+                    logger.warning(f"Download of {filepath} was interrupted ({error}), resuming from byte {offset}...")
+                    part_file.flush()
+                    response.close()
+                    response = _request_range(response, offset)
+
+        if part_path:
+            os.remove(state_path)
+            archive_store.add(part_path, filepath)
+            os.remove(f"{part_path}.lock")
+    finally:
+        response.close()
+        if part_lock:
+            part_lock.close()
+    if CHECKSUM_CACHE_DIR:
+        _evict_part_files()
+    logger.debug(f"{filepath} written successfully.")
+
+    return sha256.hexdigest()
+
+
+def _request_range(response: requests.Response, start: int, end: Optional[int] = None) -> requests.Response:
+    """Requests a byte range of the resource behind an earlier response.
+
+    Once redirected to a signed URL (eg: objects.githubusercontent.com), the range is requested from there directly
+    and without the GitHub token, otherwise the original request's headers are reused.
+    """
+    headers = {} if response.history else dict(response.request.headers)
+    headers["Range"] = f"bytes={start}-{'' if end is None else end}"
+    if response.headers.get("ETag"):
+        headers["If-Range"] = response.headers["ETag"]
+
+    range_response = get_session().get(response.url, headers=headers, stream=True, timeout=TIMEOUT)
+    range_response.raise_for_status()
+
+    return range_response
+
+
+def _build_part_path(url: str) -> str:
+    """Builds the path of the `.part` file for a download in the checksum cache directory."""
+    return os.path.join(CHECKSUM_CACHE_DIR, "partial", f"{hashlib.sha256(url.encode()).hexdigest()}.part")
+
+
+def _lock_part_file(part_path: str) -> Optional[IO[str]]:
+    """Locks a `.part` file so only one job sharing the checksum cache writes it, returns the lock if we got it."""
+    logger = woodchips.get(LOGGER_NAME)
+
+    os.makedirs(os.path.dirname(part_path), exist_ok=True)
+    while True:
+        lock_file = open(f"{part_path}.lock", "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            logger.debug(f"{part_path} is being written by another job, not resuming it.")
+            lock_file.close()
+            return None
+        # The lock file is removed along with its `.part` file, make sure we didn't lock one that was just removed
+        try:
+            if os.fstat(lock_file.fileno()).st_ino == os.stat(f"{part_path}.lock").st_ino:
+                return lock_file
+        except FileNotFoundError:
+            pass
+        lock_file.close()
+
+
+def _evict_part_files():
+    """Evicts `.part` files from the checksum cache that are stale or take up too much space.
+
+    A failed download would otherwise be kept, and saved with the cache, forever. `.part` files not resumed within
+    `MAX_PART_FILE_AGE` are evicted, as are the oldest ones once they add up to more than `MAX_PART_FILES_SIZE`.
+    Those being written by another job are left alone.
+    """
+    logger = woodchips.get(LOGGER_NAME)
+
+    part_files = []
+    partial_dir = os.path.join(CHECKSUM_CACHE_DIR, "partial")
+    for filename in os.listdir(partial_dir) if os.path.isdir(partial_dir) else []:
+        if filename.endswith(".part"):
+            part_path = os.path.join(partial_dir, filename)
+            try:
+                part_files.append((os.path.getmtime(part_path), os.path.getsize(part_path), part_path))
+            except OSError:
+                continue  # Finished or evicted while we were listing them
+
+    total_size = sum(size for _, size, _ in part_files)
+    for modified_at, size, part_path in sorted(part_files):
+        if modified_at > time.time() - MAX_PART_FILE_AGE and total_size <= MAX_PART_FILES_SIZE:
+            break
+        part_lock = _lock_part_file(part_path)
+        if part_lock:
+            with part_lock:
+                for path in (part_path, f"{part_path}.json", f"{part_path}.lock"):
+                    try:
+                        os.remove(path)
+                    except FileNotFoundError:
+                        pass
+            logger.debug(f"Evicted {part_path} from the checksum cache.")
+        total_size -= size
+
+
+def _load_part_state(state_path: str) -> Optional[dict[str, Any]]:
+    """Loads the validators recorded for a `.part` file, if there are any."""
+    try:
+        with open(state_path, "r") as state_file:
+            return json.load(state_file)
+    except (OSError, ValueError):
+        return None
+
+
+def _contiguous_end(segment_starts: list[int], segment_progress: list[int]) -> int:
+    """Finds how far into the file every byte has been written, moving on to the next segment once one is full."""
+    contiguous_end = 0
+    for index, start in enumerate(segment_starts):
+        contiguous_end = start + segment_progress[index]
+        segment_end = segment_starts[index + 1] if index + 1 < len(segment_starts) else None
+        if segment_end is None or contiguous_end < segment_end:
+            break
+
+    return contiguous_end
+
+
+def _limit_chunks(chunks: Iterable[bytes], limit: int) -> Iterator[bytes]:
+    """Yields chunks until `limit` bytes have been yielded, trimming the last chunk to fit."""
+    remaining = limit
+    for chunk in chunks:
+        yield chunk[:remaining]
+        remaining -= len(chunk)
+        if remaining <= 0:
+            break
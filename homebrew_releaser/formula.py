@@ -18,6 +18,7 @@ from homebrew_releaser.constants import (
     TARGET_DARWIN_ARM64,
     TARGET_LINUX_AMD64,
     TARGET_LINUX_ARM64,
+    TARGETS,
 )
 
 
@@ -93,6 +94,10 @@ def generate_formula_data(
         checksum_filename = next(iter(checksum))
         checksum_url = checksum[checksum_filename]["url"]  # type: ignore
         checksum_value = checksum[checksum_filename]["checksum"]  # type: ignore
+        # Targets resolved from the release's assets can be named anything, otherwise fall back to the URL pattern
+        checksum_target = checksum[checksum_filename].get("target") or next(  # type: ignore
+            (target for target in TARGETS if checksum_url.endswith(f"{target}.tar.gz")), None
+        )
 
         # Autogenerated tar URL is always the first entry
         if index == 0:
@@ -103,16 +108,16 @@ def generate_formula_data(
         if CUSTOM_TARBALL and re.search(rf".*/download/[^/]+/{re.escape(CUSTOM_TARBALL)}\.tar\.gz$", checksum_url):
             tar_url_checksum = checksum_value  # type: ignore
 
-        if checksum_url.endswith("darwin-amd64.tar.gz") and TARGET_DARWIN_AMD64:
+        if checksum_target == "darwin-amd64" and TARGET_DARWIN_AMD64:
             darwin_amd64_url = checksum_url
             darwin_amd64_checksum = checksum_value  # type: ignore
-        elif checksum_url.endswith("darwin-arm64.tar.gz") and TARGET_DARWIN_ARM64:
+        elif checksum_target == "darwin-arm64" and TARGET_DARWIN_ARM64:
             darwin_arm64_url = checksum_url
             darwin_arm64_checksum = checksum_value  # type: ignore
-        elif checksum_url.endswith("linux-amd64.tar.gz") and TARGET_LINUX_AMD64:
+        elif checksum_target == "linux-amd64" and TARGET_LINUX_AMD64:
             linux_amd64_url = checksum_url
             linux_amd64_checksum = checksum_value  # type: ignore
-        elif checksum_url.endswith("linux-arm64.tar.gz") and TARGET_LINUX_ARM64:
+        elif checksum_target == "linux-arm64" and TARGET_LINUX_ARM64:
             linux_arm64_url = checksum_url
             linux_arm64_checksum = checksum_value  # type: ignore
 
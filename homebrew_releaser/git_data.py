@@ -0,0 +1,69 @@
+import base64
+from typing import Optional
+
+import woodchips
+
+from homebrew_releaser.constants import (
+    GITHUB_BASE_API_URL,
+    LOGGER_NAME,
+    non_critical_warnings,
+)
+from homebrew_releaser.utils import (
+    make_github_get_request,
+    make_github_json_request,
+)
+
+
+def publish_files(
+    homebrew_owner: str,
+    homebrew_tap: str,
+    files: dict[str, bytes],
+    message: str,
+    commit_owner: str,
+    commit_email: str,
+    branch: Optional[str] = None,
+) -> Optional[str]:
+    """Commits files to the Homebrew tap through the GitHub Git Data API, without cloning it or a working copy.
+
+    1) Read the head commit of the branch (the tap's default branch if not provided)
+    2) Create a blob for each file
+    3) Create a tree of the blobs on top of the head commit's tree
+    4) Create a commit of the tree whose parent is the head commit
+    5) Fast-forward the branch to the new commit
+
+    Returns the SHA of the new commit, or `None` if the files were already up to date.
+    """
+    logger = woodchips.get(LOGGER_NAME)
+
+    repo_url = f"{GITHUB_BASE_API_URL}/repos/{homebrew_owner}/{homebrew_tap}"
+    branch = branch or make_github_get_request(url=repo_url).json()["default_branch"]
+    head_sha = make_github_get_request(url=f"{repo_url}/git/ref/heads/{branch}").json()["object"]["sha"]
+    base_tree_sha = make_github_get_request(url=f"{repo_url}/git/commits/{head_sha}").json()["tree"]["sha"]
+
+    tree_entries = []
+    for path, content in files.items():
+        blob = make_github_json_request(
+            "POST",
+            f"{repo_url}/git/blobs",
+            {"content": base64.b64encode(content).decode(), "encoding": "base64"},
+        )
+        tree_entries.append({"path": path, "mode": "100644", "type": "blob", "sha": blob["sha"]})
+
+    tree = make_github_json_request("POST", f"{repo_url}/git/trees", {"base_tree": base_tree_sha, "tree": tree_entries})
+    if tree["sha"] == base_tree_sha:
+        warning = "No changes to commit."
+        logger.warning(warning)
+        non_critical_warnings.append(warning)
+        return None
+
+    author = {"name": commit_owner, "email": commit_email}
+    commit = make_github_json_request(
+        "POST",
+        f"{repo_url}/git/commits",
+        {"message": message, "tree": tree["sha"], "parents": [head_sha], "author": author, "committer": author},
+    )
+    # Without `force`, GitHub refuses to move the branch unless it's a fast-forward from the head we built on
+    make_github_json_request("PATCH", f"{repo_url}/git/refs/heads/{branch}", {"sha": commit["sha"], "force": False})
+    logger.debug(f"Committed {', '.join(files)} to {homebrew_tap}@{branch} as {commit['sha']}.")
+
+    return commit["sha"]
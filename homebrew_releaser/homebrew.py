@@ -1,9 +1,11 @@
+import os
 import shutil
 import subprocess  # nosec B404
 
 import woodchips
 
 from homebrew_releaser.constants import (
+    HOMEBREW_TAPS_DIR,
     LOGGER_NAME,
     TIMEOUT,
 )
@@ -51,6 +53,23 @@ def setup_homebrew_tap(homebrew_owner: str, homebrew_tap: str) -> None:
         raise SystemExit(f"An error occurred while setting up Homebrew tap: {error_output}")
 
 
+def link_homebrew_tap(homebrew_owner: str, homebrew_tap: str, tap_path: str) -> None:
+    """Sets up the Homebrew tap from our clone of it by linking it into Homebrew's taps, instead of cloning it again."""
+    logger = woodchips.get(LOGGER_NAME)
+
+    homebrew_tap_path = os.path.join(HOMEBREW_TAPS_DIR, homebrew_owner, homebrew_tap)
+    if os.path.islink(homebrew_tap_path):
+        os.remove(homebrew_tap_path)
+    elif os.path.exists(homebrew_tap_path):
+        raise SystemExit(
+            f"An error occurred while setting up Homebrew tap: {homebrew_owner}/{homebrew_tap} is already tapped."
+        )
+
+    os.makedirs(os.path.dirname(homebrew_tap_path), exist_ok=True)
+    os.symlink(tap_path, homebrew_tap_path)
+    logger.info("Set up Homebrew tap successfully.")
+
+
 def get_homebrew_version() -> str:
     """Gets the Homebrew version in use."""
     brew_path = shutil.which("brew")
@@ -0,0 +1,185 @@
+import json
+from collections.abc import Iterator
+from typing import (
+    Any,
+    Optional,
+)
+
+import requests
+import woodchips
+
+from homebrew_releaser.assets import (
+    ReleaseAsset,
+    ReleaseAssets,
+)
+from homebrew_releaser.constants import (
+    CHECKSUM_SOURCES,
+    GITHUB_BASE_API_URL,
+    GITHUB_EVENT_NAME,
+    GITHUB_EVENT_PATH,
+    LOGGER_NAME,
+    MAX_RELEASE_ASSETS,
+)
+from homebrew_releaser.utils import (
+    make_github_get_request,
+    make_github_graphql_request,
+)
+
+RELEASE_METADATA_QUERY = """
+query($owner: String!, $repo: String!, $assetCount: Int!) {
+  repository(owner: $owner, name: $repo) {
+    name
+    description
+    isPrivate
+    licenseInfo {
+      spdxId
+    }
+    latestRelease {
+      databaseId
+      tagName
+      releaseAssets(first: $assetCount) {
+        pageInfo {
+          hasNextPage
+        }
+        nodes {
+          databaseId
+          name
+          downloadUrl
+          size
+          contentType%s
+        }
+      }
+    }
+  }
+}
+"""
+
+
+def get_release_metadata(owner: str, repo: str) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Gets the repository and its latest release, whose assets are loaded lazily (see `ReleaseAssets`).
+
+    When the workflow was triggered by a release being published, both are already on disk in the event payload
+    and only the assets are requested (see `_load_release_event`). Otherwise they are fetched in a single GraphQL
+    round trip. The GraphQL response is reshaped to match the REST API's repository and release objects so the
+    rest of the action doesn't need to know where they came from. If GraphQL is unavailable (eg: a GitHub
+    Enterprise Server without it) or can't describe everything we need, we fall back to the REST API.
+    """
+    logger = woodchips.get(LOGGER_NAME)
+
+    release_event = _load_release_event(owner, repo)
+    if release_event:
+        logger.debug("Release metadata loaded from the release event that triggered the workflow.")
+        return release_event
+
+    try:
+        # Only ask for digests when we'll use them, it's the newest field in the query
+        query = RELEASE_METADATA_QUERY % ("\n          digest" if "digest" in CHECKSUM_SOURCES else "")
+        data = make_github_graphql_request(
+            query,
+            {"owner": owner, "repo": repo, "assetCount": MAX_RELEASE_ASSETS},
+        )
+    except (requests.RequestException, ValueError) as error:
+        logger.warning(f"Could not get release metadata from GitHub's GraphQL API, falling back to REST: {error}")
+        return _get_rest_release_metadata(owner, repo)
+
+    graphql_repository = data.get("repository") or {}
+    graphql_release = graphql_repository.get("latestRelease")
+    if not graphql_release:
+        logger.debug("GraphQL could not describe the latest release, falling back to REST.")
+        return _get_rest_release_metadata(owner, repo)
+
+    repository = {
+        "name": graphql_repository["name"],
+        "description": graphql_repository["description"],
+        "private": graphql_repository["isPrivate"],
+        "license": (
+            {"spdx_id": graphql_repository["licenseInfo"]["spdxId"]} if graphql_repository["licenseInfo"] else None
+        ),
+    }
+    latest_release = {
+        "id": graphql_release["databaseId"],
+        "tag_name": graphql_release["tagName"],
+    }
+    if repository["private"] or graphql_release["releaseAssets"]["pageInfo"]["hasNextPage"]:
+        # Private assets can only be downloaded through their REST API URL, which is listed through REST rather than
+        # built from GraphQL's ids. Releases with more assets than fit in the query are paged through as well
+        latest_release["assets"] = ReleaseAssets(iter_release_assets(owner, repo, latest_release["id"]))
+    else:
+        latest_release["assets"] = ReleaseAssets(
+            ReleaseAsset(
+                name=asset["name"],
+                browser_download_url=asset["downloadUrl"],
+                # GraphQL doesn't expose the asset's REST API URL, hedged downloads race it against `downloadUrl`
+                url=f"{GITHUB_BASE_API_URL}/repos/{owner}/{repo}/releases/assets/{asset['databaseId']}",
+                size=asset["size"],
+                digest=asset.get("digest"),
+            )
+            for asset in graphql_release["releaseAssets"]["nodes"]
+        )
+    logger.debug("Release metadata retrieved from GitHub's GraphQL API.")
+
+    return repository, latest_release
+
+
+def iter_release_assets(owner: str, repo: str, release_id: int) -> Iterator[ReleaseAsset]:
+    """Pages through the assets of a release lazily, the next page is only requested once the last one is used up."""
+    page = 1
+    while True:
+        page_assets = make_github_get_request(
+            url=f"{GITHUB_BASE_API_URL}/repos/{owner}/{repo}/releases/{release_id}/assets"
+            f"?per_page={MAX_RELEASE_ASSETS}&page={page}"
+        ).json()
+        for asset in page_assets:
+            yield ReleaseAsset.from_json(asset)
+        if len(page_assets) < MAX_RELEASE_ASSETS:
+            return None
+        page += 1
+
+
+def _load_release_event(owner: str, repo: str) -> Optional[tuple[dict[str, Any], dict[str, Any]]]:
+    """Loads the repository and release from the payload of the release event that triggered the workflow.
+
+    The payload is only used if it's for this repository and for a published, non-prerelease release, the same
+    release `/releases/latest` would return. Using it also means we build the release that triggered the workflow
+    even if another one was published in the meantime. The assets in the payload are ignored: they were captured
+    when the release was published, often before the workflow built and uploaded them, so they're paged through.
+    """
+    logger = woodchips.get(LOGGER_NAME)
+
+    if GITHUB_EVENT_NAME != "release" or not GITHUB_EVENT_PATH:
+        return None
+
+    try:
+        with open(GITHUB_EVENT_PATH, "r") as event_file:
+            event = json.load(event_file)
+    except (OSError, ValueError) as error:
+        logger.debug(f"Could not load the release event payload: {error}")
+        return None
+
+    repository = event.get("repository") or {}
+    release = event.get("release") or {}
+    if (
+        repository.get("full_name", "").lower() != f"{owner}/{repo}".lower()
+        or event.get("action") not in {"published", "released"}
+        or release.get("draft")
+        or release.get("prerelease")
+    ):
+        logger.debug("The release event payload is not for the latest release of this repository, ignoring it.")
+        return None
+    latest_release = {
+        "id": release["id"],
+        "tag_name": release["tag_name"],
+        "assets": ReleaseAssets(iter_release_assets(owner, repo, release["id"])),
+    }
+
+    return repository, latest_release
+
+
+def _get_rest_release_metadata(owner: str, repo: str) -> tuple[dict[str, Any], dict[str, Any]]:
+    """Gets the repository and its latest release from the REST API."""
+    repository = make_github_get_request(url=f"{GITHUB_BASE_API_URL}/repos/{owner}/{repo}").json()
+    latest_release = make_github_get_request(url=f"{GITHUB_BASE_API_URL}/repos/{owner}/{repo}/releases/latest").json()
+    # The assets embedded in the release can be cut short for large releases, page through all of them instead
+    latest_release["assets"] = ReleaseAssets(iter_release_assets(owner, repo, latest_release["id"]))
+
+    return repository, latest_release
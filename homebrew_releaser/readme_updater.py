@@ -16,9 +16,11 @@ TABLE_START_TAG = "<!-- project_table_start -->"
 TABLE_END_TAG = "<!-- project_table_end -->"
 
 
-def update_readme(homebrew_tap: str):
+def update_readme(homebrew_tap: str) -> Optional[str]:
     """Updates the homebrew tap README by replacing the old table string
     with the updated table string if it can be found.
+
+    Returns the path of the README if it was updated.
     """
     old_table, found_old_table = _retrieve_old_table(homebrew_tap)
 
@@ -30,6 +32,10 @@ def update_readme(homebrew_tap: str):
         readme_content = _read_current_readme(homebrew_tap)
         _replace_table_contents(readme_content, old_table, new_table, homebrew_tap)
 
+        return _does_readme_exist(homebrew_tap)
+
+    return None
+
 
 def _format_formula_data(homebrew_tap: str) -> list[dict[str, Any]]:
     """Retrieve the name, description, and homepage from each
@@ -1,38 +1,253 @@
+import functools
+import io
 import os
-from typing import Optional
+import threading
+import time
+from collections.abc import Callable
+from typing import (
+    Any,
+    Optional,
+)
 
 import requests
 import woodchips
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+from homebrew_releaser.cache import (
+    cache_api_response,
+    get_cached_api_response,
+    get_conditional_headers,
+)
 from homebrew_releaser.constants import (
+    GITHUB_GRAPHQL_URL,
     GITHUB_HEADERS,
+    GITHUB_WARM_UP_URLS,
     LOGGER_NAME,
+    MAX_DOWNLOAD_WORKERS,
+    MAX_RATE_LIMIT_WAIT,
+    MAX_RETRIES,
+    RETRY_BACKOFF_FACTOR,
+    RETRY_STATUS_CODES,
+    SEGMENTED_DOWNLOAD_SEGMENTS,
     TIMEOUT,
     WORKING_DIR,
 )
 
+_rate_limit_lock = threading.Lock()
+# When we can make the next request (epoch seconds) for each of GitHub's rate limits (eg: `core`, `graphql`), which
+# are separate budgets, so running out of one never holds up requests counted against another
+_rate_limits: dict[str, float] = {}
+
+
+@functools.cache
+def get_session() -> requests.Session:
+    """Gets the shared HTTP session so connections to each GitHub host are pooled and kept alive.
+
+    Idempotent requests that fail with a connection error, rate limit, or server error are retried with an
+    exponential backoff (respecting `Retry-After`) before the final response is handed back to the caller.
+    """
+    retry = Retry(
+        total=MAX_RETRIES,
+        backoff_factor=RETRY_BACKOFF_FACTOR,
+        status_forcelist=RETRY_STATUS_CODES,
+        respect_retry_after_header=True,
+        raise_on_status=False,  # Let `raise_for_status` surface the final error like any other failed request
+    )
+    # Each concurrent download (and each of its segments) needs its own connection to a host
+    adapter = HTTPAdapter(pool_maxsize=MAX_DOWNLOAD_WORKERS * max(SEGMENTED_DOWNLOAD_SEGMENTS, 1), max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return session
 
-def make_github_get_request(url: str, stream: Optional[bool] = False) -> requests.Response:
-    """Make an HTTP GET request."""
+
+def warm_up_connections():
+    """Opens connections to the GitHub hosts we'll talk to in the background so later requests skip the handshake.
+
+    Warming up is best effort, any failure here is left for the real request to surface.
+    """
     logger = woodchips.get(LOGGER_NAME)
 
-    headers = GITHUB_HEADERS.copy()
+    def _warm_up(url: str):
+        try:
+            get_session().head(url, timeout=TIMEOUT)
+            logger.debug(f"Connection to {url} warmed up successfully.")
+        except requests.RequestException as error:
+            logger.debug(f"Could not warm up connection to {url}: {error}")
+
+    for url in GITHUB_WARM_UP_URLS:
+        threading.Thread(target=_warm_up, args=(url,), daemon=True).start()
+
+
+def make_github_get_request(
+    url: str,
+    stream: Optional[bool] = False,
+    headers: Optional[dict[str, str]] = None,
+) -> requests.Response:
+    """Make an HTTP GET request, optionally with extra headers (eg: conditional request headers).
+
+    API responses are cached when the cache directory is set and later revalidated with a conditional request,
+    a `304 Not Modified` response is answered from the cache without counting against the rate limit.
+    """
+    logger = woodchips.get(LOGGER_NAME)
+
+    request_headers = GITHUB_HEADERS.copy()
     if stream:
-        headers["Accept"] = "application/octet-stream"
-
-    response = requests.get(
-        url,
-        headers=headers,
-        allow_redirects=True,  # We need to allow redirects to reach various GitHub resources
-        stream=stream,
-        timeout=TIMEOUT,
+        request_headers["Accept"] = "application/octet-stream"
+    if headers:
+        request_headers.update(headers)
+
+    # Archives are cached by checksum instead (see `cache.py`), only API metadata is worth keeping whole
+    cached_response = None if stream or headers else get_cached_api_response(url)
+    request_headers.update(get_conditional_headers(cached_response))
+
+    response = _make_rate_limited_request(
+        lambda: get_session().get(
+            url,
+            headers=request_headers,
+            allow_redirects=True,  # We need to allow redirects to reach various GitHub resources
+            stream=stream,
+            timeout=TIMEOUT,
+        )
     )
-    response.raise_for_status()
+    if cached_response and response.status_code == 304:
+        logger.debug(f"{url} has not changed, using the cached response.")
+        response = _build_cached_response(response, cached_response["body"])
+    else:
+        response.raise_for_status()
+        if not stream and not headers:
+            cache_api_response(url, response)
     logger.debug(f"HTTP GET request made successfully to {url}.")
 
     return response
 
 
+def make_github_graphql_request(query: str, variables: dict[str, Any]) -> dict[str, Any]:
+    """Make a GitHub GraphQL request and return its data, raising if GitHub reports any errors."""
+    logger = woodchips.get(LOGGER_NAME)
+
+    response = _make_rate_limited_request(
+        lambda: get_session().post(
+            GITHUB_GRAPHQL_URL,
+            headers=GITHUB_HEADERS,
+            json={"query": query, "variables": variables},
+            timeout=TIMEOUT,
+        ),
+        "graphql",
+    )
+    response.raise_for_status()
+    response_json = response.json()
+    if response_json.get("errors"):
+        raise requests.HTTPError(f"GitHub GraphQL request failed: {response_json['errors']}", response=response)
+    logger.debug("GraphQL request made successfully to GitHub.")
+
+    return response_json["data"]
+
+
+def make_github_json_request(method: str, url: str, payload: dict[str, Any]) -> dict[str, Any]:
+    """Make a GitHub REST API request with a JSON body (eg: to create git objects) and return its JSON response."""
+    logger = woodchips.get(LOGGER_NAME)
+
+    response = _make_rate_limited_request(
+        lambda: get_session().request(
+            method,
+            url,
+            headers=GITHUB_HEADERS,
+            json=payload,
+            timeout=TIMEOUT,
+        )
+    )
+    response.raise_for_status()
+    logger.debug(f"HTTP {method} request made successfully to {url}.")
+
+    return response.json()
+
+
+def _make_rate_limited_request(
+    send_request: Callable[[], requests.Response],
+    resource: str = "core",
+) -> requests.Response:
+    """Makes a request to the GitHub API while staying within the rate limit of its resource (eg: `core`).
+
+    Requests only wait once the rate limit has run out, until it resets, or when GitHub asks us to with
+    `Retry-After`. A request refused by a secondary rate limit is retried once after waiting as long as GitHub asks
+    (primary limits and 429s are already retried by the session).
+    """
+    _wait_for_rate_limit(resource)
+    response = send_request()
+    _record_rate_limit(response, resource)
+
+    if response.status_code == 403 and _get_int_header(response, "Retry-After") is not None:
+        _wait_for_rate_limit(resource)
+        response = send_request()
+        _record_rate_limit(response, resource)
+
+    return response
+
+
+def _wait_for_rate_limit(resource: str):
+    """Waits until we are allowed to make another request counted against a GitHub API rate limit."""
+    logger = woodchips.get(LOGGER_NAME)
+
+    with _rate_limit_lock:
+        wait = _rate_limits.get(resource, 0) - time.time()
+
+    if wait > 0:
+        logger.warning(f"Waiting {wait:.1f} seconds for the GitHub API {resource} rate limit...")
+        time.sleep(min(wait, MAX_RATE_LIMIT_WAIT))
+
+
+def _record_rate_limit(response: requests.Response, resource: str):
+    """Records when a GitHub API rate limit lets us make the next request, if it ran out or GitHub asked us to wait.
+
+    GitHub reports which rate limit a response counted against, falling back to the one we expected.
+    """
+    logger = woodchips.get(LOGGER_NAME)
+
+    remaining = _get_int_header(response, "X-RateLimit-Remaining")
+    reset_at = _get_int_header(response, "X-RateLimit-Reset")
+    retry_after = _get_int_header(response, "Retry-After")
+    if remaining is None and retry_after is None:
+        return None  # Not an API response (eg: an archive download), there is no limit to track
+
+    resource = str(response.headers.get("X-RateLimit-Resource") or resource)
+    with _rate_limit_lock:
+        if retry_after is not None:
+            _rate_limits[resource] = time.time() + retry_after
+        elif remaining == 0 and reset_at is not None:
+            _rate_limits[resource] = reset_at
+        else:
+            _rate_limits.pop(resource, None)
+
+    logger.debug(
+        f"GitHub API rate limit headroom: {remaining}/{response.headers.get('X-RateLimit-Limit')} requests remaining"
+        f" for {resource}" + (f", retry after {retry_after} seconds." if retry_after else ".")
+    )
+
+
+def _build_cached_response(response: requests.Response, body: str) -> requests.Response:
+    """Builds a response serving a cached body in place of the `304 Not Modified` response that revalidated it."""
+    cached_response = requests.Response()
+    cached_response.status_code = 200
+    cached_response.headers = response.headers
+    cached_response.url = response.url
+    cached_response.request = response.request
+    cached_response.encoding = "utf-8"
+    cached_response.raw = io.BytesIO(body.encode())
+
+    return cached_response
+
+
+def _get_int_header(response: requests.Response, name: str) -> Optional[int]:
+    """Gets a header as an integer, if it's present and is one."""
+    value = str(response.headers.get(name))
+
+    return int(value) if value.isdigit() else None
+
+
 def write_file(file_path: str, content: str | bytes, mode: str = "w"):
     """Writes content to a file."""
     logger = woodchips.get(LOGGER_NAME)
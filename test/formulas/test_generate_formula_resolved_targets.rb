@@ -0,0 +1,29 @@
+# typed: true
+# frozen_string_literal: true
+
+# This file was generated by Homebrew Releaser. DO NOT EDIT.
+class TestGenerateFormulaResolvedTargets < Formula
+  desc "Release scripts, binaries, and executables to github"
+  homepage "https://github.com/Justintime50/test-generate-formula-resolved-targets"
+  url "https://github.com/Justintime50/test-generate-formula-resolved-targets/archive/refs/tags/v0.1.0.tar.gz"
+  sha256 "0000000000000000000000000000000000000000000000000000000000000000"
+  license "MIT"
+
+  on_macos do
+    on_intel do
+      url "https://github.com/justintime50/test-generate-formula-resolved-targets/releases/download/0.1.0/test-generate-formula-resolved-targets_0.1.0_Darwin_x86_64.tar.xz"
+      sha256 "0000000000000000000000000000000000000000000000000000000000000000"
+    end
+  end
+
+  on_linux do
+    on_arm do
+      url "https://github.com/justintime50/test-generate-formula-resolved-targets/releases/download/0.1.0/test-generate-formula-resolved-targets-aarch64-unknown-linux-gnu.zip"
+      sha256 "0000000000000000000000000000000000000000000000000000000000000000"
+    end
+  end
+
+  def install
+    bin.install "src/secure-browser-kiosk.sh" => "secure-browser-kiosk"
+  end
+end
@@ -1,6 +1,139 @@
+import hashlib
+import re
+import threading
+from http.server import (
+    BaseHTTPRequestHandler,
+    ThreadingHTTPServer,
+)
+
 import pytest
 
+from homebrew_releaser import utils
+
+GENERATED_BLOCK = bytes(range(256)) * 4096  # 1 MiB
+
+
+@pytest.fixture(autouse=True)
+def reset_rate_limit():
+    """Forgets the GitHub API rate limit recorded by a test so it can't throttle the next one."""
+    yield
+
+    utils._rate_limits.clear()
+
+
+class _LocalServerHandler(BaseHTTPRequestHandler):
+    """Serves the files registered on the server, honoring single `bytes=start-end` Range requests.
+
+    Each file gets an ETag derived from its content so `If-Range` and `If-None-Match` work, and the Content-Type
+    registered for it in `server.content_types`. A path registered in `server.drop_after`
+    has its connection dropped after that many bytes of the body, once. A path registered in `server.redirects` is
+    redirected to the URL registered for it, and one registered in `server.generated` serves that many bytes of
+    `GENERATED_BLOCK` over and over without holding them in memory. POST and PATCH requests (eg: GraphQL) are
+    answered with the content registered for their path and their bodies are kept in `server.request_bodies`.
+    """
+
+    def do_GET(self):
+        self.server.requests.append((self.command, self.path, dict(self.headers)))  # type: ignore
+        if self.path in self.server.redirects:  # type: ignore
+            self.send_response(302)
+            self.send_header("Location", self.server.redirects[self.path])  # type: ignore
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path in self.server.generated:  # type: ignore
+            self._send_generated(self.server.generated[self.path])  # type: ignore
+            return
+
+        content = self.server.files.get(self.path)  # type: ignore
+        if content is None:
+            self.send_error(404)
+            return
+
+        etag = f'"{hashlib.sha256(content).hexdigest()}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        status = 200
+        start, end = 0, len(content) - 1
+        range_match = re.match(r"^bytes=(\d+)-(\d*)$", self.headers.get("Range", ""))
+        if range_match and self.headers.get("If-Range", etag) == etag:
+            status = 206
+            start = int(range_match.group(1))
+            end = min(int(range_match.group(2) or end), end)
+
+        self.send_response(status)
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        self.send_header("Content-Type", self.server.content_types.get(self.path, "application/octet-stream"))  # type: ignore
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{len(content)}")
+        self.end_headers()
+        drop_after = self.server.drop_after.pop(self.path, None)  # type: ignore
+        if drop_after is not None:
+            self.wfile.write(content[start : start + drop_after])
+            self.close_connection = True
+            return
+        self.wfile.write(content[start : end + 1])
+
+    def _send_generated(self, size: int):
+        self.send_response(200)
+        self.send_header("Content-Length", str(size))
+        self.send_header("Content-Type", "application/octet-stream")
+        self.end_headers()
+        for offset in range(0, size, len(GENERATED_BLOCK)):
+            self.wfile.write(GENERATED_BLOCK[: size - offset])
+
+    def do_HEAD(self):
+        self.server.requests.append((self.command, self.path, dict(self.headers)))  # type: ignore
+        content = self.server.files.get(self.path)  # type: ignore
+        if content is None:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+
+    def do_POST(self):
+        self.server.requests.append((self.command, self.path, dict(self.headers)))  # type: ignore
+        self.server.request_bodies.append(self.rfile.read(int(self.headers.get("Content-Length") or 0)))  # type: ignore
+        content = self.server.files.get(self.path)  # type: ignore
+        if content is None:
+            self.send_error(404)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    do_PATCH = do_POST
+
+    def log_message(self, format, *args):
+        pass
+
 
 @pytest.fixture
-def mock_tar_filename():
-    return "mock-file.tar.gz"
+def local_server():
+    """Starts a local HTTP server, register content to serve with `local_server.files[path] = b"..."`."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _LocalServerHandler)
+    server.files = {}  # type: ignore
+    server.requests = []  # type: ignore
+    server.drop_after = {}  # type: ignore
+    server.content_types = {}  # type: ignore
+    server.request_bodies = []  # type: ignore
+    server.redirects = {}  # type: ignore
+    server.generated = {}  # type: ignore
+    server.url = f"http://127.0.0.1:{server.server_address[1]}"  # type: ignore
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
@@ -1,21 +1,47 @@
+import hashlib
+import io
 import os
 import subprocess
-from unittest.mock import patch
+import sys
+import tarfile
+import time
+from unittest.mock import (
+    MagicMock,
+    mock_open,
+    patch,
+)
 
 import pytest
 
 from homebrew_releaser.app import (
     _check_required_env_variables,
     _download_archive,
+    _download_archives,
+    _get_digest_checksums,
+    _get_local_artifact_checksums,
+    _get_manifest_checksums,
+    _plan_archive_urls,
+    _preflight_archive_urls,
+    _sample_urls_to_verify,
     _setup_logger,
     run_github_action,
 )
+from homebrew_releaser.archive_store import archive_store
+from homebrew_releaser.assets import (
+    ReleaseAsset,
+    ReleaseAssets,
+)
 from homebrew_releaser.constants import (
     GITHUB_BASE_API_URL,
     GITHUB_BASE_URL,
 )
+from test.unit.conftest import GENERATED_BLOCK
+
+RELEASE_METADATA = (MagicMock(), {"id": 1, "tag_name": "v0.1.0", "assets": ReleaseAssets([])})
 
 
+@patch("homebrew_releaser.app.INSTALL", "mock-install")
+@patch("homebrew_releaser.app._preflight_archive_urls", MagicMock())
 @patch("homebrew_releaser.app.SKIP_COMMIT", True)
 @patch("homebrew_releaser.app.HOMEBREW_OWNER", "Justintime50")
 @patch("homebrew_releaser.app.HOMEBREW_TAP", "123")
@@ -30,15 +56,13 @@ from homebrew_releaser.constants import (
 @patch("homebrew_releaser.app.push_git")
 @patch("homebrew_releaser.app.write_file")
 @patch("homebrew_releaser.app.generate_formula_data")
-@patch("homebrew_releaser.app.calculate_checksum", return_value=("123", "mock-repo"))
 @patch("homebrew_releaser.app._download_archive")
-@patch("homebrew_releaser.app.make_github_get_request")
+@patch("homebrew_releaser.app.get_release_metadata", return_value=RELEASE_METADATA)
 @patch("homebrew_releaser.app._check_required_env_variables")
 def test_run_github_action_skip_commit(
     mock_check_env_variables,
-    mock_make_github_get_request,
+    mock_get_release_metadata,
     mock_download_archive,
-    mock_calculate_checksum,
     mock_generate_formula,
     mock_write_file,
     mock_push_formula,
@@ -57,9 +81,8 @@ def test_run_github_action_skip_commit(
     mock_logger.assert_called()
     mock_get_homebrew_version.assert_called()
     mock_check_env_variables.assert_called_once()
-    assert mock_make_github_get_request.call_count == 2
+    mock_get_release_metadata.assert_called_once()
     mock_download_archive.call_count == 2
-    mock_calculate_checksum.call_count == 2
     mock_generate_formula.assert_called_once()
     mock_write_file.call_count == 2
     mock_setup_homebrew_tap.assert_called_once()
@@ -70,6 +93,8 @@ def test_run_github_action_skip_commit(
     mock_push_formula.assert_not_called()
 
 
+@patch("homebrew_releaser.app.INSTALL", "mock-install")
+@patch("homebrew_releaser.app._preflight_archive_urls", MagicMock())
 @patch("homebrew_releaser.app.HOMEBREW_TAP", "123")
 @patch("homebrew_releaser.app.HOMEBREW_OWNER", "Justintime50")
 @patch("homebrew_releaser.app.upload_checksum_file")
@@ -84,15 +109,13 @@ def test_run_github_action_skip_commit(
 @patch("homebrew_releaser.app.push_git")
 @patch("homebrew_releaser.app.write_file")
 @patch("homebrew_releaser.app.generate_formula_data")
-@patch("homebrew_releaser.app.calculate_checksum", return_value=("123", "mock-repo"))
 @patch("homebrew_releaser.app._download_archive")
-@patch("homebrew_releaser.app.make_github_get_request")
+@patch("homebrew_releaser.app.get_release_metadata", return_value=RELEASE_METADATA)
 @patch("homebrew_releaser.app._check_required_env_variables")
 def test_run_github_action(
     mock_check_env_variables,
-    mock_make_github_get_request,
+    mock_get_release_metadata,
     mock_download_archive,
-    mock_calculate_checksum,
     mock_generate_formula,
     mock_write_file,
     mock_push_formula,
@@ -112,9 +135,8 @@ def test_run_github_action(
     mock_logger.assert_called()
     mock_get_homebrew_version.assert_called()
     mock_check_env_variables.assert_called_once()
-    assert mock_make_github_get_request.call_count == 2
+    mock_get_release_metadata.assert_called_once()
     mock_download_archive.call_count == 2
-    mock_calculate_checksum.call_count == 2
     mock_generate_formula.assert_called_once()
     mock_write_file.call_count == 2
     mock_setup_homebrew_tap.assert_called_once()
@@ -126,6 +148,8 @@ def test_run_github_action(
     mock_push_formula.assert_called_once()
 
 
+@patch("homebrew_releaser.app.INSTALL", "mock-install")
+@patch("homebrew_releaser.app._preflight_archive_urls", MagicMock())
 @patch.dict(os.environ, {"INPUT_SKIP_COMMIT": "false"})
 @patch("homebrew_releaser.app.HOMEBREW_TAP", "123")
 @patch("homebrew_releaser.app.HOMEBREW_OWNER", "Justintime50")
@@ -142,15 +166,13 @@ def test_run_github_action(
 @patch("homebrew_releaser.app.push_git")
 @patch("homebrew_releaser.app.write_file")
 @patch("homebrew_releaser.app.generate_formula_data")
-@patch("homebrew_releaser.app.calculate_checksum", return_value=("123", "mock-repo"))
 @patch("homebrew_releaser.app._download_archive")
-@patch("homebrew_releaser.app.make_github_get_request")
+@patch("homebrew_releaser.app.get_release_metadata", return_value=RELEASE_METADATA)
 @patch("homebrew_releaser.app._check_required_env_variables")
 def test_run_github_action_string_false_config(
     mock_check_env_variables,
-    mock_make_github_get_request,
+    mock_get_release_metadata,
     mock_download_archive,
-    mock_calculate_checksum,
     mock_generate_formula,
     mock_write_file,
     mock_push_formula,
@@ -177,6 +199,8 @@ def test_run_github_action_string_false_config(
     mock_update_readme.assert_not_called()
 
 
+@patch("homebrew_releaser.app.INSTALL", "mock-install")
+@patch("homebrew_releaser.app._preflight_archive_urls", MagicMock())
 @patch("homebrew_releaser.app.HOMEBREW_TAP", "123")
 @patch("homebrew_releaser.app.UPDATE_README_TABLE", True)
 @patch("homebrew_releaser.app.update_readme")
@@ -192,15 +216,13 @@ def test_run_github_action_string_false_config(
 @patch("homebrew_releaser.app.push_git")
 @patch("homebrew_releaser.app.write_file")
 @patch("homebrew_releaser.app.generate_formula_data")
-@patch("homebrew_releaser.app.calculate_checksum", return_value=("123", "mock-repo"))
 @patch("homebrew_releaser.app._download_archive")
-@patch("homebrew_releaser.app.make_github_get_request")
+@patch("homebrew_releaser.app.get_release_metadata", return_value=RELEASE_METADATA)
 @patch("homebrew_releaser.app._check_required_env_variables")
 def test_run_github_action_update_readme(
     mock_check_env_variables,
-    mock_make_github_get_request,
+    mock_get_release_metadata,
     mock_download_archive,
-    mock_calculate_checksum,
     mock_generate_formula,
     mock_write_file,
     mock_push_formula,
@@ -221,9 +243,8 @@ def test_run_github_action_update_readme(
     mock_logger.assert_called()
     mock_get_homebrew_version.assert_called()
     mock_check_env_variables.assert_called_once()
-    assert mock_make_github_get_request.call_count == 2
+    mock_get_release_metadata.assert_called_once()
     mock_download_archive.call_count == 2
-    mock_calculate_checksum.call_count == 2
     mock_generate_formula.assert_called_once()
     mock_write_file.call_count == 2
     mock_setup_homebrew_tap.assert_called_once()
@@ -235,6 +256,8 @@ def test_run_github_action_update_readme(
     mock_update_readme.assert_called_once()
 
 
+@patch("homebrew_releaser.app.INSTALL", "mock-install")
+@patch("homebrew_releaser.app._preflight_archive_urls", MagicMock())
 @patch("homebrew_releaser.app.HOMEBREW_TAP", "123")
 @patch("homebrew_releaser.app.UPDATE_PYTHON_RESOURCES", True)
 @patch("homebrew_releaser.app.upload_checksum_file")
@@ -249,17 +272,15 @@ def test_run_github_action_update_readme(
 @patch("homebrew_releaser.app.push_git")
 @patch("homebrew_releaser.app.write_file")
 @patch("homebrew_releaser.app.generate_formula_data")
-@patch("homebrew_releaser.app.calculate_checksum", return_value=("123", "mock-repo"))
 @patch("homebrew_releaser.app._download_archive")
-@patch("homebrew_releaser.app.make_github_get_request")
+@patch("homebrew_releaser.app.get_release_metadata", return_value=RELEASE_METADATA)
 @patch("homebrew_releaser.app._check_required_env_variables")
 @patch("homebrew_releaser.app.update_python_resources")
 def test_run_github_action_update_python_resources(
     mock_update_python_resources,
     mock_check_env_variables,
-    mock_make_github_get_request,
+    mock_get_release_metadata,
     mock_download_archive,
-    mock_calculate_checksum,
     mock_generate_formula,
     mock_write_file,
     mock_push_formula,
@@ -279,9 +300,8 @@ def test_run_github_action_update_python_resources(
     mock_logger.assert_called()
     mock_get_homebrew_version.assert_called()
     mock_check_env_variables.assert_called_once()
-    assert mock_make_github_get_request.call_count == 2
+    mock_get_release_metadata.assert_called_once()
     mock_download_archive.call_count == 2
-    mock_calculate_checksum.call_count == 2
     mock_generate_formula.assert_called_once()
     mock_write_file.call_count == 2
     mock_setup_homebrew_tap.assert_called_once()
@@ -294,6 +314,8 @@ def test_run_github_action_update_python_resources(
     mock_setup_homebrew_tap.assert_called_once()
 
 
+@patch("homebrew_releaser.app.INSTALL", "mock-install")
+@patch("homebrew_releaser.app._preflight_archive_urls", MagicMock())
 @patch("homebrew_releaser.app.HOMEBREW_TAP", "123")
 @patch("homebrew_releaser.app.TARGET_DARWIN_AMD64", True)
 @patch("homebrew_releaser.app.TARGET_DARWIN_ARM64", True)
@@ -311,15 +333,13 @@ def test_run_github_action_update_python_resources(
 @patch("homebrew_releaser.app.push_git")
 @patch("homebrew_releaser.app.write_file")
 @patch("homebrew_releaser.app.generate_formula_data")
-@patch("homebrew_releaser.app.calculate_checksum", return_value=("123", "mock-repo"))
 @patch("homebrew_releaser.app._download_archive")
-@patch("homebrew_releaser.app.make_github_get_request")
+@patch("homebrew_releaser.app.get_release_metadata", return_value=RELEASE_METADATA)
 @patch("homebrew_releaser.app._check_required_env_variables")
 def test_run_github_action_target_matrix(
     mock_check_env_variables,
-    mock_make_github_get_request,
+    mock_get_release_metadata,
     mock_download_archive,
-    mock_calculate_checksum,
     mock_generate_formula,
     mock_write_file,
     mock_push_formula,
@@ -340,9 +360,8 @@ def test_run_github_action_target_matrix(
     mock_logger.assert_called()
     mock_get_homebrew_version.assert_called()
     mock_check_env_variables.assert_called_once()
-    assert mock_make_github_get_request.call_count == 2
+    mock_get_release_metadata.assert_called_once()
     mock_download_archive.call_count == 2
-    mock_calculate_checksum.call_count == 2
     mock_generate_formula.assert_called_once()
     mock_write_file.call_count == 2
     mock_setup_homebrew_tap.assert_called_once()
@@ -354,6 +373,586 @@ def test_run_github_action_target_matrix(
     mock_push_formula.assert_called_once()
 
 
+@patch("homebrew_releaser.app.INSTALL", "mock-install")
+@patch("homebrew_releaser.app._preflight_archive_urls", MagicMock())
+@patch("homebrew_releaser.app.SINGLE_TAP_CHECKOUT", True)
+@patch("homebrew_releaser.app.HOMEBREW_OWNER", "Justintime50")
+@patch("homebrew_releaser.app.HOMEBREW_TAP", "homebrew-formulas")
+@patch("homebrew_releaser.utils.WORKING_DIR", "")
+@patch("homebrew_releaser.app.open", mock_open(read_data="mock-formula"), create=True)
+@patch("homebrew_releaser.app.upload_checksum_file")
+@patch("woodchips.get")
+@patch("homebrew_releaser.app.get_homebrew_version")
+@patch("homebrew_releaser.app.link_homebrew_tap")
+@patch("homebrew_releaser.app.setup_homebrew_tap")
+@patch("homebrew_releaser.app.make_formula_folder")
+@patch("homebrew_releaser.app.setup_git")
+@patch("homebrew_releaser.app.copy_formula_file_to_git")
+@patch("homebrew_releaser.app.add_git")
+@patch("homebrew_releaser.app.commit_git")
+@patch("homebrew_releaser.app.push_git")
+@patch("homebrew_releaser.app.write_file")
+@patch("homebrew_releaser.app.generate_formula_data", return_value="mock-formula")
+@patch("homebrew_releaser.app._download_archive")
+@patch(
+    "homebrew_releaser.app.get_release_metadata",
+    return_value=(
+        {"name": "repo", "description": "mock-description", "license": None, "private": False},
+        RELEASE_METADATA[1],
+    ),
+)
+@patch("homebrew_releaser.app._check_required_env_variables")
+def test_run_github_action_single_tap_checkout(
+    mock_check_env_variables,
+    mock_get_release_metadata,
+    mock_download_archive,
+    mock_generate_formula,
+    mock_write_file,
+    mock_push_git,
+    mock_commit_git,
+    mock_add_git,
+    mock_copy_formula_file_to_git,
+    mock_setup_git,
+    mock_make_formula_folder,
+    mock_setup_homebrew_tap,
+    mock_link_homebrew_tap,
+    mock_get_homebrew_version,
+    mock_logger,
+    mock_upload_checksum_file,
+):
+    """Tests that a single checkout of the tap is shared with Homebrew and the formula is written straight into it."""
+    run_github_action()
+
+    mock_setup_git.assert_called_once()
+    mock_setup_homebrew_tap.assert_not_called()
+    mock_link_homebrew_tap.assert_called_once_with("Justintime50", "homebrew-formulas", "homebrew-formulas")
+    mock_write_file.assert_any_call("homebrew-formulas/Formula/repo.rb", "mock-formula", "w")
+    mock_copy_formula_file_to_git.assert_not_called()
+    mock_commit_git.assert_called_once()
+
+    # The formula is written again if the commit has to be made over on top of someone else's
+    mock_write_file.reset_mock()
+    mock_push_git.call_args.kwargs["recommit"]()
+    mock_write_file.assert_called_once_with("homebrew-formulas/Formula/repo.rb", "mock-formula", "w")
+    mock_copy_formula_file_to_git.assert_not_called()
+    assert mock_commit_git.call_count == 2
+
+
+@patch("homebrew_releaser.app.INSTALL", "mock-install")
+@patch("homebrew_releaser.app._preflight_archive_urls", MagicMock())
+@patch("homebrew_releaser.app.PUBLISH_METHOD", "api")
+@patch("homebrew_releaser.app.HOMEBREW_OWNER", "Justintime50")
+@patch("homebrew_releaser.app.HOMEBREW_TAP", "homebrew-formulas")
+@patch("homebrew_releaser.app.open", mock_open(read_data=b"mock-formula"), create=True)
+@patch("homebrew_releaser.app.upload_checksum_file")
+@patch("homebrew_releaser.app.publish_files")
+@patch("woodchips.get")
+@patch("homebrew_releaser.app.get_homebrew_version")
+@patch("homebrew_releaser.app.setup_homebrew_tap")
+@patch("homebrew_releaser.app.make_formula_folder")
+@patch("homebrew_releaser.app.setup_git")
+@patch("homebrew_releaser.app.commit_git")
+@patch("homebrew_releaser.app.push_git")
+@patch("homebrew_releaser.app.write_file")
+@patch("homebrew_releaser.app.generate_formula_data")
+@patch("homebrew_releaser.app._download_archive")
+@patch(
+    "homebrew_releaser.app.get_release_metadata",
+    return_value=(
+        {"name": "repo", "description": "mock-description", "license": None, "private": False},
+        RELEASE_METADATA[1],
+    ),
+)
+@patch("homebrew_releaser.app._check_required_env_variables")
+def test_run_github_action_publish_api(
+    mock_check_env_variables,
+    mock_get_release_metadata,
+    mock_download_archive,
+    mock_generate_formula,
+    mock_write_file,
+    mock_push_git,
+    mock_commit_git,
+    mock_setup_git,
+    mock_make_formula_folder,
+    mock_setup_homebrew_tap,
+    mock_get_homebrew_version,
+    mock_logger,
+    mock_publish_files,
+    mock_upload_checksum_file,
+):
+    """Tests that publishing through the Git Data API commits the formula without cloning the tap."""
+    run_github_action()
+
+    mock_setup_git.assert_not_called()
+    mock_setup_homebrew_tap.assert_not_called()
+    assert mock_write_file.call_args_list[-1].args[0] == os.path.join(archive_store.directory, "repo.rb")
+    mock_make_formula_folder.assert_not_called()
+    mock_commit_git.assert_not_called()
+    mock_push_git.assert_not_called()
+    mock_publish_files.assert_called_once_with(
+        "Justintime50",
+        "homebrew-formulas",
+        {"Formula/repo.rb": b"mock-formula"},
+        "chore: brew formula update for repo v0.1.0",
+        "homebrew-releaser",
+        "homebrew-releaser@example.com",
+        None,
+    )
+
+
+@patch("homebrew_releaser.app.INSTALL", "mock-install")
+@patch("homebrew_releaser.app._preflight_archive_urls", MagicMock())
+@patch("homebrew_releaser.app.PUBLISH_METHOD", "api")
+@patch("homebrew_releaser.app.UPDATE_README_TABLE", True)
+@patch("homebrew_releaser.app.update_readme", return_value=None)
+@patch("homebrew_releaser.app.HOMEBREW_OWNER", "Justintime50")
+@patch("homebrew_releaser.app.HOMEBREW_TAP", "homebrew-formulas")
+@patch("homebrew_releaser.app.open", mock_open(read_data=b"mock-formula"), create=True)
+@patch("homebrew_releaser.app.upload_checksum_file")
+@patch("homebrew_releaser.app.publish_files")
+@patch("woodchips.get")
+@patch("homebrew_releaser.app.get_homebrew_version")
+@patch("homebrew_releaser.app.setup_homebrew_tap")
+@patch("homebrew_releaser.app.make_formula_folder")
+@patch("homebrew_releaser.app.setup_git")
+@patch("homebrew_releaser.app.commit_git")
+@patch("homebrew_releaser.app.push_git")
+@patch("homebrew_releaser.app.write_file")
+@patch("homebrew_releaser.app.generate_formula_data")
+@patch("homebrew_releaser.app._download_archive")
+@patch(
+    "homebrew_releaser.app.get_release_metadata",
+    return_value=(
+        {"name": "repo", "description": "mock-description", "license": None, "private": False},
+        RELEASE_METADATA[1],
+    ),
+)
+@patch("homebrew_releaser.app._check_required_env_variables")
+def test_run_github_action_publish_api_readme_table(
+    mock_check_env_variables,
+    mock_get_release_metadata,
+    mock_download_archive,
+    mock_generate_formula,
+    mock_write_file,
+    mock_push_git,
+    mock_commit_git,
+    mock_setup_git,
+    mock_make_formula_folder,
+    mock_setup_homebrew_tap,
+    mock_get_homebrew_version,
+    mock_logger,
+    mock_publish_files,
+    mock_upload_checksum_file,
+    mock_update_readme,
+):
+    """Tests that publishing through the Git Data API still sets up the tap when the README table is built from it."""
+    run_github_action()
+
+    mock_setup_homebrew_tap.assert_called_once()
+    mock_update_readme.assert_called_once()
+    mock_setup_git.assert_not_called()
+
+
+@patch("homebrew_releaser.app.INSTALL", None)
+@patch("homebrew_releaser.app._preflight_archive_urls", MagicMock())
+@patch("homebrew_releaser.app.SKIP_COMMIT", True)
+@patch("homebrew_releaser.app.HOMEBREW_TAP", "123")
+@patch("homebrew_releaser.app.TARGET_DARWIN_ARM64", True)
+@patch("homebrew_releaser.app.TARGET_LINUX_AMD64", True)
+@patch("woodchips.get")
+@patch("homebrew_releaser.app.get_homebrew_version")
+@patch("homebrew_releaser.app.setup_homebrew_tap")
+@patch("homebrew_releaser.app.make_formula_folder")
+@patch("homebrew_releaser.app.setup_git")
+@patch("homebrew_releaser.app.copy_formula_file_to_git")
+@patch("homebrew_releaser.app.add_git")
+@patch("homebrew_releaser.app.commit_git")
+@patch("homebrew_releaser.app.write_file")
+@patch("homebrew_releaser.app.generate_formula_data")
+@patch("homebrew_releaser.app._download_archive", return_value="mock-checksum")
+@patch("homebrew_releaser.app.get_release_metadata", return_value=RELEASE_METADATA)
+@patch("homebrew_releaser.app._check_required_env_variables")
+def test_run_github_action_generated_install(
+    mock_check_env_variables,
+    mock_get_release_metadata,
+    mock_download_archive,
+    mock_generate_formula,
+    *mocks,
+):
+    """Tests that the install command is generated from the target tarballs as they download when not provided."""
+    tarball = io.BytesIO()
+    with tarfile.open(fileobj=tarball, mode="w:gz") as archive:
+        member = tarfile.TarInfo("my-tool")
+        member.mode = 0o755
+        archive.addfile(member)
+
+    def download_archive(url, mirror_url, inspector):
+        if inspector:
+            inspector.feed(tarball.getvalue())
+        return "mock-checksum"
+
+    mock_download_archive.side_effect = download_archive
+
+    run_github_action()
+
+    inspectors = [call.args[2] for call in mock_download_archive.call_args_list if call.args[2]]
+    assert sorted(inspector.filename for inspector in inspectors) == [
+        "repo-0.1.0-darwin-arm64.tar.gz",
+        "repo-0.1.0-linux-amd64.tar.gz",
+    ]
+    assert mock_generate_formula.call_args.args[4] == 'bin.install "my-tool"'
+
+
+@patch("homebrew_releaser.app.INSTALL", None)
+@patch("homebrew_releaser.app._preflight_archive_urls", MagicMock())
+@patch("homebrew_releaser.app.SKIP_COMMIT", True)
+@patch("homebrew_releaser.app.HOMEBREW_TAP", "123")
+@patch("homebrew_releaser.app.TARGET_DARWIN_ARM64", True)
+@patch("homebrew_releaser.app.TARGET_LINUX_AMD64", True)
+@patch("homebrew_releaser.app.CUSTOM_TARBALL", "repo-source")
+@patch("woodchips.get")
+@patch("homebrew_releaser.app.get_homebrew_version")
+@patch("homebrew_releaser.app.setup_homebrew_tap")
+@patch("homebrew_releaser.app.make_formula_folder")
+@patch("homebrew_releaser.app.setup_git")
+@patch("homebrew_releaser.app.copy_formula_file_to_git")
+@patch("homebrew_releaser.app.add_git")
+@patch("homebrew_releaser.app.commit_git")
+@patch("homebrew_releaser.app.write_file")
+@patch("homebrew_releaser.app.generate_formula_data")
+@patch("homebrew_releaser.app._download_archive", return_value="mock-checksum")
+@patch("homebrew_releaser.app.get_release_metadata", return_value=RELEASE_METADATA)
+@patch("homebrew_releaser.app._check_required_env_variables")
+def test_run_github_action_generated_install_custom_tarball(
+    mock_check_env_variables,
+    mock_get_release_metadata,
+    mock_download_archive,
+    mock_generate_formula,
+    *mocks,
+):
+    """Tests that a custom tarball, the formula's source, is never inspected to generate the install command."""
+    tarball = io.BytesIO()
+    with tarfile.open(fileobj=tarball, mode="w:gz") as archive:
+        member = tarfile.TarInfo("my-tool")
+        member.mode = 0o755
+        archive.addfile(member)
+
+    def download_archive(url, mirror_url, inspector):
+        if inspector:
+            inspector.feed(tarball.getvalue())
+        return "mock-checksum"
+
+    mock_download_archive.side_effect = download_archive
+
+    run_github_action()
+
+    inspectors = [call.args[2] for call in mock_download_archive.call_args_list if call.args[2]]
+    assert sorted(inspector.filename for inspector in inspectors) == [
+        "repo-0.1.0-darwin-arm64.tar.gz",
+        "repo-0.1.0-linux-amd64.tar.gz",
+    ]
+    assert mock_generate_formula.call_args.args[4] == 'bin.install "my-tool"'
+
+
+@patch("homebrew_releaser.app.INSTALL", None)
+@patch("woodchips.get")
+@patch("homebrew_releaser.app.get_homebrew_version")
+@patch("homebrew_releaser.app.get_release_metadata", return_value=RELEASE_METADATA)
+@patch("homebrew_releaser.app._check_required_env_variables")
+def test_run_github_action_no_install(
+    mock_check_env_variables, mock_get_release_metadata, mock_get_homebrew_version, mock_logger
+):
+    """Tests that we fail early when there's no install command and no target tarballs to generate it from."""
+    with pytest.raises(SystemExit) as error:
+        run_github_action()
+
+    assert "You must provide an `install` command" in str(error.value)
+
+
+@patch("homebrew_releaser.app.INSTALL", "mock-install")
+@patch("homebrew_releaser.app._preflight_archive_urls", MagicMock())
+@patch("homebrew_releaser.app.SKIP_COMMIT", True)
+@patch("homebrew_releaser.app.HOMEBREW_TAP", "123")
+@patch("homebrew_releaser.app.CHECKSUM_SOURCES", ["digest"])
+@patch("homebrew_releaser.app.TARGET_DARWIN_AMD64", True)
+@patch("homebrew_releaser.app.TARGET_LINUX_AMD64", True)
+@patch("homebrew_releaser.app.GITHUB_REPO", "mock-repo")
+@patch("woodchips.get")
+@patch("homebrew_releaser.app.get_homebrew_version")
+@patch("homebrew_releaser.app.setup_homebrew_tap")
+@patch("homebrew_releaser.app.make_formula_folder")
+@patch("homebrew_releaser.app.setup_git")
+@patch("homebrew_releaser.app.copy_formula_file_to_git")
+@patch("homebrew_releaser.app.add_git")
+@patch("homebrew_releaser.app.commit_git")
+@patch("homebrew_releaser.app.write_file")
+@patch("homebrew_releaser.app.generate_formula_data")
+@patch("homebrew_releaser.app._download_archive", return_value="downloaded-checksum")
+@patch("homebrew_releaser.app.get_release_metadata", return_value=RELEASE_METADATA)
+@patch("homebrew_releaser.app._check_required_env_variables")
+def test_run_github_action_digest_checksum_source(
+    mock_check_env_variables,
+    mock_get_release_metadata,
+    mock_download_archive,
+    mock_generate_formula,
+    mock_write_file,
+    mock_commit_formula,
+    mock_add_formula,
+    mock_copy_formula_file_to_git,
+    mock_setup_git,
+    mock_make_formula_folder,
+    mock_setup_homebrew_tap,
+    mock_get_homebrew_version,
+    mock_logger,
+):
+    """Tests that release assets with a published digest are not downloaded and keep their place in the order."""
+    download_base_url = f"{GITHUB_BASE_URL}/user/mock-repo/releases/download/v1.0.0/mock-repo-1.0.0"
+    mock_get_release_metadata.return_value = (
+        {"private": False, "name": "mock-repo"},
+        {
+            "tag_name": "v1.0.0",
+            "assets": ReleaseAssets(
+                [
+                    ReleaseAsset(
+                        "mock-repo-1.0.0-darwin-amd64.tar.gz",
+                        f"{download_base_url}-darwin-amd64.tar.gz",
+                        digest="sha256:darwin-checksum",
+                    ),
+                    ReleaseAsset("mock-repo-1.0.0-linux-amd64.tar.gz", f"{download_base_url}-linux-amd64.tar.gz"),
+                ]
+            ),
+        },
+    )
+
+    with patch("homebrew_releaser.app.GITHUB_OWNER", "user"):
+        run_github_action()
+
+    downloaded_urls = [call.args[0] for call in mock_download_archive.call_args_list]
+    assert sorted(downloaded_urls) == sorted(
+        [
+            f"{GITHUB_BASE_URL}/user/mock-repo/archive/refs/tags/v1.0.0.tar.gz",
+            f"{GITHUB_BASE_URL}/user/mock-repo/archive/refs/tags/v1.0.0.zip",
+            f"{download_base_url}-linux-amd64.tar.gz",
+        ]
+    )
+    checksums = mock_generate_formula.call_args.args[3]
+    assert [next(iter(checksum.values()))["checksum"] for checksum in checksums] == [
+        "downloaded-checksum",
+        "downloaded-checksum",
+        "darwin-checksum",
+        "downloaded-checksum",
+    ]
+
+
+@patch("homebrew_releaser.app.INSTALL", "mock-install")
+@patch("homebrew_releaser.app._preflight_archive_urls", MagicMock())
+@patch("homebrew_releaser.app.SKIP_COMMIT", True)
+@patch("homebrew_releaser.app.HOMEBREW_TAP", "123")
+@patch("homebrew_releaser.app.HEDGE_DOWNLOAD_AFTER", 1.0)
+@patch("homebrew_releaser.app.TARGET_DARWIN_AMD64", True)
+@patch("homebrew_releaser.app.GITHUB_REPO", "mock-repo")
+@patch("woodchips.get")
+@patch("homebrew_releaser.app.get_homebrew_version")
+@patch("homebrew_releaser.app.setup_homebrew_tap")
+@patch("homebrew_releaser.app.make_formula_folder")
+@patch("homebrew_releaser.app.setup_git")
+@patch("homebrew_releaser.app.copy_formula_file_to_git")
+@patch("homebrew_releaser.app.add_git")
+@patch("homebrew_releaser.app.commit_git")
+@patch("homebrew_releaser.app.write_file")
+@patch("homebrew_releaser.app.generate_formula_data")
+@patch("homebrew_releaser.app._download_archive", return_value="downloaded-checksum")
+@patch("homebrew_releaser.app.get_release_metadata")
+@patch("homebrew_releaser.app._check_required_env_variables")
+def test_run_github_action_hedged_download(
+    mock_check_env_variables,
+    mock_get_release_metadata,
+    mock_download_archive,
+    mock_generate_formula,
+    mock_write_file,
+    mock_commit_formula,
+    mock_add_formula,
+    mock_copy_formula_file_to_git,
+    mock_setup_git,
+    mock_make_formula_folder,
+    mock_setup_homebrew_tap,
+    mock_get_homebrew_version,
+    mock_logger,
+):
+    """Tests that the release assets of a public repo race their browser URL against their API URL, which the
+    GraphQL release metadata builds from each asset's id.
+    """
+    asset_url = f"{GITHUB_BASE_URL}/user/mock-repo/releases/download/v1.0.0/mock-repo-1.0.0-darwin-amd64.tar.gz"
+    api_url = "https://api.github.com/repos/user/mock-repo/releases/assets/456"
+    mock_get_release_metadata.return_value = (
+        {"private": False, "name": "mock-repo"},
+        {
+            "tag_name": "v1.0.0",
+            "assets": ReleaseAssets([ReleaseAsset("mock-repo-1.0.0-darwin-amd64.tar.gz", asset_url, url=api_url)]),
+        },
+    )
+
+    with patch("homebrew_releaser.app.GITHUB_OWNER", "user"):
+        run_github_action()
+
+    mock_download_archive.assert_any_call(asset_url, api_url, None)
+    mock_download_archive.assert_any_call(
+        f"{GITHUB_BASE_URL}/user/mock-repo/archive/refs/tags/v1.0.0.tar.gz", None, None
+    )
+
+
+TAR_URL = f"{GITHUB_BASE_URL}/user/repo/archive/refs/tags/v1.0.0.tar.gz"
+ZIP_URL = f"{GITHUB_BASE_URL}/user/repo/archive/refs/tags/v1.0.0.zip"
+TARGET_URL = f"{GITHUB_BASE_URL}/user/repo/releases/download/v1.0.0/repo-1.0.0-darwin-arm64.tar.gz"
+CUSTOM_TARBALL_URL = f"{GITHUB_BASE_URL}/user/repo/releases/download/v1.0.0/custom.tar.gz"
+
+
+def test_plan_archive_urls():
+    """Tests that every archive is planned (in the original order) when checksum.txt lists everything."""
+    archive_urls = [TAR_URL, ZIP_URL, TARGET_URL]
+
+    assert _plan_archive_urls(archive_urls, TAR_URL) == archive_urls
+
+
+@patch("homebrew_releaser.app.SKIP_CHECKSUM", True)
+def test_plan_archive_urls_skip_checksum():
+    """Tests that we skip the zipball when checksum.txt won't be uploaded."""
+    assert _plan_archive_urls([TAR_URL, ZIP_URL, TARGET_URL], TAR_URL) == [TAR_URL, TARGET_URL]
+
+
+@patch("homebrew_releaser.app.CHECKSUM_FILE_SCOPE", "formula")
+def test_plan_archive_urls_custom_tarball():
+    """Tests that a custom tarball replaces (and takes the place of) the auto-generated tarball when it's not needed."""
+    archive_urls = [TAR_URL, ZIP_URL, TARGET_URL, CUSTOM_TARBALL_URL]
+
+    assert _plan_archive_urls(archive_urls, CUSTOM_TARBALL_URL) == [CUSTOM_TARBALL_URL, TARGET_URL]
+
+
+def test_plan_archive_urls_custom_tarball_all_scope():
+    """Tests that the auto-generated tarball still leads when checksum.txt lists everything."""
+    archive_urls = [TAR_URL, ZIP_URL, TARGET_URL, CUSTOM_TARBALL_URL]
+
+    assert _plan_archive_urls(archive_urls, CUSTOM_TARBALL_URL) == archive_urls
+
+
+def test_get_local_artifact_checksums(tmp_path):
+    """Tests that local artifacts are hashed from disk and matched up with the URL of their target."""
+    local_artifact_path = tmp_path / "repo-linux-arm64.tar.gz"
+    local_artifact_path.write_bytes(b"mock-content")
+    target_archive_urls = {
+        "linux-arm64": "https://example.com/repo-linux-arm64.tar.gz",
+        "custom-tarball": "https://example.com/custom.tar.gz",
+    }
+
+    with patch("homebrew_releaser.app.LOCAL_ARTIFACTS", f"linux-arm64 = {local_artifact_path}\n\n"):
+        checksums = _get_local_artifact_checksums(target_archive_urls)
+
+    checksum = "24d5542ea2f2748799544070f865938c18699a4c18981926012a2c03a07f3d3a"
+    assert checksums == {"https://example.com/repo-linux-arm64.tar.gz": checksum}
+
+
+@patch("homebrew_releaser.app.LOCAL_ARTIFACTS", "darwin-amd64=dist/repo-darwin-amd64.tar.gz")
+def test_get_local_artifact_checksums_unknown_target():
+    with pytest.raises(SystemExit) as error:
+        _get_local_artifact_checksums({"linux-arm64": "https://example.com/repo-linux-arm64.tar.gz"})
+
+    assert (
+        str(error.value) == "Local artifact target `darwin-amd64` does not match an enabled target or custom tarball."
+    )
+
+
+@patch("homebrew_releaser.app.LOCAL_ARTIFACTS", "linux-arm64=does/not/exist.tar.gz")
+def test_get_local_artifact_checksums_missing_file():
+    with pytest.raises(SystemExit) as error:
+        _get_local_artifact_checksums({"linux-arm64": "https://example.com/repo-linux-arm64.tar.gz"})
+
+    assert str(error.value) == "Local artifact for `linux-arm64` does not exist at `does/not/exist.tar.gz`."
+
+
+def test_get_digest_checksums():
+    base_url = f"{GITHUB_BASE_URL}/user/repo/releases/download/v1.0.0"
+    archive_urls = [f"{base_url}/a.tar.gz", f"{base_url}/b.tar.gz", f"{base_url}/c.tar.gz"]
+    assets = ReleaseAssets(
+        [
+            ReleaseAsset("a.tar.gz", f"{base_url}/a.tar.gz", digest="sha256:123"),
+            ReleaseAsset("b.tar.gz", f"{base_url}/b.tar.gz"),
+        ]
+    )
+
+    assert _get_digest_checksums(archive_urls, assets) == {f"{base_url}/a.tar.gz": "123"}
+
+
+@patch("homebrew_releaser.app.make_github_get_request")
+def test_get_manifest_checksums(mock_make_github_get_request):
+    """Tests that sidecars and shared manifests are used and only the manifests themselves are downloaded."""
+    base_url = "https://github.com/user/repo/releases/download/v1.0.0"
+    archive_urls = [
+        f"{GITHUB_BASE_URL}/user/repo/archive/refs/tags/v1.0.0.tar.gz",
+        f"{base_url}/repo-darwin-amd64.tar.gz",
+        f"{base_url}/repo-linux-amd64.tar.gz",
+        f"{base_url}/repo-linux-arm64.tar.gz",
+    ]
+    assets = ReleaseAssets(
+        ReleaseAsset(name=name, browser_download_url=f"{base_url}/{name}", url=f"mock-api-url/{name}", size=100)
+        for name in [
+            "repo-darwin-amd64.tar.gz",
+            "repo-darwin-amd64.tar.gz.sha256",
+            "repo-linux-amd64.tar.gz",
+            "repo-linux-arm64.tar.gz",
+            "SHA256SUMS",
+        ]
+    )
+    manifests = {
+        f"{base_url}/repo-darwin-amd64.tar.gz.sha256": "a" * 64,
+        f"{base_url}/SHA256SUMS": f"{'b' * 64}  repo-linux-amd64.tar.gz\n{'c' * 64} *dist/repo-darwin-amd64.tar.gz\n",
+    }
+    mock_make_github_get_request.side_effect = lambda url, stream: MagicMock(text=manifests[url])
+
+    checksums = _get_manifest_checksums(archive_urls, assets, False)
+
+    assert checksums == {
+        f"{base_url}/repo-darwin-amd64.tar.gz": "a" * 64,
+        f"{base_url}/repo-linux-amd64.tar.gz": "b" * 64,
+    }
+    assert mock_make_github_get_request.call_count == 2
+
+
+@patch("homebrew_releaser.app.make_github_get_request")
+def test_get_manifest_checksums_private(mock_make_github_get_request):
+    """Tests that private repos download manifests from the asset API URL and skip oversized manifests."""
+    base_url = "https://github.com/user/repo/releases/download/v1.0.0"
+    archive_urls = [f"{base_url}/repo-linux-amd64.tar.gz"]
+    assets = ReleaseAssets(
+        [
+            ReleaseAsset("repo-linux-amd64.tar.gz", archive_urls[0], "mock-api-url/1"),
+            ReleaseAsset("checksums.txt", f"{base_url}/checksums.txt", "mock-api-url/2"),
+            ReleaseAsset("big_checksums.txt", "mock", "mock-api-url/3", size=10**9),
+        ]
+    )
+    mock_make_github_get_request.return_value = MagicMock(text=f"{'d' * 64}  repo-linux-amd64.tar.gz\n")
+
+    checksums = _get_manifest_checksums(archive_urls, assets, True)
+
+    assert checksums == {archive_urls[0]: "d" * 64}
+    mock_make_github_get_request.assert_called_once_with(url="mock-api-url/2", stream=True)
+
+
+@patch("homebrew_releaser.app.CHECKSUM_VERIFY_FRACTION", 0)
+def test_sample_urls_to_verify_disabled():
+    assert _sample_urls_to_verify(["https://example.com/a.tar.gz"]) == []
+
+
+@patch("homebrew_releaser.app.CHECKSUM_VERIFY_FRACTION", 0.5)
+def test_sample_urls_to_verify():
+    """Tests that we round the sample up so a small fraction still verifies at least one URL."""
+    urls = ["https://example.com/a.tar.gz", "https://example.com/b.tar.gz", "https://example.com/c.tar.gz"]
+    sampled_urls = _sample_urls_to_verify(urls)
+
+    assert len(sampled_urls) == 2
+    assert set(sampled_urls) <= set(urls)
+    assert _sample_urls_to_verify([]) == []
+
+
 @patch("woodchips.Logger")
 def test_setup_logger(mock_logger):
     _setup_logger()
@@ -384,27 +983,142 @@ def test_check_required_env_variables_missing_env_variable(mock_system_exit):
     )
 
 
-@patch("homebrew_releaser.app.write_file")
+@patch("homebrew_releaser.app.GITHUB_TOKEN", "123")
+@patch("homebrew_releaser.app.HOMEBREW_OWNER", "Justintime50")
+@patch("homebrew_releaser.app.HOMEBREW_TAP", "homebrew-formulas")
+@patch("homebrew_releaser.app.CHECKSUM_SOURCES", ["digests", "manifest"])
+def test_check_required_env_variables_invalid_checksum_source():
+    """Tests that an unknown checksum source fails rather than being ignored."""
+    with pytest.raises(SystemExit) as error:
+        _check_required_env_variables()
+
+    assert str(error.value) == (
+        "Invalid `checksum_source` digests, it must be a comma separated list of: download, digest, manifest."
+    )
+
+
+@patch("homebrew_releaser.app.download_resumable", return_value="123")
 @patch("homebrew_releaser.app.make_github_get_request")
-def test_download_public_archive(mock_make_github_get_request, mock_write_file):
+def test_download_public_archive(mock_make_github_get_request, mock_download_resumable):
     url = f"{GITHUB_BASE_URL}/repos/Justintime50/homebrew-releaser/archive/refs/tags/v0.1.0.tar.gz"
-    _download_archive(url, True)
+    checksum = _download_archive(url)
 
-    mock_make_github_get_request.assert_called_once_with(url=url, stream=True)
-    mock_write_file.assert_called_once()  # TODO: Assert `called_with` here instead
+    mock_make_github_get_request.assert_called_once_with(url=url, stream=True, headers={})
+    mock_download_resumable.assert_called_once_with(
+        url, mock_make_github_get_request.return_value, "v0.1.0.tar.gz", None
+    )
+    assert checksum == "123"
 
 
-@patch("homebrew_releaser.app.write_file")
+@patch("homebrew_releaser.app.download_resumable", return_value="123")
 @patch("homebrew_releaser.app.make_github_get_request")
-def test_download_private_archive(mock_make_github_get_request, mock_write_file):
+def test_download_private_archive(mock_make_github_get_request, mock_download_resumable):
     url = f"{GITHUB_BASE_API_URL}/repos/Justintime50/homebrew-releaser/tarball/v0.1.0"
-    _download_archive(url, False)
+    checksum = _download_archive(url)
+
+    mock_make_github_get_request.assert_called_once_with(url=url, stream=True, headers={})
+    mock_download_resumable.assert_called_once_with(
+        url, mock_make_github_get_request.return_value, "tarball-v0.1.0", None
+    )
+    assert checksum == "123"
+
+
+def test_download_private_archive_bounded_memory(local_server, tmp_path):
+    """Tests that a large private release asset is streamed through its signed URL in constant memory."""
+    size = 1024 * 1024 * 1024
+    local_server.generated["/signed/mock-repo.tar.gz"] = size
+    # Another hostname for the same server, so the redirect is treated like one to a different host
+    local_server.redirects["/repos/user/mock-repo/releases/assets/1"] = (
+        local_server.url.replace("127.0.0.1", "localhost") + "/signed/mock-repo.tar.gz"
+    )
+    download_script = (
+        "import resource, sys\n"
+        "from unittest.mock import patch\n"
+        "from homebrew_releaser.app import _download_archive\n"
+        "with patch('homebrew_releaser.utils.WORKING_DIR', sys.argv[2]):\n"
+        "    checksum = _download_archive(sys.argv[1])\n"
+        "print(checksum, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)\n"
+    )
+
+    # A fresh process so the peak memory measured is only that of the download
+    output = subprocess.check_output(
+        [
+            sys.executable,
+            "-c",
+            download_script,
+            f"{local_server.url}/repos/user/mock-repo/releases/assets/1",
+            str(tmp_path),
+        ],
+        env={**os.environ, "INPUT_GITHUB_TOKEN": "mock-token"},
+        text=True,
+    )
+    checksum, peak_rss_kb = output.split()
+
+    sha256 = hashlib.sha256()
+    for _ in range(size // len(GENERATED_BLOCK)):
+        sha256.update(GENERATED_BLOCK)
+    assert checksum == sha256.hexdigest()
+    assert int(peak_rss_kb) < 150 * 1024
+    assert os.listdir(tmp_path) == []
+    asset_request, signed_request = local_server.requests
+    assert asset_request[2]["Accept"] == "application/octet-stream"
+    assert asset_request[2]["Authorization"] == "Bearer mock-token"
+    assert "Authorization" not in signed_request[2]
+
+
+@patch("homebrew_releaser.app.cache_checksum")
+@patch("homebrew_releaser.app.download_resumable")
+@patch("homebrew_releaser.app.make_github_get_request")
+@patch(
+    "homebrew_releaser.app.get_cached_checksum_entry",
+    return_value={"url": "mock-url", "etag": '"mock-etag"', "checksum": "123"},
+)
+def test_download_archive_cached(
+    mock_get_cached_checksum_entry, mock_make_github_get_request, mock_download_resumable, mock_cache_checksum
+):
+    """Tests that we make a conditional request and reuse the cached checksum when the archive hasn't changed."""
+    url = f"{GITHUB_BASE_URL}/Justintime50/homebrew-releaser/releases/download/v0.1.0/homebrew-releaser.tar.gz"
+    mock_make_github_get_request.return_value.status_code = 304
+
+    checksum = _download_archive(url)
+
+    mock_make_github_get_request.assert_called_once_with(url=url, stream=True, headers={"If-None-Match": '"mock-etag"'})
+    mock_download_resumable.assert_not_called()
+    mock_cache_checksum.assert_not_called()
+    assert checksum == "123"
 
-    mock_make_github_get_request.assert_called_once_with(url=url, stream=False)
-    mock_write_file.assert_called_once()  # TODO: Assert `called_with` here instead
-    mock_write_file.assert_called_once()  # TODO: Assert `called_with` here instead
+
+@patch("homebrew_releaser.app._download_archive")
+def test_download_archives_preserves_order(mock_download_archive):
+    """Tests that checksums come back in URL order even when later downloads finish first."""
+
+    def download_archive(url, mirror_url, inspector):
+        # The first URL takes the longest so it finishes last
+        time.sleep(0.1 if url.endswith("0") else 0)
+        return f"checksum-{url}"
+
+    mock_download_archive.side_effect = download_archive
+    urls = [f"https://example.com/archive-{index}" for index in range(4)]
+
+    checksums = _download_archives(urls, {urls[1]: "https://example.com/mirror-1"})
+
+    assert checksums == [f"checksum-{url}" for url in urls]
+    assert mock_download_archive.call_count == 4
+    mock_download_archive.assert_any_call(urls[1], "https://example.com/mirror-1", None)
+    mock_download_archive.assert_any_call(urls[2], None, None)
 
 
+@patch("homebrew_releaser.app._download_archive", side_effect=Exception("mock-error"))
+def test_download_archives_error(mock_download_archive):
+    """Tests that a failed download fails the whole batch."""
+    with pytest.raises(Exception) as error:
+        _download_archives(["https://example.com/archive.tar.gz"])
+
+    assert "mock-error" == str(error.value)
+
+
+@patch("homebrew_releaser.app.INSTALL", "mock-install")
+@patch("homebrew_releaser.app._preflight_archive_urls", MagicMock())
 @patch("homebrew_releaser.app.HOMEBREW_TAP", "123")
 @patch("homebrew_releaser.app.UPDATE_PYTHON_RESOURCES", True)
 @patch("sys.exit")
@@ -419,17 +1133,15 @@ def test_download_private_archive(mock_make_github_get_request, mock_write_file)
 @patch("homebrew_releaser.app.push_git")
 @patch("homebrew_releaser.app.write_file")
 @patch("homebrew_releaser.app.generate_formula_data")
-@patch("homebrew_releaser.app.calculate_checksum", return_value=("123", "mock-repo"))
 @patch("homebrew_releaser.app._download_archive")
-@patch("homebrew_releaser.app.make_github_get_request")
+@patch("homebrew_releaser.app.get_release_metadata", return_value=RELEASE_METADATA)
 @patch("homebrew_releaser.app._check_required_env_variables")
 @patch("homebrew_releaser.app.update_python_resources")
 def test_non_critical_warnings_raised(
     mock_update_python_resources,
     mock_check_env_variables,
-    mock_make_github_get_request,
+    mock_get_release_metadata,
     mock_download_archive,
-    mock_calculate_checksum,
     mock_generate_formula,
     mock_write_file,
     mock_push_formula,
@@ -456,3 +1168,47 @@ def test_non_critical_warnings_raised(
             "Your release most likely succeeded (check logs above); "
             "however, we are failing the build to surface these non-critical warnings to you."
         )
+
+
+def test_preflight_archive_urls(local_server):
+    """Tests that only release assets missing from the metadata are checked, and all missing ones are reported."""
+    base_url = f"{local_server.url}/user/repo/releases/download/v1.0.0"
+    local_server.files["/user/repo/releases/download/v1.0.0/repo-1.0.0-linux-amd64.tar.gz"] = b"123"
+    archive_urls = [
+        f"{local_server.url}/user/repo/archive/refs/tags/v1.0.0.tar.gz",
+        f"{base_url}/repo-1.0.0-darwin-amd64.tar.gz",
+        f"{base_url}/repo-1.0.0-linux-amd64.tar.gz",
+        f"{base_url}/repo-1.0.0-linux-arm46.tar.gz",
+        f"{base_url}/custom.tar.gz",
+    ]
+    assets = ReleaseAssets(
+        [ReleaseAsset("repo-1.0.0-darwin-amd64.tar.gz", f"{base_url}/repo-1.0.0-darwin-amd64.tar.gz", size=100)]
+    )
+
+    with (
+        patch("homebrew_releaser.app.GITHUB_BASE_URL", local_server.url),
+        patch("homebrew_releaser.app.GITHUB_OWNER", "user"),
+        patch("homebrew_releaser.app.GITHUB_REPO", "repo"),
+    ):
+        with pytest.raises(SystemExit) as error:
+            _preflight_archive_urls(archive_urls, assets)
+
+    assert str(error.value).endswith(
+        f"\n{base_url}/repo-1.0.0-linux-arm46.tar.gz (404 Not Found)\n{base_url}/custom.tar.gz (404 Not Found)"
+    )
+    assert sorted(path for _, path, _ in local_server.requests) == [
+        "/user/repo/releases/download/v1.0.0/custom.tar.gz",
+        "/user/repo/releases/download/v1.0.0/repo-1.0.0-linux-amd64.tar.gz",
+        "/user/repo/releases/download/v1.0.0/repo-1.0.0-linux-arm46.tar.gz",
+    ]
+
+
+@patch("homebrew_releaser.app.get_session")
+def test_preflight_archive_urls_from_metadata(mock_get_session):
+    """Tests that no requests are made when every release asset is in the metadata."""
+    archive_url = f"{GITHUB_BASE_URL}/user/repo/releases/download/v1.0.0/repo-1.0.0-darwin-amd64.tar.gz"
+
+    with patch("homebrew_releaser.app.GITHUB_OWNER", "user"), patch("homebrew_releaser.app.GITHUB_REPO", "repo"):
+        _preflight_archive_urls([archive_url], ReleaseAssets([ReleaseAsset("mock.tar.gz", archive_url, size=100)]))
+
+    mock_get_session.assert_not_called()
@@ -0,0 +1,137 @@
+import io
+import tarfile
+
+import pytest
+
+from homebrew_releaser.archive_inspector import (
+    ArchiveInspector,
+    generate_install_instructions,
+    get_tar_stream_mode,
+)
+
+
+def _build_tarball(files, mode="w:gz"):
+    """Builds a tarball in memory from a dictionary of paths and their modes."""
+    content = io.BytesIO()
+    with tarfile.open(fileobj=content, mode=mode) as archive:
+        for path, file_mode in files.items():
+            member = tarfile.TarInfo(path)
+            member.mode = file_mode
+            member.size = 3
+            archive.addfile(member, io.BytesIO(b"123"))
+
+    return content.getvalue()
+
+
+def _feed(inspector, content, chunk_size=100):
+    for offset in range(0, len(content), chunk_size):
+        inspector.feed(content[offset : offset + chunk_size])
+
+
+@pytest.mark.parametrize("mode", ["w:gz", "w:xz"])
+def test_archive_inspector(mode):
+    """Tests that the files of a tarball are listed from its chunks as they stream in."""
+    files = {"my-tool-1.0.0/my-tool": 0o755, "my-tool-1.0.0/README.md": 0o644}
+    inspector = ArchiveInspector(f"my-tool.{'tar.gz' if mode == 'w:gz' else 'tar.xz'}")
+
+    _feed(inspector, _build_tarball(files, mode))
+
+    assert inspector.finish() == list(files.items())
+
+
+def test_archive_inspector_unreadable():
+    """Tests that an archive that can't be read doesn't hold up its download and yields nothing."""
+    inspector = ArchiveInspector("my-tool.tar.gz")
+
+    # More chunks than the inspector holds while it catches up
+    _feed(inspector, b"not a tarball" * 1000, chunk_size=10)
+
+    assert inspector.finish() is None
+
+
+def test_archive_inspector_abandon():
+    """Tests that an abandoned inspection yields nothing and ignores any further chunks."""
+    content = _build_tarball({"my-tool": 0o755})
+    inspector = ArchiveInspector("my-tool.tar.gz")
+
+    _feed(inspector, content[:50])
+    inspector.abandon()
+    _feed(inspector, content)
+
+    assert inspector.finish() is None
+
+
+def test_get_tar_stream_mode():
+    assert get_tar_stream_mode("my-tool.tar.gz") == "r|gz"
+    assert get_tar_stream_mode("my-tool.tgz") == "r|gz"
+    assert get_tar_stream_mode("my-tool.tar.xz") == "r|xz"
+    assert get_tar_stream_mode("my-tool.zip") is None
+
+
+def test_generate_install_instructions():
+    """Tests that executables, man pages, and completions are installed relative to the top level directory."""
+    install = generate_install_instructions(
+        [
+            [
+                ("./my-tool-1.0.0/my-tool", 0o755),
+                ("./my-tool-1.0.0/README.md", 0o644),
+                ("./my-tool-1.0.0/man/man1/my-tool.1.gz", 0o644),
+                ("./my-tool-1.0.0/completions/my-tool.bash", 0o644),
+                ("./my-tool-1.0.0/completions/_my-tool", 0o644),
+                ("./my-tool-1.0.0/completions/my-tool.fish", 0o644),
+            ],
+            [("./my-tool-1.0.0/my-tool", 0o755)],  # The same file from another target's archive
+        ]
+    )
+
+    assert install == "\n".join(
+        [
+            'bin.install "my-tool"',
+            'man1.install "man/man1/my-tool.1.gz"',
+            'zsh_completion.install "completions/_my-tool" => "_my-tool"',
+            'bash_completion.install "completions/my-tool.bash" => "my-tool"',
+            'fish_completion.install "completions/my-tool.fish"',
+        ]
+    )
+
+
+def test_generate_install_instructions_no_top_level_dir():
+    """Tests that paths are kept whole when the archive has no single top level directory."""
+    install = generate_install_instructions(
+        [[("bin/my-tool", 0o755), ("bin/my-other-tool", 0o755), ("LICENSE", 0o644)]]
+    )
+
+    assert install == 'bin.install "bin/my-other-tool"\nbin.install "bin/my-tool"'
+
+
+def test_generate_install_instructions_top_level_dir_per_target():
+    """Tests that each target's top level directory is stripped so one install block works for every target."""
+    install = generate_install_instructions(
+        [
+            [("tool-1.0-darwin-arm64/tool", 0o755), ("tool-1.0-darwin-arm64/README.md", 0o644)],
+            [("tool-1.0-linux-amd64/tool", 0o755), ("tool-1.0-linux-amd64/README.md", 0o644)],
+        ]
+    )
+
+    assert install == 'bin.install "tool"'
+
+
+def test_generate_install_instructions_libraries():
+    """Tests that libraries and executable files outside the top level and `bin` directories are not installed."""
+    install = generate_install_instructions(
+        [
+            [
+                ("tool-1.0/bin/tool", 0o755),
+                ("tool-1.0/lib/libfoo.so", 0o755),
+                ("tool-1.0/libfoo.so.1.2", 0o755),
+                ("tool-1.0/libfoo.dylib", 0o755),
+                ("tool-1.0/scripts/helper.sh", 0o755),
+            ]
+        ]
+    )
+
+    assert install == 'bin.install "bin/tool"'
+
+
+def test_generate_install_instructions_nothing_to_install():
+    assert generate_install_instructions([[("my-tool-1.0.0/README.md", 0o644)]]) is None
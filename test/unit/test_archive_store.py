@@ -0,0 +1,60 @@
+import os
+from unittest.mock import patch
+
+from homebrew_releaser.archive_store import ArchiveStore
+
+
+@patch("homebrew_releaser.archive_store.ARCHIVE_SPOOL_MAX_SIZE", 10)
+def test_archive_store_open():
+    """Tests that small archives stay in memory and larger ones spill over onto disk."""
+    archive_store = ArchiveStore()
+
+    with archive_store.open("small.tar.gz") as archive:
+        archive.write(b"123")
+        assert not archive._rolled  # type: ignore
+
+    with archive_store.open("large.tar.gz") as archive:
+        archive.write(b"12345678901")
+        assert archive._rolled  # type: ignore
+
+    assert os.listdir(archive_store.directory) == []
+    archive_store.cleanup()
+
+
+@patch("homebrew_releaser.archive_store.DEBUG", True)
+@patch("homebrew_releaser.utils.WORKING_DIR", "")
+def test_archive_store_open_debug(tmp_path):
+    """Tests that archives are kept in the working directory when debugging."""
+    archive_store = ArchiveStore()
+    filepath = str(tmp_path / "mock-file.tar.gz")
+
+    with archive_store.open(filepath) as archive:
+        archive.write(b"123")
+
+    with open(filepath, "rb") as archive:
+        assert archive.read() == b"123"
+
+
+def test_archive_store_add(tmp_path):
+    """Tests that a finished archive written elsewhere (eg: a `.part` file) is removed when not debugging."""
+    archive_store = ArchiveStore()
+    part_path = tmp_path / "mock-file.tar.gz.part"
+    part_path.write_bytes(b"123")
+
+    archive_store.add(str(part_path), "mock-file.tar.gz")
+
+    assert not part_path.exists()
+    assert not os.path.exists(archive_store.path("mock-file.tar.gz"))
+    archive_store.cleanup()
+
+
+def test_archive_store_cleanup():
+    """Tests that the temporary directory is removed along with anything left in it."""
+    archive_store = ArchiveStore()
+    with open(archive_store.path("mock-file.tar.gz"), "wb") as archive:
+        archive.write(b"123")
+    directory = archive_store.directory
+
+    archive_store.cleanup()
+
+    assert not os.path.exists(directory)
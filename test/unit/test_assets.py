@@ -0,0 +1,130 @@
+from unittest.mock import patch
+
+from homebrew_releaser.assets import (
+    ReleaseAsset,
+    ReleaseAssets,
+    resolve_target_assets,
+)
+
+TARGETS = ["darwin-amd64", "darwin-arm64", "linux-amd64", "linux-arm64"]
+
+
+def _assets(*names):
+    return [
+        ReleaseAsset(name=name, browser_download_url=f"https://github.com/user/repo/releases/download/v1.0.0/{name}")
+        for name in names
+    ]
+
+
+def _resolved_names(assets, targets=TARGETS):
+    resolved_assets = resolve_target_assets(ReleaseAssets(assets), targets, "repo", "1.0.0")
+
+    return {target: asset.name for target, asset in resolved_assets.items()}
+
+
+def test_release_asset_from_json():
+    asset = ReleaseAsset.from_json(
+        {
+            "name": "repo.tar.gz",
+            "browser_download_url": "mock-browser-url",
+            "url": "mock-api-url",
+            "size": 100,
+            "digest": "sha256:123",
+            "uploader": {"login": "user"},
+        }
+    )
+
+    assert asset == ReleaseAsset("repo.tar.gz", "mock-browser-url", "mock-api-url", 100, "sha256:123")
+    assert not hasattr(asset, "__dict__")
+
+
+def test_release_assets_lookup():
+    """Tests that assets can be looked up by name or URL and only as many are loaded as the lookup needs."""
+    loaded_names = []
+
+    def _load_assets():
+        for asset in _assets("a.tar.gz", "b.tar.gz", "c.tar.gz"):
+            loaded_names.append(asset.name)
+            yield asset
+
+    assets = ReleaseAssets(_load_assets())
+
+    assert assets.get("b.tar.gz").name == "b.tar.gz"  # type: ignore
+    assert loaded_names == ["a.tar.gz", "b.tar.gz"]
+    assert assets.get("https://github.com/user/repo/releases/download/v1.0.0/a.tar.gz").name == "a.tar.gz"  # type: ignore
+    assert loaded_names == ["a.tar.gz", "b.tar.gz"]
+    assert [asset.name for asset in assets] == ["a.tar.gz", "b.tar.gz", "c.tar.gz"]
+    assert "missing.tar.gz" not in assets
+
+
+def test_resolve_target_assets_stops_early():
+    """Tests that no more assets are loaded once every target has a conventionally named asset."""
+    loaded_names = []
+
+    def _load_assets():
+        for asset in _assets("repo-1.0.0-linux-amd64.tar.gz", "repo-1.0.0-linux-arm64.tar.gz", "other.tar.gz"):
+            loaded_names.append(asset.name)
+            yield asset
+
+    resolve_target_assets(ReleaseAssets(_load_assets()), ["linux-arm64", "linux-amd64"], "repo", "1.0.0")
+
+    assert loaded_names == ["repo-1.0.0-linux-amd64.tar.gz", "repo-1.0.0-linux-arm64.tar.gz"]
+
+
+def test_resolve_target_assets_conventional_name():
+    """Tests that an asset following the documented naming convention always wins."""
+    assets = _assets("repo_1.0.0_darwin_amd64.zip", "repo-1.0.0-darwin-amd64.tar.gz", "repo-darwin-amd64.tgz")
+
+    assert _resolved_names(assets, ["darwin-amd64"]) == {"darwin-amd64": "repo-1.0.0-darwin-amd64.tar.gz"}
+
+
+def test_resolve_target_assets_aliases():
+    """Tests that os and arch aliases are matched as whole words in either order."""
+    assets = _assets(
+        "repo_1.0.0_Darwin_x86_64.tar.gz",
+        "repo_1.0.0_macOS_arm64.tar.xz",
+        "repo-x86_64-unknown-linux-musl.zip",
+        "repo-aarch64-unknown-linux-gnu.tar.gz",
+        "repo-aarch64-unknown-linux-gnu.tar.gz.sha256",
+        "checksums.txt",
+    )
+
+    assert _resolved_names(assets) == {
+        "darwin-amd64": "repo_1.0.0_Darwin_x86_64.tar.gz",
+        "darwin-arm64": "repo_1.0.0_macOS_arm64.tar.xz",
+        "linux-amd64": "repo-x86_64-unknown-linux-musl.zip",
+        "linux-arm64": "repo-aarch64-unknown-linux-gnu.tar.gz",
+    }
+
+
+def test_resolve_target_assets_extension_preference():
+    """Tests that tarballs are preferred over zips when a target has several archives."""
+    assets = _assets("repo-linux-amd64.zip", "repo-linux-amd64.tar.xz", "repo-linux-amd64.tar.gz")
+
+    assert _resolved_names(assets, ["linux-amd64"]) == {"linux-amd64": "repo-linux-amd64.tar.gz"}
+
+
+def test_resolve_target_assets_missing():
+    """Tests that targets without a matching asset are left out so the naming convention can be used instead."""
+    assets = _assets("repo-linux-amd64.tar.gz", "repo-xarm64-linux.tar.gz")
+
+    assert _resolved_names(assets) == {"linux-amd64": "repo-linux-amd64.tar.gz"}
+
+
+@patch("homebrew_releaser.assets.TARGET_ASSET_PATTERN", "{repo}-v{version}.{os}.{arch}{ext}")
+def test_resolve_target_assets_custom_pattern():
+    """Tests that a custom pattern only matches assets named exactly as it describes."""
+    assets = _assets("repo-v1.0.0.darwin.aarch64.tar.gz", "repo-darwin-arm64.tar.gz", "repo-v1.0.0.linux.x86_64.zip")
+
+    assert _resolved_names(assets) == {
+        "darwin-arm64": "repo-v1.0.0.darwin.aarch64.tar.gz",
+        "linux-amd64": "repo-v1.0.0.linux.x86_64.zip",
+    }
+
+
+def test_resolve_target_assets_many_assets():
+    """Tests that releases with many assets still resolve every target."""
+    assets = _assets(*(f"repo-plugin-{index}-linux-riscv64.tar.gz" for index in range(200)))
+    assets += _assets("repo-1.0.0-linux-arm64.tar.gz")
+
+    assert _resolved_names(assets) == {"linux-arm64": "repo-1.0.0-linux-arm64.tar.gz"}
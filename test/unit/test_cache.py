@@ -0,0 +1,174 @@
+import os
+from unittest.mock import (
+    MagicMock,
+    patch,
+)
+
+from homebrew_releaser.cache import (
+    cache_api_response,
+    cache_checksum,
+    get_cached_api_response,
+    get_cached_checksum_entry,
+    get_conditional_headers,
+    is_cached_checksum_current,
+    touch_cached_checksum,
+)
+
+URL = "https://github.com/Justintime50/homebrew-releaser/releases/download/v0.1.0/homebrew-releaser.tar.gz"
+
+
+def _mock_response(status_code=200, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+
+    return response
+
+
+def _count_cache_entries(cache_dir):
+    return sum(len(filenames) for _, _, filenames in os.walk(cache_dir))
+
+
+@patch("homebrew_releaser.cache.CHECKSUM_CACHE_DIR", None)
+def test_get_cached_checksum_entry_disabled():
+    """Tests that nothing is read from the cache when it isn't enabled."""
+    assert get_cached_checksum_entry(URL) is None
+
+
+def test_get_cached_checksum_entry_missing(tmp_path):
+    with patch("homebrew_releaser.cache.CHECKSUM_CACHE_DIR", str(tmp_path)):
+        assert get_cached_checksum_entry(URL) is None
+
+
+def test_cache_checksum(tmp_path):
+    """Tests that we can cache a checksum and read it back on a later run."""
+    response = _mock_response(headers={"ETag": '"mock-etag"', "Content-Length": "12"})
+
+    with patch("homebrew_releaser.cache.CHECKSUM_CACHE_DIR", str(tmp_path)):
+        cache_checksum(URL, response, "123")
+        entry = get_cached_checksum_entry(URL)
+
+    assert entry == {
+        "url": URL,
+        "etag": '"mock-etag"',
+        "last_modified": None,
+        "content_length": "12",
+        "checksum": "123",
+    }
+
+
+def test_cache_checksum_no_validators(tmp_path):
+    """Tests that we don't cache archives we'd have no way of revalidating."""
+    with patch("homebrew_releaser.cache.CHECKSUM_CACHE_DIR", str(tmp_path)):
+        cache_checksum(URL, _mock_response(headers={"Content-Length": "12"}), "123")
+
+        assert get_cached_checksum_entry(URL) is None
+
+
+@patch("homebrew_releaser.cache.CHECKSUM_CACHE_MAX_ENTRIES", 2)
+def test_cache_checksum_evicts_least_recently_used(tmp_path):
+    """Tests that the oldest entries are evicted once the cache is full and recently used ones are kept."""
+    response = _mock_response(headers={"ETag": '"mock-etag"'})
+
+    with patch("homebrew_releaser.cache.CHECKSUM_CACHE_DIR", str(tmp_path)):
+        cache_checksum(f"{URL}-1", response, "1")
+        cache_checksum(f"{URL}-2", response, "2")
+
+        # Age both entries, then use the first one again so the second becomes the least recently used
+        for url in (f"{URL}-1", f"{URL}-2"):
+            touch_cached_checksum(url)
+        for dirpath, _, filenames in os.walk(tmp_path):
+            for filename in filenames:
+                os.utime(os.path.join(dirpath, filename), (0, 0))
+        touch_cached_checksum(f"{URL}-1")
+
+        cache_checksum(f"{URL}-3", response, "3")
+
+        assert _count_cache_entries(tmp_path) == 2
+        assert get_cached_checksum_entry(f"{URL}-1") is not None
+        assert get_cached_checksum_entry(f"{URL}-2") is None
+        assert get_cached_checksum_entry(f"{URL}-3") is not None
+
+
+@patch("homebrew_releaser.cache.MAX_CACHE_SIZE", 800)
+def test_cache_evicts_beyond_max_size(tmp_path):
+    """Tests that the oldest entries are evicted once the cache takes up too much disk, however few there are."""
+    response = _mock_response(headers={"ETag": '"mock-etag"', "Content-Type": "application/json"})
+    response.text = '{"name": "%s"}' % ("a" * 200)
+
+    with patch("homebrew_releaser.cache.CHECKSUM_CACHE_DIR", str(tmp_path)):
+        for index in range(3):
+            cache_api_response(f"{URL}-{index}", response)
+            # Backdate the entry just written so each one is older than the next
+            for dirpath, _, filenames in os.walk(tmp_path):
+                for filename in filenames:
+                    if os.path.getmtime(os.path.join(dirpath, filename)) > 100:
+                        os.utime(os.path.join(dirpath, filename), (index, index))
+
+        assert get_cached_api_response(f"{URL}-0") is None
+        assert get_cached_api_response(f"{URL}-1") is not None
+        assert get_cached_api_response(f"{URL}-2") is not None
+
+
+@patch("homebrew_releaser.cache.MAX_CACHED_API_RESPONSE_SIZE", 10)
+def test_cache_api_response_too_large(tmp_path):
+    """Tests that large API responses are never cached."""
+    response = _mock_response(headers={"ETag": '"mock-etag"', "Content-Type": "application/json"})
+    response.text = '{"name": "repo"}'
+
+    with patch("homebrew_releaser.cache.CHECKSUM_CACHE_DIR", str(tmp_path)):
+        cache_api_response(URL, response)
+
+        assert get_cached_api_response(URL) is None
+
+
+def test_get_conditional_headers():
+    entry = {"etag": '"mock-etag"', "last_modified": "Wed, 21 Oct 2015 07:28:00 GMT"}
+
+    assert get_conditional_headers(entry) == {
+        "If-None-Match": '"mock-etag"',
+        "If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT",
+    }
+    assert get_conditional_headers(None) == {}
+
+
+def test_is_cached_checksum_current_not_modified():
+    assert is_cached_checksum_current({"etag": '"mock-etag"'}, _mock_response(status_code=304))
+
+
+def test_is_cached_checksum_current_same_validators():
+    """Tests that a full response with unchanged validators still counts as a cache hit."""
+    entry = {"etag": '"mock-etag"', "content_length": "12"}
+    response = _mock_response(headers={"ETag": '"mock-etag"', "Content-Length": "12"})
+
+    assert is_cached_checksum_current(entry, response)
+
+
+def test_is_cached_checksum_current_changed():
+    entry = {"etag": '"mock-etag"', "content_length": "12"}
+    response = _mock_response(headers={"ETag": '"new-etag"', "Content-Length": "12"})
+
+    assert not is_cached_checksum_current(entry, response)
+    assert not is_cached_checksum_current(None, _mock_response(status_code=304))
+
+
+def test_cache_api_response(tmp_path):
+    """Tests that we can cache an API response body and read it back on a later run."""
+    response = _mock_response(headers={"ETag": '"mock-etag"', "Content-Type": "application/json"})
+    response.text = '{"name": "repo"}'
+
+    with patch("homebrew_releaser.cache.CHECKSUM_CACHE_DIR", str(tmp_path)):
+        cache_api_response(URL, response)
+        entry = get_cached_api_response(URL)
+
+    assert entry == {"url": URL, "etag": '"mock-etag"', "last_modified": None, "body": '{"name": "repo"}'}
+
+
+def test_cache_api_response_not_json(tmp_path):
+    """Tests that non-JSON responses (eg: an archive downloaded without streaming) are never cached whole."""
+    response = _mock_response(headers={"ETag": '"mock-etag"', "Content-Type": "application/x-gzip"})
+
+    with patch("homebrew_releaser.cache.CHECKSUM_CACHE_DIR", str(tmp_path)):
+        cache_api_response(URL, response)
+
+        assert get_cached_api_response(URL) is None
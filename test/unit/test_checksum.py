@@ -1,4 +1,3 @@
-import subprocess
 from unittest.mock import (
     mock_open,
     patch,
@@ -7,44 +6,82 @@ from unittest.mock import (
 import pytest
 import requests
 
+from homebrew_releaser.assets import ReleaseAsset
 from homebrew_releaser.checksum import (
-    calculate_checksum,
+    calculate_file_checksum,
+    get_asset_digest,
+    parse_checksum_manifest,
     upload_checksum_file,
 )
 
 
-@patch("homebrew_releaser.utils.WORKING_DIR", "")
-def test_calculate_checksum():
-    """Tests that we can get the checksum of a file (we use one that will never change)."""
-    checksum = calculate_checksum("homebrew_releaser/__init__.py")
+@patch("homebrew_releaser.checksum.CHUNK_SIZE", 5)
+def test_calculate_file_checksum(tmp_path):
+    """Tests that a memory-mapped file hashed across several chunks matches hashing it all at once."""
+    filepath = tmp_path / "mock-file.tar.gz"
+    filepath.write_bytes(b"mock-content")
+
+    checksum = calculate_file_checksum(str(filepath))
+
+    assert checksum == "24d5542ea2f2748799544070f865938c18699a4c18981926012a2c03a07f3d3a"
+
+
+def test_calculate_file_checksum_empty_file(tmp_path):
+    filepath = tmp_path / "mock-file.tar.gz"
+    filepath.write_bytes(b"")
+
+    checksum = calculate_file_checksum(str(filepath))
 
     assert checksum == "e3b0c44298fc1c149afbf4c8996fb92427ae41e4649b934ca495991b7852b855"
 
 
-@patch(
-    "subprocess.check_output", side_effect=subprocess.CalledProcessError(returncode=1, cmd="subprocess.check_output")
-)
-def test_calculate_checksum_process_error(mock_subprocess, mock_tar_filename):
-    with pytest.raises(FileNotFoundError):
-        calculate_checksum(mock_tar_filename)
+def test_get_asset_digest():
+    """Tests that we only use SHA-256 digests GitHub published for an asset."""
+    assert get_asset_digest(ReleaseAsset("mock.tar.gz", "mock-url", digest="sha256:123")) == "123"
+    assert get_asset_digest(ReleaseAsset("mock.tar.gz", "mock-url", digest="sha512:123")) is None
+    assert get_asset_digest(ReleaseAsset("mock.tar.gz", "mock-url")) is None
+
+
+def test_parse_checksum_manifest():
+    """Tests that we can parse the common checksum manifest formats."""
+    content = (
+        f"{'a' * 64}  foo-darwin-amd64.tar.gz\n"
+        f"{'B' * 64} *dist/foo-linux-amd64.tar.gz\n"
+        f"SHA256 (foo-linux-arm64.tar.gz) = {'c' * 64}\n"
+        "# not a checksum\n"
+        "\n"
+    )
+
+    assert parse_checksum_manifest(content) == {
+        "foo-darwin-amd64.tar.gz": "a" * 64,
+        "foo-linux-amd64.tar.gz": "b" * 64,
+        "foo-linux-arm64.tar.gz": "c" * 64,
+    }
+
+
+def test_parse_checksum_manifest_checksum_only():
+    """Tests that sidecars containing only a checksum are keyed by an empty filename."""
+    assert parse_checksum_manifest(f"{'a' * 64}\n") == {"": "a" * 64}
 
 
-@patch("requests.post")
+@patch("homebrew_releaser.checksum.get_session")
 @patch("homebrew_releaser.utils.make_github_get_request")
-def test_upload_checksum_file(mock_make_github_get_request, mock_post_request):
+def test_upload_checksum_file(mock_make_github_get_request, mock_session):
     """Tests that we make the GET call to retrieve the latest release and the
     POST call to upload the checksum.txt file.
     """
     with patch("builtins.open", mock_open()):
         upload_checksum_file({"id": 1, "tag_name": "v1.0.0"})
 
-        mock_post_request.assert_called_once()
+        mock_session.return_value.post.assert_called_once()
 
 
-@patch("requests.post", side_effect=requests.exceptions.RequestException("mock-error"))
+@patch("homebrew_releaser.checksum.get_session")
 @patch("homebrew_releaser.utils.make_github_get_request")
-def test_upload_checksum_file_error_on_upload(mock_make_github_get_request, mock_post_request):
+def test_upload_checksum_file_error_on_upload(mock_make_github_get_request, mock_session):
     """Tests that we exit on error to upload checksum.txt file."""
+    mock_post_request = mock_session.return_value.post
+    mock_post_request.side_effect = requests.exceptions.RequestException("mock-error")
     with patch("builtins.open", mock_open()):
         with pytest.raises(requests.exceptions.RequestException) as error:
             upload_checksum_file({"id": 1, "tag_name": "v1.0.0"})
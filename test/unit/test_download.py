@@ -0,0 +1,337 @@
+import fcntl
+import hashlib
+import io
+import os
+import tarfile
+import threading
+import time
+from unittest.mock import (
+    MagicMock,
+    patch,
+)
+
+import pytest
+import requests
+
+from homebrew_releaser.archive_inspector import ArchiveInspector
+from homebrew_releaser.download import (
+    _build_part_path,
+    _evict_part_files,
+    download_resumable,
+    download_segmented,
+    is_segmentable,
+    make_hedged_request,
+)
+from homebrew_releaser.utils import make_github_get_request
+
+CONTENT = os.urandom(1024 * 10 + 7)  # Doesn't split evenly into segments on purpose
+
+
+def _mock_response(status_code=200, content_length="1000", accept_ranges="bytes"):
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = {"Content-Length": content_length, "Accept-Ranges": accept_ranges}
+
+    return response
+
+
+@patch("homebrew_releaser.download.SEGMENTED_DOWNLOAD_THRESHOLD", 100)
+def test_is_segmentable():
+    assert is_segmentable(_mock_response())
+    assert not is_segmentable(_mock_response(content_length="100"))
+    assert not is_segmentable(_mock_response(accept_ranges="none"))
+    assert not is_segmentable(_mock_response(status_code=304))
+
+
+@patch("homebrew_releaser.download.SEGMENTED_DOWNLOAD_THRESHOLD", 0)
+def test_is_segmentable_disabled():
+    assert not is_segmentable(_mock_response())
+
+
+@patch("homebrew_releaser.archive_store.DEBUG", True)
+@patch("homebrew_releaser.download.SEGMENTED_DOWNLOAD_SEGMENTS", 4)
+@patch("homebrew_releaser.download.CHUNK_SIZE", 1000)
+@patch("homebrew_releaser.utils.WORKING_DIR", "")
+def test_download_segmented(local_server, tmp_path):
+    """Tests that a segmented download reassembles the archive on disk and hashes it in order."""
+    local_server.files["/archive.tar.gz"] = CONTENT
+    filepath = str(tmp_path / "archive.tar.gz")
+
+    response = make_github_get_request(url=f"{local_server.url}/archive.tar.gz", stream=True)
+    with response:
+        checksum = download_segmented(response, filepath)
+
+    assert checksum == hashlib.sha256(CONTENT).hexdigest()
+    with open(filepath, "rb") as archive:
+        assert archive.read() == CONTENT
+
+    # The original request serves as the first segment, the rest are Range requests
+    range_headers = sorted(headers.get("Range", "") for _, _, headers in local_server.requests)
+    assert range_headers == ["", "bytes=2562-5123", "bytes=5124-7685", "bytes=7686-10246"]
+
+
+@patch("homebrew_releaser.download.SEGMENTED_DOWNLOAD_SEGMENTS", 4)
+@patch("homebrew_releaser.utils.WORKING_DIR", "")
+def test_download_segmented_error(local_server, tmp_path):
+    """Tests that a failed segment fails the whole download."""
+    local_server.files["/archive.tar.gz"] = CONTENT
+    response = make_github_get_request(url=f"{local_server.url}/archive.tar.gz", stream=True)
+    del local_server.files["/archive.tar.gz"]
+
+    with response:
+        with pytest.raises(requests.HTTPError):
+            download_segmented(response, str(tmp_path / "archive.tar.gz"))
+
+
+@patch("homebrew_releaser.archive_store.DEBUG", True)
+@patch("homebrew_releaser.download.CHECKSUM_CACHE_DIR", "")
+@patch("homebrew_releaser.utils.WORKING_DIR", "")
+def test_download_resumable(local_server, tmp_path):
+    """Tests that a download is written to the archive store, kept on disk when debugging."""
+    local_server.files["/archive.tar.gz"] = CONTENT
+    url = f"{local_server.url}/archive.tar.gz"
+    filepath = str(tmp_path / "archive.tar.gz")
+
+    with make_github_get_request(url=url, stream=True) as response:
+        checksum = download_resumable(url, response, filepath)
+
+    assert checksum == hashlib.sha256(CONTENT).hexdigest()
+    with open(filepath, "rb") as archive:
+        assert archive.read() == CONTENT
+
+
+@patch("homebrew_releaser.download.CHECKSUM_CACHE_DIR", "")
+def test_download_resumable_not_kept(local_server, tmp_path):
+    """Tests that a downloaded archive is only hashed and not left behind anywhere."""
+    local_server.files["/archive.tar.gz"] = CONTENT
+    url = f"{local_server.url}/archive.tar.gz"
+
+    with patch("homebrew_releaser.archive_store.archive_store._directory", str(tmp_path)):
+        with make_github_get_request(url=url, stream=True) as response:
+            checksum = download_resumable(url, response, "archive.tar.gz")
+
+    assert checksum == hashlib.sha256(CONTENT).hexdigest()
+    assert os.listdir(tmp_path) == []
+
+
+@patch("homebrew_releaser.archive_store.DEBUG", True)
+@patch("homebrew_releaser.download.CHECKSUM_CACHE_DIR", "")
+@patch("homebrew_releaser.download.CHUNK_SIZE", 1000)
+@patch("homebrew_releaser.utils.WORKING_DIR", "")
+def test_download_resumable_interrupted(local_server, tmp_path):
+    """Tests that a dropped connection is resumed with a Range request from where it left off."""
+    local_server.files["/archive.tar.gz"] = CONTENT
+    local_server.drop_after["/archive.tar.gz"] = 4000
+    url = f"{local_server.url}/archive.tar.gz"
+    filepath = str(tmp_path / "archive.tar.gz")
+
+    with make_github_get_request(url=url, stream=True) as response:
+        checksum = download_resumable(url, response, filepath)
+
+    assert checksum == hashlib.sha256(CONTENT).hexdigest()
+    with open(filepath, "rb") as archive:
+        assert archive.read() == CONTENT
+    assert local_server.requests[-1][2]["Range"] == "bytes=4000-"
+    assert local_server.requests[-1][2]["If-Range"] == f'"{hashlib.sha256(CONTENT).hexdigest()}"'
+
+
+@patch("homebrew_releaser.archive_store.DEBUG", True)
+@patch("homebrew_releaser.download.CHUNK_SIZE", 1000)
+@patch("homebrew_releaser.utils.WORKING_DIR", "")
+def test_download_resumable_across_runs(local_server, tmp_path):
+    """Tests that a `.part` file left behind by an earlier run is re-hashed and only the rest is downloaded."""
+    local_server.files["/archive.tar.gz"] = CONTENT
+    local_server.drop_after["/archive.tar.gz"] = 4000
+    url = f"{local_server.url}/archive.tar.gz"
+    filepath = str(tmp_path / "archive.tar.gz")
+
+    with patch("homebrew_releaser.download.CHECKSUM_CACHE_DIR", str(tmp_path / "cache")):
+        # An earlier run that gave up after the connection dropped
+        with patch("homebrew_releaser.download.MAX_RETRIES", 0):
+            with make_github_get_request(url=url, stream=True) as response:
+                with pytest.raises(requests.RequestException):
+                    download_resumable(url, response, filepath)
+
+        with make_github_get_request(url=url, stream=True) as response:
+            checksum = download_resumable(url, response, filepath)
+
+    assert checksum == hashlib.sha256(CONTENT).hexdigest()
+    with open(filepath, "rb") as archive:
+        assert archive.read() == CONTENT
+    assert local_server.requests[-1][2]["Range"] == "bytes=4000-"
+    assert os.listdir(tmp_path / "cache" / "partial") == []
+
+
+@patch("homebrew_releaser.archive_store.DEBUG", True)
+@patch("homebrew_releaser.download.CHUNK_SIZE", 1000)
+@patch("homebrew_releaser.utils.WORKING_DIR", "")
+def test_download_resumable_changed_archive(local_server, tmp_path):
+    """Tests that a `.part` file is discarded when the archive changed since it was written."""
+    local_server.files["/archive.tar.gz"] = CONTENT
+    local_server.drop_after["/archive.tar.gz"] = 4000
+    url = f"{local_server.url}/archive.tar.gz"
+    filepath = str(tmp_path / "archive.tar.gz")
+    new_content = os.urandom(len(CONTENT))
+
+    with patch("homebrew_releaser.download.CHECKSUM_CACHE_DIR", str(tmp_path / "cache")):
+        with patch("homebrew_releaser.download.MAX_RETRIES", 0):
+            with make_github_get_request(url=url, stream=True) as response:
+                with pytest.raises(requests.RequestException):
+                    download_resumable(url, response, filepath)
+
+        local_server.files["/archive.tar.gz"] = new_content
+        with make_github_get_request(url=url, stream=True) as response:
+            checksum = download_resumable(url, response, filepath)
+
+    assert checksum == hashlib.sha256(new_content).hexdigest()
+    assert "Range" not in local_server.requests[-1][2]
+
+
+@patch("homebrew_releaser.archive_store.DEBUG", True)
+@patch("homebrew_releaser.download.CHUNK_SIZE", 1000)
+@patch("homebrew_releaser.utils.WORKING_DIR", "")
+def test_download_resumable_part_file_locked(local_server, tmp_path):
+    """Tests that a `.part` file another job is writing is left alone and the archive is downloaded without it."""
+    local_server.files["/archive.tar.gz"] = CONTENT
+    url = f"{local_server.url}/archive.tar.gz"
+    filepath = str(tmp_path / "archive.tar.gz")
+
+    with patch("homebrew_releaser.download.CHECKSUM_CACHE_DIR", str(tmp_path / "cache")):
+        part_path = _build_part_path(url)
+        os.makedirs(os.path.dirname(part_path))
+        with open(part_path, "wb") as part_file, open(f"{part_path}.lock", "w") as lock_file:
+            part_file.write(b"another job's download")
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            with make_github_get_request(url=url, stream=True) as response:
+                checksum = download_resumable(url, response, filepath)
+
+    assert checksum == hashlib.sha256(CONTENT).hexdigest()
+    assert "Range" not in local_server.requests[-1][2]
+    with open(part_path, "rb") as part_file:
+        assert part_file.read() == b"another job's download"
+
+
+def test_evict_part_files(tmp_path):
+    """Tests that stale `.part` files are evicted, as are the oldest ones once they take up too much space."""
+    partial_dir = tmp_path / "partial"
+    partial_dir.mkdir()
+    part_files = {}
+    for name, age, size in [("stale", 2 * 24 * 60 * 60, 10), ("old", 60, 60), ("new", 0, 60)]:
+        part_files[name] = partial_dir / f"{name}.part"
+        part_files[name].write_bytes(b"0" * size)
+        (partial_dir / f"{name}.part.json").write_text("{}")
+        modified_at = time.time() - age
+        os.utime(part_files[name], (modified_at, modified_at))
+
+    with (
+        patch("homebrew_releaser.download.CHECKSUM_CACHE_DIR", str(tmp_path)),
+        patch("homebrew_releaser.download.MAX_PART_FILES_SIZE", 100),
+    ):
+        _evict_part_files()
+
+    assert sorted(os.listdir(partial_dir)) == ["new.part", "new.part.json"]
+
+
+@patch("homebrew_releaser.download.CHECKSUM_CACHE_DIR", "")
+@patch("homebrew_releaser.download.CHUNK_SIZE", 1000)
+def test_download_resumable_inspected(local_server):
+    """Tests that an archive is inspected from the same chunks that are hashed, even across a dropped connection."""
+    tarball = io.BytesIO()
+    with tarfile.open(fileobj=tarball, mode="w:gz") as archive:
+        member = tarfile.TarInfo("my-tool-1.0.0/my-tool")
+        member.mode = 0o755
+        member.size = len(CONTENT)
+        archive.addfile(member, io.BytesIO(CONTENT))
+    local_server.files["/archive.tar.gz"] = tarball.getvalue()
+    local_server.drop_after["/archive.tar.gz"] = 4000
+    url = f"{local_server.url}/archive.tar.gz"
+    inspector = ArchiveInspector("archive.tar.gz")
+
+    with make_github_get_request(url=url, stream=True) as response:
+        checksum = download_resumable(url, response, "archive.tar.gz", inspector)
+
+    assert checksum == hashlib.sha256(tarball.getvalue()).hexdigest()
+    assert inspector.finish() == [("my-tool-1.0.0/my-tool", 0o755)]
+
+
+def _mock_send_request(delays, errors=()):
+    """Builds a request function that responds to each URL after a delay, failing for URLs in `errors`."""
+    responses = {url: MagicMock(url=url) for url in delays}
+    calls = []
+    closed = threading.Event()
+    for response in responses.values():
+        response.close.side_effect = lambda *args: closed.set()
+
+    def _send_request(url):
+        calls.append(url)
+        threading.Event().wait(delays[url])
+        if url in errors:
+            raise requests.ConnectionError(f"{url} failed")
+        return responses[url]
+
+    return _send_request, responses, calls, closed
+
+
+@patch("homebrew_releaser.download.HEDGE_DOWNLOAD_AFTER", 0)
+def test_make_hedged_request_disabled():
+    """Tests that only one request is made when hedging is disabled."""
+    send_request, responses, calls, _ = _mock_send_request({"primary": 0.1})
+
+    response = make_hedged_request(send_request, "primary", "mirror")
+
+    assert response is responses["primary"]
+    assert calls == ["primary"]
+
+
+@patch("homebrew_releaser.download.HEDGE_DOWNLOAD_AFTER", 0.5)
+def test_make_hedged_request_fast():
+    """Tests that no second request is made when the first responds within the threshold."""
+    send_request, responses, calls, _ = _mock_send_request({"primary": 0})
+
+    response = make_hedged_request(send_request, "primary", "mirror")
+
+    assert response is responses["primary"]
+    assert calls == ["primary"]
+
+
+@patch("homebrew_releaser.download.HEDGE_DOWNLOAD_AFTER", 0.05)
+def test_make_hedged_request_slow():
+    """Tests that a slow request is raced against the mirror and the losing response is closed once it arrives."""
+    send_request, responses, calls, closed = _mock_send_request({"primary": 0.5, "mirror": 0})
+
+    response = make_hedged_request(send_request, "primary", "mirror")
+
+    assert response is responses["mirror"]
+    assert calls == ["primary", "mirror"]
+    assert closed.wait(timeout=5)
+    responses["primary"].close.assert_called_once()
+    responses["mirror"].close.assert_not_called()
+
+
+@patch("homebrew_releaser.download.HEDGE_DOWNLOAD_AFTER", 0.05)
+def test_make_hedged_request_same_url():
+    """Tests that the same URL is requested again when there is no mirror."""
+    send_request, responses, calls, _ = _mock_send_request({"primary": 0.2})
+
+    make_hedged_request(send_request, "primary")
+
+    assert calls == ["primary", "primary"]
+
+
+@patch("homebrew_releaser.download.HEDGE_DOWNLOAD_AFTER", 0.05)
+def test_make_hedged_request_one_fails():
+    """Tests that a hedged request failing doesn't fail the download when the other request succeeds."""
+    send_request, responses, _, _ = _mock_send_request({"primary": 0.2, "mirror": 0.1}, errors={"mirror"})
+
+    response = make_hedged_request(send_request, "primary", "mirror")
+
+    assert response is responses["primary"]
+
+
+@patch("homebrew_releaser.download.HEDGE_DOWNLOAD_AFTER", 0.05)
+def test_make_hedged_request_both_fail():
+    """Tests that the error is raised when both hedged requests fail."""
+    send_request, _, _, _ = _mock_send_request({"primary": 0.1, "mirror": 0.1}, errors={"primary", "mirror"})
+
+    with pytest.raises(requests.ConnectionError):
+        make_hedged_request(send_request, "primary", "mirror")
@@ -631,6 +631,61 @@ def test_one_of_each_matrix():
     assert "on_arm" in formula
 
 
+@patch("homebrew_releaser.formula.TARGET_DARWIN_AMD64", True)
+@patch("homebrew_releaser.formula.TARGET_LINUX_ARM64", True)
+def test_generate_formula_resolved_targets():
+    """Tests that targets resolved from the release's assets are used even when they don't follow the URL pattern.
+
+    NOTE: See docstring in `_record_formula` for more details on how recording formulas works.
+    """
+    formula_filename = f"{inspect.stack()[0][3]}.rb"
+    mock_repo_name = formula_filename.replace("_", "-").replace(".rb", "")
+    mock_tar_url = f"{GITHUB_BASE_URL}/{USERNAME}/{mock_repo_name}/archive/refs/tags/v0.1.0.tar.gz"
+    download_url = f"{GITHUB_BASE_URL}/justintime50/{mock_repo_name}/releases/download/0.1.0"
+
+    repository = {
+        "description": DESCRIPTION,
+        "license": LICENSE,
+    }
+
+    formula = generate_formula_data(
+        owner=USERNAME,
+        repo_name=mock_repo_name,
+        repository=repository,
+        checksums=[
+            {
+                f"{mock_repo_name}.tar.gz": {
+                    "checksum": CHECKSUM,
+                    "url": mock_tar_url,
+                },
+            },
+            {
+                f"{mock_repo_name}_0.1.0_Darwin_x86_64.tar.xz": {
+                    "checksum": CHECKSUM,
+                    "url": f"{download_url}/{mock_repo_name}_0.1.0_Darwin_x86_64.tar.xz",
+                    "target": "darwin-amd64",
+                },
+            },
+            {
+                f"{mock_repo_name}-aarch64-unknown-linux-gnu.zip": {
+                    "checksum": CHECKSUM,
+                    "url": f"{download_url}/{mock_repo_name}-aarch64-unknown-linux-gnu.zip",
+                    "target": "linux-arm64",
+                },
+            },
+        ],
+        install=INSTALL,
+        tar_url=mock_tar_url,
+        depends_on=None,
+        test=None,
+    )
+
+    _record_formula(FORMULA_PATH, formula_filename, formula)
+
+    assert f'url "{download_url}/{mock_repo_name}_0.1.0_Darwin_x86_64.tar.xz"' in formula
+    assert f'url "{download_url}/{mock_repo_name}-aarch64-unknown-linux-gnu.zip"' in formula
+
+
 @patch.dict(os.environ, {"INPUT_TARGET_DARWIN_AMD64": "false"})
 @patch.dict(os.environ, {"INPUT_TARGET_DARWIN_ARM64": "false"})
 @patch.dict(os.environ, {"INPUT_TARGET_LINUX_AMD64": "false"})
@@ -0,0 +1,82 @@
+import base64
+import json
+from unittest.mock import patch
+
+import pytest
+
+from homebrew_releaser.constants import non_critical_warnings
+from homebrew_releaser.git_data import publish_files
+
+
+@pytest.fixture
+def mock_tap(local_server):
+    """Serves the Git Data API of a tap whose `main` branch points at commit `head-sha`."""
+    tap_files = {
+        "/repos/user/homebrew-tap": {"default_branch": "main"},
+        "/repos/user/homebrew-tap/git/ref/heads/main": {"object": {"sha": "head-sha"}},
+        "/repos/user/homebrew-tap/git/commits/head-sha": {"tree": {"sha": "base-tree-sha"}},
+        "/repos/user/homebrew-tap/git/blobs": {"sha": "blob-sha"},
+        "/repos/user/homebrew-tap/git/trees": {"sha": "tree-sha"},
+        "/repos/user/homebrew-tap/git/commits": {"sha": "commit-sha"},
+        "/repos/user/homebrew-tap/git/refs/heads/main": {"ref": "refs/heads/main"},
+    }
+    for path, content in tap_files.items():
+        local_server.files[path] = json.dumps(content).encode()
+
+    with patch("homebrew_releaser.git_data.GITHUB_BASE_API_URL", local_server.url):
+        yield local_server
+
+
+def test_publish_files(mock_tap):
+    """Tests that files are committed on top of the branch head and the branch is fast-forwarded to it."""
+    commit_sha = publish_files(
+        "user",
+        "homebrew-tap",
+        {"Formula/mock-repo.rb": b"class MockRepo < Formula\nend\n"},
+        "chore: brew formula update for mock-repo v1.0.0",
+        "homebrew-releaser",
+        "homebrew-releaser@example.com",
+    )
+
+    assert commit_sha == "commit-sha"
+    assert [request[:2] for request in mock_tap.requests] == [
+        ("GET", "/repos/user/homebrew-tap"),
+        ("GET", "/repos/user/homebrew-tap/git/ref/heads/main"),
+        ("GET", "/repos/user/homebrew-tap/git/commits/head-sha"),
+        ("POST", "/repos/user/homebrew-tap/git/blobs"),
+        ("POST", "/repos/user/homebrew-tap/git/trees"),
+        ("POST", "/repos/user/homebrew-tap/git/commits"),
+        ("PATCH", "/repos/user/homebrew-tap/git/refs/heads/main"),
+    ]
+    blob, tree, commit, ref = [json.loads(body) for body in mock_tap.request_bodies]
+    assert base64.b64decode(blob["content"]) == b"class MockRepo < Formula\nend\n"
+    assert tree == {
+        "base_tree": "base-tree-sha",
+        "tree": [{"path": "Formula/mock-repo.rb", "mode": "100644", "type": "blob", "sha": "blob-sha"}],
+    }
+    assert commit["tree"] == "tree-sha"
+    assert commit["parents"] == ["head-sha"]
+    assert commit["author"] == {"name": "homebrew-releaser", "email": "homebrew-releaser@example.com"}
+    assert ref == {"sha": "commit-sha", "force": False}
+
+
+def test_publish_files_branch(mock_tap):
+    """Tests that the branch provided is committed to without looking up the default branch."""
+    mock_tap.files["/repos/user/homebrew-tap/git/ref/heads/bump"] = json.dumps({"object": {"sha": "head-sha"}}).encode()
+    mock_tap.files["/repos/user/homebrew-tap/git/refs/heads/bump"] = b"{}"
+
+    publish_files("user", "homebrew-tap", {"Formula/mock-repo.rb": b""}, "mock-message", "owner", "email", "bump")
+
+    assert mock_tap.requests[0][1] == "/repos/user/homebrew-tap/git/ref/heads/bump"
+    assert mock_tap.requests[-1][:2] == ("PATCH", "/repos/user/homebrew-tap/git/refs/heads/bump")
+
+
+def test_publish_files_no_changes(mock_tap):
+    """Tests that nothing is committed when the files are already up to date."""
+    mock_tap.files["/repos/user/homebrew-tap/git/trees"] = json.dumps({"sha": "base-tree-sha"}).encode()
+
+    commit_sha = publish_files("user", "homebrew-tap", {"Formula/mock-repo.rb": b""}, "mock-message", "owner", "email")
+
+    assert commit_sha is None
+    assert mock_tap.requests[-1][:2] == ("POST", "/repos/user/homebrew-tap/git/trees")
+    assert non_critical_warnings.pop() == "No changes to commit."
@@ -1,3 +1,4 @@
+import os
 import shutil
 import subprocess  # nosec B404
 from unittest.mock import patch
@@ -6,6 +7,7 @@ import pytest
 
 from homebrew_releaser.homebrew import (
     get_homebrew_version,
+    link_homebrew_tap,
     setup_homebrew_tap,
     update_python_resources,
 )
@@ -69,3 +71,28 @@ def test_get_homebrew_version_error(mock_subprocess, mock_which):
         timeout=300,
         shell=True,
     )
+
+
+def test_link_homebrew_tap(tmp_path):
+    """Tests that our clone of the tap is linked into Homebrew's taps, replacing any link left from an earlier run."""
+    tap_path = tmp_path / "homebrew-formulas"
+    tap_path.mkdir()
+    homebrew_tap_path = tmp_path / "Taps" / "justintime50" / "homebrew-formulas"
+
+    with patch("homebrew_releaser.homebrew.HOMEBREW_TAPS_DIR", str(tmp_path / "Taps")):
+        link_homebrew_tap("justintime50", "homebrew-formulas", str(tmp_path / "old-clone"))
+        link_homebrew_tap("justintime50", "homebrew-formulas", str(tap_path))
+
+    assert os.readlink(homebrew_tap_path) == str(tap_path)
+
+
+def test_link_homebrew_tap_already_tapped(tmp_path):
+    """Tests that a tap Homebrew already cloned is never replaced."""
+    homebrew_tap_path = tmp_path / "Taps" / "justintime50" / "homebrew-formulas"
+    homebrew_tap_path.mkdir(parents=True)
+
+    with patch("homebrew_releaser.homebrew.HOMEBREW_TAPS_DIR", str(tmp_path / "Taps")):
+        with pytest.raises(SystemExit):
+            link_homebrew_tap("justintime50", "homebrew-formulas", str(tmp_path / "homebrew-formulas"))
+
+    assert not os.path.islink(homebrew_tap_path)
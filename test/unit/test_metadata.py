@@ -0,0 +1,215 @@
+import json
+from unittest.mock import patch
+
+import pytest
+
+from homebrew_releaser.assets import ReleaseAsset
+from homebrew_releaser.metadata import (
+    get_release_metadata,
+    iter_release_assets,
+)
+
+
+def _graphql_response(is_private=False, has_next_page=False, assets=None):
+    return json.dumps(
+        {
+            "data": {
+                "repository": {
+                    "name": "mock-repo",
+                    "description": "A mock repo",
+                    "isPrivate": is_private,
+                    "licenseInfo": {"spdxId": "MIT"},
+                    "latestRelease": {
+                        "databaseId": 123,
+                        "tagName": "v1.0.0",
+                        "releaseAssets": {
+                            "pageInfo": {"hasNextPage": has_next_page},
+                            "nodes": assets or [],
+                        },
+                    },
+                }
+            }
+        }
+    ).encode()
+
+
+@pytest.fixture
+def mock_github(local_server):
+    """Points both the GraphQL and REST APIs at the local stand-in server."""
+    with (
+        patch("homebrew_releaser.utils.GITHUB_GRAPHQL_URL", f"{local_server.url}/graphql"),
+        patch("homebrew_releaser.metadata.GITHUB_BASE_API_URL", local_server.url),
+    ):
+        yield local_server
+
+
+def test_get_release_metadata(mock_github):
+    """Tests that the repository and latest release come back from one GraphQL request shaped like the REST API."""
+    mock_github.files["/graphql"] = _graphql_response(
+        assets=[
+            {
+                "databaseId": 456,
+                "name": "mock-repo.tar.gz",
+                "downloadUrl": "https://github.com/user/mock-repo/releases/download/v1.0.0/mock-repo.tar.gz",
+                "size": 100,
+                "contentType": "application/gzip",
+                "digest": "sha256:123",
+            }
+        ]
+    )
+
+    repository, latest_release = get_release_metadata("user", "mock-repo")
+
+    assert repository == {
+        "name": "mock-repo",
+        "description": "A mock repo",
+        "private": False,
+        "license": {"spdx_id": "MIT"},
+    }
+    assert latest_release["id"] == 123
+    assert latest_release["tag_name"] == "v1.0.0"
+    assert list(latest_release["assets"]) == [
+        ReleaseAsset(
+            name="mock-repo.tar.gz",
+            browser_download_url="https://github.com/user/mock-repo/releases/download/v1.0.0/mock-repo.tar.gz",
+            url=f"{mock_github.url}/repos/user/mock-repo/releases/assets/456",
+            size=100,
+            digest="sha256:123",
+        )
+    ]
+    assert [request[:2] for request in mock_github.requests] == [("POST", "/graphql")]
+    assert json.loads(mock_github.request_bodies[0])["variables"] == {
+        "owner": "user",
+        "repo": "mock-repo",
+        "assetCount": 100,
+    }
+
+
+def test_get_release_metadata_private(mock_github):
+    """Tests that private release assets are listed through REST so their API download URLs are known."""
+    mock_github.files["/graphql"] = _graphql_response(is_private=True, assets=[{"name": "mock-repo.tar.gz"}])
+    rest_assets = [
+        {
+            "name": "mock-repo.tar.gz",
+            "browser_download_url": "https://github.com/user/mock-repo/releases/download/v1.0.0/mock-repo.tar.gz",
+            "url": "https://api.github.com/repos/user/mock-repo/releases/assets/1",
+        }
+    ]
+    mock_github.files["/repos/user/mock-repo/releases/123/assets?per_page=100&page=1"] = json.dumps(
+        rest_assets
+    ).encode()
+
+    repository, latest_release = get_release_metadata("user", "mock-repo")
+
+    assert repository["private"] is True
+    assert latest_release["assets"].get("mock-repo.tar.gz").url == rest_assets[0]["url"]
+
+
+@pytest.mark.parametrize(
+    "graphql_response",
+    [
+        None,  # GraphQL isn't available at all
+        json.dumps({"errors": [{"message": "Field 'digest' doesn't exist"}]}).encode(),
+    ],
+)
+def test_get_release_metadata_rest_fallback(mock_github, graphql_response):
+    """Tests that we fall back to the REST API when GraphQL can't give us everything we need."""
+    if graphql_response:
+        mock_github.files["/graphql"] = graphql_response
+    mock_github.files["/repos/user/mock-repo"] = json.dumps({"name": "mock-repo", "private": False}).encode()
+    mock_github.files["/repos/user/mock-repo/releases/latest"] = json.dumps({"id": 123, "assets": []}).encode()
+    mock_github.files["/repos/user/mock-repo/releases/123/assets?per_page=100&page=1"] = json.dumps(
+        [{"name": "mock-repo.tar.gz", "browser_download_url": "https://example.com/mock-repo.tar.gz"}]
+    ).encode()
+
+    repository, latest_release = get_release_metadata("user", "mock-repo")
+
+    assert repository == {"name": "mock-repo", "private": False}
+    assert latest_release["id"] == 123
+    assert [asset.name for asset in latest_release["assets"]] == ["mock-repo.tar.gz"]
+
+
+def test_get_release_metadata_more_assets(mock_github):
+    """Tests that a release with more assets than fit in the GraphQL query has them paged through REST."""
+    mock_github.files["/graphql"] = _graphql_response(has_next_page=True)
+    mock_github.files["/repos/user/mock-repo/releases/123/assets?per_page=100&page=1"] = json.dumps(
+        [{"name": "mock-repo.tar.gz", "browser_download_url": "https://example.com/mock-repo.tar.gz"}]
+    ).encode()
+
+    repository, latest_release = get_release_metadata("user", "mock-repo")
+
+    assert repository["name"] == "mock-repo"
+    assert [request[:2] for request in mock_github.requests] == [("POST", "/graphql")]
+    assert latest_release["assets"].get("mock-repo.tar.gz") is not None
+
+
+@patch("homebrew_releaser.metadata.MAX_RELEASE_ASSETS", 2)
+def test_iter_release_assets(mock_github):
+    """Tests that the next page of assets is only requested once the previous one is used up."""
+    for page, names in enumerate((["a", "b"], ["c"]), start=1):
+        mock_github.files[f"/repos/user/mock-repo/releases/123/assets?per_page=2&page={page}"] = json.dumps(
+            [{"name": name, "browser_download_url": f"https://example.com/{name}"} for name in names]
+        ).encode()
+
+    assets = iter_release_assets("user", "mock-repo", 123)
+
+    assert next(assets).name == "a"
+    assert len(mock_github.requests) == 1
+    assert [asset.name for asset in assets] == ["b", "c"]
+    assert len(mock_github.requests) == 2
+
+
+def _write_release_event(tmp_path, full_name="user/mock-repo", action="published", prerelease=False):
+    event_path = tmp_path / "event.json"
+    event_path.write_text(
+        json.dumps(
+            {
+                "action": action,
+                "repository": {"full_name": full_name, "name": "mock-repo", "private": False},
+                "release": {"id": 123, "tag_name": "v1.0.0", "prerelease": prerelease, "draft": False, "assets": []},
+            }
+        )
+    )
+
+    return str(event_path)
+
+
+@patch("homebrew_releaser.metadata.GITHUB_EVENT_NAME", "release")
+def test_get_release_metadata_release_event(mock_github, tmp_path):
+    """Tests that the release event payload is used without requesting metadata, and assets are listed from the API.
+
+    Assets uploaded after the release was published are missing from the payload, so it's never trusted for them.
+    """
+    mock_github.files["/repos/user/mock-repo/releases/123/assets?per_page=100&page=1"] = json.dumps(
+        [{"name": "mock-repo.tar.gz", "browser_download_url": "https://example.com/mock-repo.tar.gz", "size": 1}]
+    ).encode()
+
+    with patch("homebrew_releaser.metadata.GITHUB_EVENT_PATH", _write_release_event(tmp_path)):
+        repository, latest_release = get_release_metadata("user", "mock-repo")
+
+    assert repository["name"] == "mock-repo"
+    assert latest_release["tag_name"] == "v1.0.0"
+    assert mock_github.requests == []
+    assert latest_release["assets"].get("mock-repo.tar.gz") is not None
+    assert [request[:2] for request in mock_github.requests] == [
+        ("GET", "/repos/user/mock-repo/releases/123/assets?per_page=100&page=1")
+    ]
+
+
+@pytest.mark.parametrize(
+    "event",
+    [
+        {"full_name": "user/other-repo"},
+        {"action": "edited"},
+        {"prerelease": True},
+    ],
+)
+@patch("homebrew_releaser.metadata.GITHUB_EVENT_NAME", "release")
+def test_get_release_metadata_release_event_mismatch(mock_github, tmp_path, event):
+    """Tests that a release event for another repo or release than the latest one falls back to the API."""
+    mock_github.files["/graphql"] = _graphql_response()
+
+    with patch("homebrew_releaser.metadata.GITHUB_EVENT_PATH", _write_release_event(tmp_path, **event)):
+        get_release_metadata("user", "mock-repo")
+
+    assert [request[:2] for request in mock_github.requests] == [("POST", "/graphql")]
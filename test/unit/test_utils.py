@@ -1,4 +1,6 @@
+import time
 from unittest.mock import (
+    MagicMock,
     mock_open,
     patch,
 )
@@ -8,21 +10,30 @@ import requests
 
 from homebrew_releaser.constants import (
     GITHUB_BASE_API_URL,
+    GITHUB_GRAPHQL_URL,
     GITHUB_HEADERS,
+    GITHUB_WARM_UP_URLS,
+    MAX_DOWNLOAD_WORKERS,
+    MAX_RETRIES,
+    RETRY_BACKOFF_FACTOR,
+    SEGMENTED_DOWNLOAD_SEGMENTS,
 )
 from homebrew_releaser.utils import (
     get_filename_from_path,
+    get_session,
     make_github_get_request,
+    make_github_graphql_request,
+    warm_up_connections,
     write_file,
 )
 
 
-@patch("requests.get")
-def test_make_github_get_request(mock_request):
+@patch("homebrew_releaser.utils.get_session")
+def test_make_github_get_request(mock_session):
     url = f"{GITHUB_BASE_API_URL}/repos/Justintime50/homebrew-releaser"
     make_github_get_request(url=url)
 
-    mock_request.assert_called_once_with(
+    mock_session.return_value.get.assert_called_once_with(
         url,
         headers=GITHUB_HEADERS,
         allow_redirects=True,
@@ -31,8 +42,8 @@ def test_make_github_get_request(mock_request):
     )
 
 
-@patch("requests.get")
-def test_make_github_get_request_stream(mock_request):
+@patch("homebrew_releaser.utils.get_session")
+def test_make_github_get_request_stream(mock_session):
     """Tests that we setup a request correctly when we enable streaming."""
     url = f"{GITHUB_BASE_API_URL}/repos/Justintime50/homebrew-releaser"
     make_github_get_request(url=url, stream=True)
@@ -40,7 +51,7 @@ def test_make_github_get_request_stream(mock_request):
     headers = GITHUB_HEADERS.copy()
     headers["Accept"] = "application/octet-stream"
 
-    mock_request.assert_called_once_with(
+    mock_session.return_value.get.assert_called_once_with(
         url,
         headers=headers,
         allow_redirects=True,
@@ -49,8 +60,27 @@ def test_make_github_get_request_stream(mock_request):
     )
 
 
-@patch("requests.get", side_effect=requests.exceptions.RequestException("mock-error"))
-def test_make_github_get_request_exception(mock_request):
+@patch("homebrew_releaser.utils.get_session")
+def test_make_github_get_request_extra_headers(mock_session):
+    """Tests that extra headers are sent alongside the default GitHub headers."""
+    url = f"{GITHUB_BASE_API_URL}/repos/Justintime50/homebrew-releaser"
+    make_github_get_request(url=url, headers={"If-None-Match": '"mock-etag"'})
+
+    headers = GITHUB_HEADERS.copy()
+    headers["If-None-Match"] = '"mock-etag"'
+
+    mock_session.return_value.get.assert_called_once_with(
+        url,
+        headers=headers,
+        allow_redirects=True,
+        stream=False,
+        timeout=300,
+    )
+
+
+@patch("homebrew_releaser.utils.get_session")
+def test_make_github_get_request_exception(mock_session):
+    mock_session.return_value.get.side_effect = requests.exceptions.RequestException("mock-error")
     url = f"{GITHUB_BASE_API_URL}/repos/Justintime50/homebrew-releaser"
     with pytest.raises(requests.exceptions.RequestException) as error:
         make_github_get_request(url=url)
@@ -58,6 +88,151 @@ def test_make_github_get_request_exception(mock_request):
     assert "mock-error" == str(error.value)
 
 
+@patch("homebrew_releaser.utils.get_session")
+def test_make_github_graphql_request(mock_session):
+    mock_session.return_value.post.return_value.json.return_value = {"data": {"repository": {"name": "mock-repo"}}}
+    data = make_github_graphql_request("mock-query", {"owner": "user"})
+
+    mock_session.return_value.post.assert_called_once_with(
+        GITHUB_GRAPHQL_URL,
+        headers=GITHUB_HEADERS,
+        json={"query": "mock-query", "variables": {"owner": "user"}},
+        timeout=300,
+    )
+    assert data == {"repository": {"name": "mock-repo"}}
+
+
+@patch("homebrew_releaser.utils.get_session")
+def test_make_github_graphql_request_errors(mock_session):
+    """Tests that GraphQL errors, which come back with a 200 status, are raised like any other failed request."""
+    mock_session.return_value.post.return_value.json.return_value = {"errors": [{"message": "mock-error"}]}
+    with pytest.raises(requests.HTTPError) as error:
+        make_github_graphql_request("mock-query", {})
+
+    assert "mock-error" in str(error.value)
+
+
+@patch("homebrew_releaser.utils.TIMEOUT", 5)
+def test_make_github_get_request_cached(local_server, tmp_path):
+    """Tests that API responses are revalidated with a conditional request and served from the cache on a 304."""
+    local_server.files["/repos/user/repo"] = b'{"name": "repo"}'
+    local_server.content_types["/repos/user/repo"] = "application/json; charset=utf-8"
+    url = f"{local_server.url}/repos/user/repo"
+
+    with patch("homebrew_releaser.cache.CHECKSUM_CACHE_DIR", str(tmp_path)):
+        first_response = make_github_get_request(url=url)
+        second_response = make_github_get_request(url=url)
+
+    assert first_response.json() == second_response.json() == {"name": "repo"}
+    assert "If-None-Match" not in local_server.requests[0][2]
+    assert local_server.requests[1][2]["If-None-Match"] == first_response.headers["ETag"]
+    assert second_response.status_code == 200
+
+
+@patch("homebrew_releaser.utils.time.sleep")
+@patch("homebrew_releaser.utils.get_session")
+def test_make_github_get_request_rate_limit_exhausted(mock_session, mock_sleep):
+    """Tests that we wait for the rate limit to reset once it has run out instead of making a doomed request."""
+    reset_at = int(time.time()) + 30
+    mock_session.return_value.get.return_value.headers = {
+        "X-RateLimit-Remaining": "0",
+        "X-RateLimit-Reset": str(reset_at),
+    }
+
+    make_github_get_request(url=f"{GITHUB_BASE_API_URL}/repos/Justintime50/homebrew-releaser")
+    mock_sleep.assert_not_called()
+    make_github_get_request(url=f"{GITHUB_BASE_API_URL}/repos/Justintime50/homebrew-releaser")
+
+    assert 25 < mock_sleep.call_args.args[0] <= 30
+
+
+@patch("homebrew_releaser.utils.time.sleep")
+@patch("homebrew_releaser.utils.get_session")
+def test_make_github_get_request_rate_limit_low(mock_session, mock_sleep):
+    """Tests that requests are never held up while the rate limit still has requests left, however few."""
+    mock_session.return_value.get.return_value.headers = {
+        "X-RateLimit-Remaining": "1",
+        "X-RateLimit-Reset": str(int(time.time()) + 3600),
+    }
+
+    for _ in range(3):
+        make_github_get_request(url=f"{GITHUB_BASE_API_URL}/repos/Justintime50/homebrew-releaser")
+
+    mock_sleep.assert_not_called()
+
+
+@patch("homebrew_releaser.utils.time.sleep")
+@patch("homebrew_releaser.utils.get_session")
+def test_make_github_graphql_request_rate_limit_exhausted(mock_session, mock_sleep):
+    """Tests that running out of the GraphQL rate limit holds up GraphQL requests but not REST ones."""
+    mock_session.return_value.post.return_value.headers = {
+        "X-RateLimit-Remaining": "0",
+        "X-RateLimit-Reset": str(int(time.time()) + 30),
+        "X-RateLimit-Resource": "graphql",
+    }
+    mock_session.return_value.post.return_value.json.return_value = {"data": {}}
+    mock_session.return_value.get.return_value.headers = {"X-RateLimit-Remaining": "4000"}
+
+    make_github_graphql_request("mock-query", {})
+    make_github_get_request(url=f"{GITHUB_BASE_API_URL}/repos/Justintime50/homebrew-releaser")
+    mock_sleep.assert_not_called()
+    make_github_graphql_request("mock-query", {})
+
+    assert 25 < mock_sleep.call_args.args[0] <= 30
+
+
+@patch("homebrew_releaser.utils.time.sleep")
+@patch("homebrew_releaser.utils.get_session")
+def test_make_github_get_request_secondary_rate_limit(mock_session, mock_sleep):
+    """Tests that a request refused by a secondary rate limit is retried after `Retry-After`."""
+    limited_response = MagicMock(status_code=403, headers={"Retry-After": "10"})
+    ok_response = MagicMock(status_code=200, headers={"X-RateLimit-Remaining": "4000"})
+    mock_session.return_value.get.side_effect = [limited_response, ok_response]
+
+    response = make_github_get_request(url=f"{GITHUB_BASE_API_URL}/repos/Justintime50/homebrew-releaser")
+
+    assert response == ok_response
+    assert mock_session.return_value.get.call_count == 2
+    assert 5 < mock_sleep.call_args.args[0] <= 10
+
+
+def test_get_session():
+    """Tests that a single session is shared and retries rate limits and server errors with a backoff."""
+    get_session.cache_clear()
+    session = get_session()
+
+    assert get_session() is session
+    adapter = session.get_adapter(GITHUB_BASE_API_URL)
+    assert adapter.max_retries.total == MAX_RETRIES
+    assert adapter.max_retries.backoff_factor == RETRY_BACKOFF_FACTOR
+    assert 429 in adapter.max_retries.status_forcelist
+    assert 503 in adapter.max_retries.status_forcelist
+    assert adapter._pool_maxsize == MAX_DOWNLOAD_WORKERS * SEGMENTED_DOWNLOAD_SEGMENTS
+
+
+@patch("homebrew_releaser.utils.get_session")
+def test_warm_up_connections(mock_session):
+    """Tests that we open a connection to each GitHub host."""
+    warm_up_connections()
+
+    # Warm up runs on background threads, give them a moment to finish
+    for _ in range(50):
+        if mock_session.return_value.head.call_count == len(GITHUB_WARM_UP_URLS):
+            break
+        time.sleep(0.01)
+
+    called_urls = {call.args[0] for call in mock_session.return_value.head.call_args_list}
+    assert called_urls == set(GITHUB_WARM_UP_URLS)
+
+
+@patch("homebrew_releaser.utils.get_session")
+def test_warm_up_connections_error(mock_session):
+    """Tests that warm up failures are swallowed so the real requests can surface them instead."""
+    mock_session.return_value.head.side_effect = requests.exceptions.ConnectionError("mock-error")
+
+    warm_up_connections()
+
+
 def test_write_file():
     with patch("builtins.open", mock_open()):
         write_file("mock-file", "mock-content", mode="w")